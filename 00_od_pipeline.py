@@ -0,0 +1,255 @@
+# 00_od_pipeline.py
+
+"""
+Script name: 00_od_pipeline.py
+Author: R. Nai
+Creation date: 17/10/2026
+Last modified: 17/10/2026
+Description: single entry point of the workflow, modelled as a DAG of stages: ANAC download (with verification), ISTAT/BDAP download,
+ANAC unzip, merge and Parquet store, and the selection of 02_anac_od_select.py. Every stage runs one of the scripts of the repository.
+A stage is skipped when its inputs (content hash) and its configuration did not change since its last successful run and its outputs
+exist (state in .pipeline_state.json, see utility_manager/pipeline.py); independent stages (e.g., the two downloads) run in parallel.
+The merged cig file is updated whenever 02_anac_od_select.py reads it (not ANAC_READ_FROM_ZIP nor ANAC_PARQUET_DO), whatever MERGE_DO.
+Usage: python 00_od_pipeline.py [--stages STAGE ...] [--force] [--dry-run] [--no-download] [--workers N]
+"""
+
+### IMPORT ###
+import argparse
+import logging
+import sys
+from datetime import datetime
+from pathlib import Path
+
+### LOCAL IMPORT ###
+from config import config_reader
+from utility_manager.utilities import csv_sources, json_to_list_dict, manifest_read, EXTRACT_MANIFEST
+from utility_manager.output_writer import output_path
+from utility_manager.pipeline import stage_create, pipeline_select, pipeline_run
+from utility_manager.metrics import metrics_start, metrics_write
+
+### GLOBALS ###
+yaml_config = config_reader.config_read_yaml("config.yml", "config")
+year_start = int(yaml_config["YEAR_START_DOWNLOAD"])
+year_end = int(yaml_config["YEAR_END_DOWNLOAD"])
+cig_prefix = str(yaml_config["CIG_PREFIX"])
+anac_download_dir = str(yaml_config["ANAC_DOWNLOAD_DIR"])
+data_dir = str(yaml_config["OD_ANAC_DIR"])
+verify_do = bool(yaml_config.get("VERIFY_DO", True))
+anac_unzip_do = bool(yaml_config.get("ANAC_UNZIP_DO", True))
+anac_read_from_zip = bool(yaml_config.get("ANAC_READ_FROM_ZIP", False))
+anac_parquet_do = bool(yaml_config.get("ANAC_PARQUET_DO", False))
+anac_parquet_dir = str(yaml_config.get("ANAC_PARQUET_DIR", ""))
+pa_reg_path = Path(str(yaml_config["OD_BDAP_DIR"])) / str(yaml_config["OD_BDAP_FILE"])
+output_format = str(yaml_config.get("OUTPUT_FORMAT", "csv"))
+anac_stats_path = output_path(Path(str(yaml_config["ANAC_STATS_DIR"])) / str(yaml_config["ANAC_STATS_FILE"]), output_format)
+pipeline_workers = max(1, int(yaml_config.get("PIPELINE_WORKERS", 2)))
+log_level = str(yaml_config.get("LOG_LEVEL", "INFO")).upper() # DEBUG: detailed diagnostics
+
+merge_file = f"bando_cig_{year_start}-{year_end}.csv" # as in 01_anac_od_download.py and 02_anac_od_select.py
+SCRIPT_ANAC = "01_anac_od_download.py"
+SCRIPT_ISTAT_BDAP = "01_istat_bdap_od_download.py"
+SCRIPT_SELECT = "02_anac_od_select.py"
+CONFIG_IGNORE = ["LOG_LEVEL"] # keys that do not change the outputs (also the *_WORKERS keys)
+
+### FUNCTIONS ###
+
+def config_values(keys: list = None) -> dict:
+    """
+    Returns the configuration values of a stage.
+
+    Parameters:
+        keys (list, optional): the configuration keys (None = all, except CONFIG_IGNORE and the *_WORKERS keys).
+
+    Returns:
+        dict: the values by key.
+    """
+
+    if keys is None:
+        keys = [key for key in yaml_config if key not in CONFIG_IGNORE and not key.endswith("_WORKERS")]
+    return {key: yaml_config.get(key) for key in keys}
+
+def code_files(script: str) -> list:
+    """
+    Returns the code of a stage (the script and the utility modules), part of its inputs: a change of the code runs the stage again.
+
+    Parameters:
+        script (str): the script of the stage.
+
+    Returns:
+        list: the file paths.
+    """
+
+    return [Path(script)] + sorted(Path("utility_manager").glob("*.py"))
+
+def unzip_outputs() -> list:
+    """
+    Returns the files extracted from the ANAC archives, as recorded in the extract manifest (see url_unzip).
+
+    Parameters:
+        None
+
+    Returns:
+        list: the file paths.
+    """
+
+    manifest = manifest_read(anac_download_dir, EXTRACT_MANIFEST)
+    return [Path(anac_download_dir) / member for entry in manifest.values() for member in entry.get("members", [])]
+
+def select_inputs() -> list:
+    """
+    Returns the input files of the selection: the ANAC data as read by 02_anac_od_select.py (Parquet store, monthly archives or merged file),
+    the PA registry, the filter files and the code.
+
+    Parameters:
+        None
+
+    Returns:
+        list: the file paths (the Parquet store as a directory).
+    """
+
+    if anac_parquet_do:
+        list_inputs = [Path(anac_parquet_dir)]
+    elif anac_read_from_zip:
+        list_inputs = csv_sources(anac_download_dir, cig_prefix)
+    else:
+        list_inputs = [Path(data_dir) / merge_file]
+    list_inputs += [pa_reg_path, Path(str(yaml_config["ANAC_OD_SELECT"])), Path(str(yaml_config["ANAC_OD_REGION"]))]
+    return list_inputs + code_files(SCRIPT_SELECT)
+
+def select_outputs() -> list:
+    """
+    Returns the output files of the selection, as named by 02_anac_od_select.py: the filtered data, the filtered data with BDAP,
+    one file per region of ANAC_OD_REGION and the stats.
+
+    Parameters:
+        None
+
+    Returns:
+        list: the file paths.
+    """
+
+    output_prefix = f"bando_cig_{year_start}-{year_end}"
+    list_names = [f"{output_prefix}_filtered.csv", f"{output_prefix}_filtered_bdap.csv"]
+    list_names += [f"{output_prefix}_{next(iter(region_dic))}.csv" for region_dic in json_to_list_dict(str(yaml_config["ANAC_OD_REGION"]))]
+    return [output_path(Path(data_dir) / name, output_format) for name in list_names] + [anac_stats_path]
+
+def pipeline_stages(download: bool = True, targets: list = None) -> dict:
+    """
+    Builds the stages of the workflow from the configuration.
+
+    Parameters:
+        download (bool): whether to run the downloads (False = use the files already downloaded).
+        targets (list, optional): the stages requested on the command line (enabled also if disabled in config.yml).
+
+    Returns:
+        dict: the stages by name (see utility_manager/pipeline.py).
+    """
+
+    python = [sys.executable, "-u"] # unbuffered: the output lines are shown as they are printed
+    targets = targets or []
+    list_stages = [
+        stage_create("anac_download", python + [SCRIPT_ANAC, "--steps", "download"] + (["verify"] if verify_do else []), cache=False, enabled=download),
+        stage_create("istat_bdap_download", python + [SCRIPT_ISTAT_BDAP], cache=False, enabled=download),
+        stage_create("anac_unzip", python + [SCRIPT_ANAC, "--steps", "unzip"], deps=["anac_download"],
+                     inputs=lambda: sorted(Path(anac_download_dir).glob("*.zip")) + code_files(SCRIPT_ANAC), outputs=unzip_outputs,
+                     config=config_values(["ANAC_DOWNLOAD_DIR", "ANAC_UNZIP_MEMBER_SUFFIXES"]), enabled=anac_unzip_do or "anac_unzip" in targets),
+        stage_create("anac_merge", python + [SCRIPT_ANAC, "--steps", "merge"], deps=["anac_download"],
+                     inputs=lambda: csv_sources(anac_download_dir, cig_prefix) + code_files(SCRIPT_ANAC), outputs=[Path(data_dir) / merge_file],
+                     config=config_values(["ANAC_DOWNLOAD_DIR", "OD_ANAC_DIR", "CIG_PREFIX", "YEAR_START_DOWNLOAD", "YEAR_END_DOWNLOAD"]),
+                     enabled=not (anac_read_from_zip or anac_parquet_do) or "anac_merge" in targets),
+        stage_create("anac_parquet", python + [SCRIPT_ANAC, "--steps", "parquet"], deps=["anac_download"],
+                     inputs=lambda: csv_sources(anac_download_dir, cig_prefix) + code_files(SCRIPT_ANAC), outputs=[Path(anac_parquet_dir)],
+                     config=config_values(["ANAC_DOWNLOAD_DIR", "CIG_PREFIX", "CSV_SEP", "ANAC_CIG_SCHEMA", "ANAC_PARQUET_DIR", "ANAC_PARQUET_PARTITIONS", "ANAC_DEDUP_KEYS"]),
+                     enabled=anac_parquet_do or "anac_parquet" in targets),
+        stage_create("anac_select", python + [SCRIPT_SELECT], deps=["anac_merge", "anac_parquet", "istat_bdap_download"],
+                     inputs=select_inputs, outputs=select_outputs, config=config_values()),
+    ]
+    return {stage["name"]: stage for stage in list_stages}
+
+### MAIN ###
+
+def main() -> None:
+    """
+    Main script function.
+    Parameters: None
+    Returns: None
+    """
+
+    dic_stages = pipeline_stages()
+    parser = argparse.ArgumentParser(description="Run the download and selection workflow, skipping the stages whose inputs and configuration did not change.")
+    parser.add_argument("--stages", nargs="+", choices=list(dic_stages), metavar="STAGE", help=f"stages to be run, with the stages they depend on (default: all): {', '.join(dic_stages)}")
+    parser.add_argument("--force", action="store_true", help="run the stages also when their inputs did not change")
+    parser.add_argument("--dry-run", action="store_true", help="only show which stages would run, with the files currently on disk")
+    parser.add_argument("--no-download", action="store_true", help="do not run the downloads: use the files already downloaded")
+    parser.add_argument("--workers", type=int, default=pipeline_workers, help="stages run at the same time (default: PIPELINE_WORKERS)")
+    args = parser.parse_args()
+
+    # Logging setup
+    log_file = f"{Path(__file__).stem}.log"
+    logging.basicConfig(
+        level=log_level,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(log_file),
+            logging.StreamHandler()
+        ]
+    )
+    logger = logging.getLogger(__name__)
+    report = metrics_start(__file__)
+
+    print()
+    print("*** PROGRAM START ***")
+    print()
+
+    logger.info("PROGRAM START")
+
+    start_time = datetime.now().replace(microsecond=0)
+    print("Start process: " + str(start_time))
+    logger.info(f"Start process: {start_time}")
+    print()
+
+    print(">> Building the stages")
+    dic_stages = pipeline_stages(download=not args.no_download, targets=args.stages)
+    names = pipeline_select(dic_stages, args.stages)
+    for name in names:
+        stage = dic_stages[name]
+        print(f"{name}: {' '.join(stage['command'][2:])}" + (f" (after {', '.join(stage['deps'])})" if stage["deps"] else "") + ("" if stage["enabled"] else " - disabled"))
+    print()
+
+    print(">> Running the stages" + (" (dry run)" if args.dry_run else ""))
+    dic_status = pipeline_run(dic_stages, names, ".", args.workers, args.force, args.dry_run, report)
+    print()
+
+    print(">> Stages")
+    for name in names:
+        print(f"{name}: {dic_status.get(name)}")
+    failed = [name for name, status in dic_status.items() if status in ("failed", "blocked")]
+    if failed:
+        print("ERROR! Stages failed or not run:", failed)
+        logger.error(f"Stages failed or not run: {failed}")
+    print()
+
+    # end
+    end_time = datetime.now().replace(microsecond=0)
+    delta_time = end_time - start_time
+
+    print()
+    print("End process:", end_time)
+    print("Time to finish:", delta_time)
+    logger.info(f"End process: {end_time}")
+    logger.info(f"Time to finish: {delta_time}")
+    path_report = metrics_write(report, log_file)
+    print("Run report:", path_report)
+    logger.info(f"Run report: {path_report}")
+    print()
+
+    print()
+    print("*** PROGRAM END ***")
+    logger.info("PROGRAM END")
+    print()
+
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -10,16 +10,31 @@ https://dati.anticorruzione.it/opendata/download/dataset/cig-AAAA/filesystem/cig
 (ex. https://dati.anticorruzione.it/opendata/download/dataset/cig-2021/filesystem/cig_csv_2021_01.zip)
 
 [2025-06-12]: updated with logging functionalities.
+[2026-10-17]: URL generation stops at the current month; optional discovery of the published snapshots; negative cache of URLs not found.
+[2026-10-17]: the URLs of the current and previous month are never added to the negative cache (they may be published any day).
+[2026-10-17]: merge_csv_files streams in binary mode, keeps a single header, merges in year/month order and counts lines while writing.
+[2026-10-17]: optional conversion of the cig monthly files into a partitioned Parquet store (ANAC_PARQUET_DO).
+[2026-10-17]: the Parquet store is deduplicated on ANAC_DEDUP_KEYS, month by month.
+[2026-10-17]: per-stage metrics (time, bytes downloaded, download speed, lines merged, peak RSS) written to a JSON run report next to the log file.
+[2026-10-17]: logging level from LOG_LEVEL: the URL lists and the per-file messages are shown only at the DEBUG level.
+[2026-10-17]: main split into steps (download, verify, unzip, merge, parquet), selectable with --steps (used by 00_od_pipeline.py).
+Usage: python 01_anac_od_download.py [--steps download verify unzip merge parquet]
 """
 
 ### IMPORT ###
+import argparse
 import logging
-from datetime import datetime
+import os
+import re
+from datetime import date, datetime, timedelta
 from pathlib import Path
+import requests
 
 ### LOCAL IMPORT ###
 from config import config_reader
-from utility_manager.utilities import check_and_create_directory, url_download, url_unzip, read_urls_from_json
+from utility_manager.utilities import check_and_create_directory, url_download, url_unzip, read_urls_from_json, download_repair, session_create, csv_sources, csv_open
+from utility_manager.parquet_store import cig_to_parquet
+from utility_manager.metrics import metrics_start, metrics_stage, metrics_count, metrics_update, metrics_write
 
 ### GLOBALS ###
 yaml_config = config_reader.config_read_yaml("config.yml", "config")
@@ -31,8 +46,28 @@ url_statics_file = str(yaml_config["ANAC_STATIC_URLS_JSON"])
 url_dynamic_file = str(yaml_config["ANAC_DYNAMIC_URLS_JSON"])
 cig_prefix = str(yaml_config["CIG_PREFIX"])
 anac_other_dataset_names = yaml_config.get("ANAC_OTHER_DATASET_NAMES", [])
+download_workers = int(yaml_config.get("DOWNLOAD_WORKERS", 1))
+download_max_per_host = int(yaml_config.get("DOWNLOAD_MAX_PER_HOST", 4))
+negative_cache_ttl_days = int(yaml_config.get("NEGATIVE_CACHE_TTL_DAYS", 0))
+anac_discovery_do = bool(yaml_config.get("ANAC_DISCOVERY_DO", False))
+anac_discovery_url = str(yaml_config.get("ANAC_DISCOVERY_URL", ""))
+unzip_workers = int(yaml_config.get("UNZIP_WORKERS", 1))
+anac_unzip_do = bool(yaml_config.get("ANAC_UNZIP_DO", True))
+anac_unzip_member_suffixes = yaml_config.get("ANAC_UNZIP_MEMBER_SUFFIXES") or None # None = all members
+verify_do = bool(yaml_config.get("VERIFY_DO", True))
+verify_workers = int(yaml_config.get("VERIFY_WORKERS", 0)) or None # None = number of CPUs
+log_level = str(yaml_config.get("LOG_LEVEL", "INFO")).upper() # DEBUG: detailed diagnostics
 
 MERGE_DO = False  # whether to merge the CSV files after download and unzip or not
+csv_sep = str(yaml_config["CSV_SEP"])
+anac_cig_schema = dict(yaml_config["ANAC_CIG_SCHEMA"])
+anac_parquet_do = bool(yaml_config.get("ANAC_PARQUET_DO", False))
+anac_parquet_dir = str(yaml_config.get("ANAC_PARQUET_DIR", ""))
+anac_parquet_partitions = list(yaml_config.get("ANAC_PARQUET_PARTITIONS", []))
+anac_dedup_keys = list(yaml_config.get("ANAC_DEDUP_KEYS", []) or []) # deduplication keys of the Parquet store (empty = no deduplication)
+
+MERGE_BUFFER_SIZE = 16 * 1024 * 1024 # bytes copied per read when merging CSV files
+ANAC_STEPS = ["download", "verify", "unzip", "merge", "parquet"] # steps of the script, in execution order (see --steps)
 
 # OUTPUT
 merge_file = f"bando_cig_{year_start}-{year_end}.csv" # final file with all the tenders following years
@@ -41,9 +76,11 @@ data_dir = str(yaml_config["OD_ANAC_DIR"])
 
 ### FUNCTIONS ###
 
-def url_generate(year_start: int, year_end: int, list_months: list, url_base: list, key: str, day: str = "01") -> list:
+def url_generate(year_start: int, year_end: int, list_months: list, url_base: list, key: str, day: str = "01", date_limit: date = None, date_first: date = None) -> list:
     """
     Generates a list of URLs based on a range of years, a list of months, and a base URL.
+    Months after 'date_limit' (default: the current month) are not generated, since they cannot have been published yet.
+    Months before 'date_first' (if given) are not generated.
 
     Parameters:
         year_start (int): the starting year of the range (inclusive).
@@ -52,15 +89,24 @@ def url_generate(year_start: int, year_end: int, list_months: list, url_base: li
         url_base (str): The base URL to which the year and month will be appended. The base URL should not end with a slash.
         key (str): the dataset name key to be used in URL construction (e.g., "cig" or other dataset names).
         day (str): the day to be used in URL construction (default: "01").
+        date_limit (date, optional): the last date to be generated (default: today).
+        date_first (date, optional): the first date to be generated (default: no limit).
         
     Returns:
     - list: a list of strings, where each string is a fully constructed URL according to the described pattern.
     """
 
+    if date_limit is None:
+        date_limit = date.today()
+
     list_url = []
     for year in range(year_start, year_end + 1):  # year_end+1 to keep year_end inclusive
         year_str = f"{year:04}"
         for month in list_months:
+            if (year, int(month)) > (date_limit.year, date_limit.month):
+                continue # future month
+            if date_first is not None and (year, int(month)) < (date_first.year, date_first.month):
+                continue
             month_str = f"{int(month):02}"
             day_str = f"{int(day):02}"
             for pattern in url_base:
@@ -75,9 +121,65 @@ def url_generate(year_start: int, year_end: int, list_months: list, url_base: li
                 list_url.append(url)
     return list_url
 
+def url_discover(url_api: str, dataset_name: str, year_start: int, year_end: int) -> list:
+    """
+    Discovers the snapshots of a dataset actually published by ANAC, reading the dataset resources from the Open Data catalogue API (CKAN 'package_show').
+    Only the CSV zip snapshots dated between 'year_start' and 'year_end' are returned.
+
+    Parameters:
+        url_api (str): the catalogue API URL, with the {dataset-name} placeholder.
+        dataset_name (str): the dataset name (e.g., "aggiudicatari").
+        year_start (int): the starting year (inclusive).
+        year_end (int): the ending year (inclusive).
+
+    Returns:
+        list: the URLs of the published snapshots (empty if the discovery failed).
+    """
+
+    logger = logging.getLogger(__name__)
+    s = session_create()
+    try:
+        response = s.get(url_api.replace("{dataset-name}", dataset_name), verify=False, timeout=60)
+        response.raise_for_status()
+        resources = response.json().get("result", {}).get("resources", [])
+    except (requests.RequestException, ValueError) as e:
+        print(f"WARNING! Discovery failed for dataset '{dataset_name}': {e}")
+        logger.warning(f"Discovery failed for dataset {dataset_name}: {e}")
+        return []
+    finally:
+        s.close()
+
+    list_url = []
+    for resource in resources:
+        url = resource.get("url") or ""
+        file_name = Path(url).name
+        # Snapshot file names start with the date, e.g. 20240101-aggiudicatari_csv.zip
+        if file_name.endswith(f"-{dataset_name}_csv.zip") and file_name[:4].isdigit() and year_start <= int(file_name[:4]) <= year_end:
+            list_url.append(url)
+    return sorted(list_url)
+
+def csv_source_sort_key(csv_source: Path) -> tuple:
+    """
+    Returns the sort key of a monthly CSV source, based on the year and month in its name (e.g., cig_csv_2021_01 -> (2021, 1)).
+
+    Parameters:
+        csv_source (Path): the path of the source.
+
+    Returns:
+        tuple: (year, month, name); sources without year and month in their name are sorted last, by name.
+    """
+
+    match = re.search(r"(\d{4})_(\d{2})", csv_source.stem)
+    if match is None:
+        return (9999, 99, csv_source.name)
+    return (int(match.group(1)), int(match.group(2)), csv_source.name)
+
 def merge_csv_files(source_dir: str, output_dir:str, prefix_name:str, output_file: str) -> int:
     """
     Merges all CSV files with a specific prefix name in the specified directory into a single CSV file (useful for "bando CIG" table).
+    The CSV files are read directly from the .zip archives when available, so the extraction step is not needed.
+    Files are merged in year/month order and copied in binary mode in blocks of MERGE_BUFFER_SIZE bytes, so the memory used does not depend on the file sizes.
+    Only the header of the first file is written; lines are counted while writing and the output file appears only when complete.
     
     Parameters:
         source_dir (str): the path to the directory containing the CSV files to be merged.
@@ -86,47 +188,236 @@ def merge_csv_files(source_dir: str, output_dir:str, prefix_name:str, output_fil
         output_file (str): the path to the output CSV file where the merged content will be stored.
 
     Returns:
-        int: number of lines in the merged CSV file
+        int: number of lines in the merged CSV file (header included)
     """
 
     source_path = Path(source_dir)
     output_path = Path(output_dir) / output_file
+    output_path_tmp = output_path.with_name(output_file + ".part")
 
     # Ensure the source directory exists
     if not source_path.is_dir():
         print(f"WARNING! Source directory {source_dir} does not exist.")
         return 0
 
-    # Open the output file in write mode
-    with output_path.open(mode='w') as outfile:
-        for csv_file in source_path.glob(f'{prefix_name}*.csv'):
-            with csv_file.open(mode='r') as infile:
-                # Read the content of the current CSV file and write it to the output file
-                outfile.write(infile.read())
-            print(f"Merged: {csv_file}")
+    lines = 0
+    header = None
+
+    # Open the output file in write mode (sources are read straight from the archives when available)
+    with output_path_tmp.open(mode='wb', buffering=MERGE_BUFFER_SIZE) as outfile:
+        for csv_source in sorted(csv_sources(source_dir, prefix_name), key=csv_source_sort_key):
+            with csv_open(csv_source) as infile:
+                file_header = infile.readline()
+                if header is None:
+                    header = file_header
+                    outfile.write(header if header.endswith(b"\n") else header + b"\n")
+                    lines += 1
+                elif file_header.strip() != header.strip():
+                    print(f"WARNING! Header of '{csv_source.name}' differs from the first file header.")
+                # Copy the content of the current CSV file to the output file, counting the lines
+                last_byte = b"\n"
+                for chunk in iter(lambda: infile.read(MERGE_BUFFER_SIZE), b""):
+                    outfile.write(chunk)
+                    lines += chunk.count(b"\n")
+                    last_byte = chunk[-1:]
+                if last_byte != b"\n": # the next file must start on a new line
+                    outfile.write(b"\n")
+                    lines += 1
+            logging.getLogger(__name__).debug(f"Merged: {csv_source}")
+
+    os.replace(output_path_tmp, output_path)
 
     print(f"All CSV files in '{source_dir}' with file name prefix '{prefix_name}' have been merged into file '{output_file}' in '{output_path}'.\n")
 
-    # Count the lines in the merged CSV file
-
-    with open(output_path, 'r') as file:
-        lines = sum(1 for line in file)
-
     return lines
 
 def print_list_urls(list_urls: list) -> None:
     """
-    Prints each URL in the provided list of URLs.
+    Prints each URL in the provided list of URLs (only at the DEBUG logging level, see LOG_LEVEL).
 
     Parameters:
         list_urls (list): A list of URLs to be printed.
     Returns:
         None
     """
+    if not logging.getLogger(__name__).isEnabledFor(logging.DEBUG):
+        return
     print("List of URLs:")
     for i, url in enumerate(list_urls, start=1):
         print(f"{i}) {url}")
 
+def step_download(report: dict) -> None:
+    """
+    Download step: generates the dynamic and static URLs and downloads them into the ANAC download directory.
+
+    Parameters:
+        report (dict): the run report (updated, see utility_manager/metrics.py).
+
+    Returns:
+        None
+    """
+
+    logger = logging.getLogger(__name__)
+
+    with metrics_stage(report, "urls"):
+        print(">> Generating dynamic URLs")
+        url_base = read_urls_from_json(url_dynamic_file, "cig")
+        list_urls_din = url_generate(year_start, year_end, list_months, url_base, "cig")
+        # Current and previous month: not published yet or published late, checked at every run (never in the negative cache)
+        date_recent = (date.today().replace(day=1) - timedelta(days=1)).replace(day=1)
+        list_urls_recent = url_generate(year_start, year_end, list_months, url_base, "cig", date_first=date_recent)
+        list_urls_din_len = len(list_urls_din)
+        print("URLs generated (num):", list_urls_din_len)
+        print_list_urls(list_urls_din) # debug
+        print()
+
+        print(">> Generating dynamic URLs (others)")
+        url_base_others = read_urls_from_json(url_dynamic_file, "others")
+        list_urls_others_din = []
+        for dataset_name in anac_other_dataset_names:
+            list_urls_dataset = []
+            if anac_discovery_do:
+                list_urls_dataset = url_discover(anac_discovery_url, dataset_name, year_start, year_end)
+                print(f"Snapshots discovered for '{dataset_name}': {len(list_urls_dataset)}")
+            if not list_urls_dataset:
+                list_urls_dataset = url_generate(year_start, year_end, list_months, url_base_others, dataset_name)
+                list_urls_recent += url_generate(year_start, year_end, list_months, url_base_others, dataset_name, date_first=date_recent)
+            list_urls_others_din.extend(list_urls_dataset)
+        list_urls_others_din_len = len(list_urls_others_din)
+        print("URLs generated (num):", list_urls_others_din_len)
+        print_list_urls(list_urls_others_din) # debug
+        print()
+
+        print(">> Generating static URLs")
+        list_urls_sta = read_urls_from_json(url_statics_file, "others")
+        list_urls_sta_len = len(list_urls_sta)
+        print("URLs generated (num):", list_urls_sta_len)
+        print_list_urls(list_urls_sta) # debug
+        print()
+
+        print(">> Merging dynamic URLs lists")
+        list_urls_all = list_urls_din + list_urls_others_din
+        list_urls_all_len = len(list_urls_all)
+        print("URLs generated (all dynamic):", list_urls_all_len)
+        # print(list_urls_all) # debug
+        metrics_count(report, "urls", list_urls_all_len + list_urls_sta_len)
+        print()
+
+    with metrics_stage(report, "download"):
+        print(">> Downloading from URLs (dynamic)")
+        print("Download directory:", anac_download_dir)
+        logger.info(f"Starting download from {list_urls_all_len} URLs")
+        dic_result = url_download(list_urls_all, anac_download_dir, download_workers, download_max_per_host, negative_cache_ttl_days=negative_cache_ttl_days, negative_cache_exempt=list_urls_recent)
+        print("Download results")
+        print(dic_result)
+        logger.info(f"Download completed - Results: {dic_result}")
+        metrics_update(report, dic_result)
+        print()
+
+    with metrics_stage(report, "download_static"):
+        print(">> Downloading from URLs (static, refreshed if changed on the server)")
+        print("Download directory:", anac_download_dir)
+        logger.info(f"Starting download from {list_urls_sta_len} URLs")
+        dic_result = url_download(list_urls_sta, anac_download_dir, download_workers, download_max_per_host, refresh=True)
+        print("Download results")
+        print(dic_result)
+        logger.info(f"Download completed - Results: {dic_result}")
+        metrics_update(report, dic_result)
+        print()
+
+def step_verify(report: dict) -> None:
+    """
+    Verify step: checks the downloaded files and downloads the damaged ones again (see download_repair).
+
+    Parameters:
+        report (dict): the run report (updated).
+
+    Returns:
+        None
+    """
+
+    with metrics_stage(report, "verify"):
+        print(">> Verifying downloaded files")
+        dic_verify = download_repair(anac_download_dir, download_workers, download_max_per_host, verify_workers)
+        print("Verification results")
+        print(dic_verify)
+        logging.getLogger(__name__).info(f"Verification completed - Results: {dic_verify}")
+        metrics_update(report, dic_verify) # damaged files
+        metrics_update(report, dic_verify["refetch"]) # new downloads
+        print()
+
+def step_unzip(report: dict) -> None:
+    """
+    Unzip step: extracts the new or changed archives of the ANAC download directory.
+
+    Parameters:
+        report (dict): the run report (updated).
+
+    Returns:
+        None
+    """
+
+    with metrics_stage(report, "unzip"):
+        print(">> Unzipping files")
+        unzipped_files = url_unzip(anac_download_dir, unzip_workers, anac_unzip_member_suffixes)
+        print("Unzipped files:", len(unzipped_files))
+        metrics_count(report, "files_unzipped", len(unzipped_files))
+        print()
+
+def step_merge(report: dict) -> None:
+    """
+    Merge step: merges the monthly cig files into the file read by 02_anac_od_select.py (see merge_csv_files).
+
+    Parameters:
+        report (dict): the run report (updated).
+
+    Returns:
+        None
+    """
+
+    with metrics_stage(report, "merge"):
+        print(">> Merging files")
+        print("Prefix for merging:", cig_prefix)
+        lines_csv = merge_csv_files(anac_download_dir, data_dir, cig_prefix, merge_file)
+        print(f"Lines in the merged CSV file '{merge_file}' (with duplicates): {lines_csv}")
+        metrics_count(report, "lines_written", lines_csv)
+        metrics_count(report, "bytes_written", (Path(data_dir) / merge_file).stat().st_size if lines_csv else 0)
+        print()
+
+def step_parquet(report: dict) -> None:
+    """
+    Parquet step: converts the new monthly cig files into the Parquet store (see cig_to_parquet).
+
+    Parameters:
+        report (dict): the run report (updated).
+
+    Returns:
+        None
+    """
+
+    with metrics_stage(report, "parquet"):
+        print(">> Converting cig files to the Parquet store")
+        print("Store directory:", anac_parquet_dir)
+        converted = cig_to_parquet(anac_download_dir, cig_prefix, anac_parquet_dir, anac_cig_schema, anac_parquet_partitions, csv_sep, dedup_keys=anac_dedup_keys)
+        print("Converted files:", converted)
+        logging.getLogger(__name__).info(f"Parquet conversion completed - Converted files: {converted}")
+        metrics_count(report, "files_converted", converted)
+        print()
+
+def steps_default() -> list:
+    """
+    Returns the steps enabled in the configuration (download always; verify, unzip, merge and parquet as per VERIFY_DO, ANAC_UNZIP_DO, MERGE_DO and ANAC_PARQUET_DO).
+
+    Parameters:
+        None
+
+    Returns:
+        list: the step names, in execution order.
+    """
+
+    dic_enabled = {"download": True, "verify": verify_do, "unzip": anac_unzip_do, "merge": MERGE_DO, "parquet": anac_parquet_do}
+    return [step for step in ANAC_STEPS if dic_enabled[step]]
+
 ### MAIN ###
 
 def main() -> None:
@@ -136,10 +427,15 @@ def main() -> None:
     Returns: None
     """
 
+    parser = argparse.ArgumentParser(description="Download, verify, unzip and merge the ANAC Open Data.")
+    parser.add_argument("--steps", nargs="+", choices=ANAC_STEPS, help="steps to be run, also if disabled in config.yml (default: the steps enabled in config.yml)")
+    args = parser.parse_args()
+    steps = [step for step in ANAC_STEPS if step in args.steps] if args.steps else steps_default()
+
     # Logging setup
     log_file = f"{Path(__file__).stem}.log"
     logging.basicConfig(
-        level=logging.INFO,
+        level=log_level,
         format='%(asctime)s - %(levelname)s - %(message)s',
         handlers=[
             logging.FileHandler(log_file),
@@ -147,6 +443,8 @@ def main() -> None:
         ]
     )
     logger = logging.getLogger(__name__)
+    report = metrics_start(__file__)
+    report["steps"] = steps
     
     print()
     print("*** PROGRAM START ***")
@@ -157,68 +455,23 @@ def main() -> None:
     start_time = datetime.now().replace(microsecond=0)
     print("Start process: " + str(start_time))
     logger.info(f"Start process: {start_time}")
+    print("Steps:", steps)
     print()
 
     print(">> Generating output directories")
     check_and_create_directory(anac_download_dir)
     check_and_create_directory(data_dir)
     print()
-    
-    print(">> Generating dynamic URLs")
-    url_base = read_urls_from_json(url_dynamic_file, "cig")
-    list_urls_din = url_generate(year_start, year_end, list_months, url_base, "cig")
-    list_urls_din_len = len(list_urls_din)
-    print("URLs generated (num):", list_urls_din_len)
-    print_list_urls(list_urls_din) # debug
-    print()
 
-    print(">> Generating dynamic URLs (others)")
-    url_base_others = read_urls_from_json(url_dynamic_file, "others")
-    list_urls_others_din = []
-    for dataset_name in anac_other_dataset_names:
-        list_urls_others_din.extend(
-            url_generate(year_start, year_end, list_months, url_base_others, dataset_name)
-        )
-    list_urls_others_din_len = len(list_urls_others_din)
-    print("URLs generated (num):", list_urls_others_din_len)
-    print_list_urls(list_urls_others_din) # debug
-    print()
-
-    print(">> Generating static URLs")
-    list_urls_sta = read_urls_from_json(url_statics_file, "others")
-    list_urls_sta_len = len(list_urls_sta)
-    print("URLs generated (num):", list_urls_sta_len)
-    print_list_urls(list_urls_sta) # debug
-    print()
-
-    print(">> Merging dynamic and static URLs lists")
-    list_urls_all = list_urls_din + list_urls_others_din + list_urls_sta
-    list_urls_all_len = len(list_urls_all)
-    print("URLs generated (all):", list_urls_all_len)
-    # print(list_urls_all) # debug
-    print()
-
-    print(">> Downloading from URLs")
-    print("Download directory:", anac_download_dir)
-    logger.info(f"Starting download from {list_urls_all_len} URLs")
-    dic_result = url_download(list_urls_all, anac_download_dir)
-    print("Download results")
-    print(dic_result)
-    logger.info(f"Download completed - Results: {dic_result}")
-    print()
+    dic_steps = {"download": step_download, "verify": step_verify, "unzip": step_unzip, "merge": step_merge, "parquet": step_parquet}
+    for step in steps:
+        dic_steps[step](report)
 
-    print(">> Unzipping files")
-    unzipped_files = url_unzip(anac_download_dir)
-    print("Unzipped files:", len(unzipped_files))
-    print()
-
-    if MERGE_DO == False:
-        print(">> Merging skipped as per configuration (MERGE_DO = False).")
-    else:
-        print(">> Merging files")
-        print("Prefix for merging:", cig_prefix)
-        lines_csv = merge_csv_files(anac_download_dir, data_dir, cig_prefix, merge_file)
-        print(f"Lines in the merged CSV file '{merge_file}' (with duplicates): {lines_csv}")
+    if "unzip" not in steps and anac_unzip_do == False:
+        print(">> Unzipping skipped as per configuration (ANAC_UNZIP_DO = False), CSV files are read from the archives.")
+        print()
+    if "merge" not in steps and MERGE_DO == False:
+        print(">> Merging skipped as per configuration (MERGE_DO = False): run 'python 00_od_pipeline.py' to update the merged file when needed.")
         print()
 
     # end
@@ -230,6 +483,10 @@ def main() -> None:
     print("Time to finish:", delta_time)
     logger.info(f"End process: {end_time}")
     logger.info(f"Time to finish: {delta_time}")
+    # a run of some of the steps (e.g., by 00_od_pipeline.py) has its own report
+    path_report = metrics_write(report, log_file if args.steps is None else f"{Path(__file__).stem}.{'-'.join(steps)}.log")
+    print("Run report:", path_report)
+    logger.info(f"Run report: {path_report}")
     print()
 
     print()
@@ -238,4 +495,4 @@ def main() -> None:
     print()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -6,14 +6,20 @@ Author: R. Nai
 Creation date: 10/01/2024
 Last modified: 01/03/2024 (added class SSLAdapter)
 Description: application to download data from ISTAT and Open BDAP website.
+
+[2026-10-17]: logging and per-stage metrics (time, bytes downloaded, download speed, peak RSS) written to a JSON run report next to the log file.
+[2026-10-17]: logging level from LOG_LEVEL: the URL lists and the per-file messages are shown only at the DEBUG level.
 """
 
 ### IMPORT ###
+import logging
 from datetime import datetime
+from pathlib import Path
 
 ### LOCAL IMPORT ###
 from config import config_reader
-from utility_manager.utilities import check_and_create_directory, read_urls_from_json, url_download, url_unzip, move_files
+from utility_manager.utilities import check_and_create_directory, read_urls_from_json, url_download, url_unzip, move_files, download_repair
+from utility_manager.metrics import metrics_start, metrics_stage, metrics_count, metrics_update, metrics_write
 
 ### GLOBALS ###
 yaml_config = config_reader.config_read_yaml("config.yml", "config")
@@ -21,6 +27,12 @@ yaml_config = config_reader.config_read_yaml("config.yml", "config")
 # INPUT
 istat_url_statics_file = str(yaml_config["ISTAT_STATIC_URLS_JSON"]) 
 bdap_url_statics_file = str(yaml_config["BDAP_STATIC_URLS_JSON"]) 
+download_workers = int(yaml_config.get("DOWNLOAD_WORKERS", 1))
+download_max_per_host = int(yaml_config.get("DOWNLOAD_MAX_PER_HOST", 4))
+unzip_workers = int(yaml_config.get("UNZIP_WORKERS", 1))
+verify_do = bool(yaml_config.get("VERIFY_DO", True))
+verify_workers = int(yaml_config.get("VERIFY_WORKERS", 0)) or None # None = number of CPUs
+log_level = str(yaml_config.get("LOG_LEVEL", "INFO")).upper() # DEBUG: detailed diagnostics
 
 # OUTPUT
 istat_download_dir = str(yaml_config["ISTAT_DOWNLOAD_DIR"]) 
@@ -40,12 +52,28 @@ def main() -> None:
     Returns: None
     """
 
+    # Logging setup
+    log_file = f"{Path(__file__).stem}.log"
+    logging.basicConfig(
+        level=log_level,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(log_file),
+            logging.StreamHandler()
+        ]
+    )
+    logger = logging.getLogger(__name__)
+    report = metrics_start(__file__)
+
     print()
     print("*** PROGRAM START ***")
     print()
 
+    logger.info("PROGRAM START")
+
     start_time = datetime.now().replace(microsecond=0)
     print("Start process: " + str(start_time))
+    logger.info(f"Start process: {start_time}")
     print()
 
     print(">> Generating output directories")
@@ -55,56 +83,83 @@ def main() -> None:
     check_and_create_directory(bdap_dir)
     print()
 
-    print(">> Generating static URLs - ISTAT")
-    istat_list_urls_sta = read_urls_from_json(istat_url_statics_file)
-    istat_list_urls_sta_len = len(istat_list_urls_sta)
-    print("URLs generated (num):", istat_list_urls_sta_len)
-    print(istat_list_urls_sta) # debug
-    print()
-
-    print(">> Generating static URLs - BDAP")
-    bdap_list_urls_sta = read_urls_from_json(bdap_url_statics_file)
-    bdap_list_urls_sta_len = len(bdap_list_urls_sta)
-    print("URLs generated (num):", bdap_list_urls_sta_len)
-    print(bdap_list_urls_sta) # debug
-    print()
-
-    print(">> Downloading from URLs - ISTAT")
-    print("Download directory:", istat_download_dir)
-    dic_result = url_download(istat_list_urls_sta, istat_download_dir)
-    print("Download results")
-    print(dic_result)
-    print()
-
-    print(">> Downloading from URLs - BDAP")
-    print("Download directory:", bdap_download_dir)
-    dic_result = url_download(bdap_list_urls_sta, bdap_download_dir)
-    print("Download results")
-    print(dic_result)
-    print()
-
-    print(">> Unzipping files")
-    print("Directory:", istat_download_dir)
-    unzipped_files = url_unzip(istat_download_dir)
-    print(f"Unzipped files in '{istat_download_dir}': {len(unzipped_files)}")
-    print("Directory:", bdap_download_dir)
-    unzipped_files = url_unzip(bdap_download_dir)
-    print(f"Unzipped files in '{bdap_download_dir}': {len(unzipped_files)}")
-    # print(unzipped_files) # debug
-    print()
-
-    print(">> Moving files")
-    filetype = "csv"
-    num_files = move_files(istat_download_dir, filetype, istat_dir)
-    print(f"Files with type '{filetype}' moved from {istat_download_dir} to {istat_dir}: {num_files}")
-    num_files = move_files(bdap_download_dir, filetype, bdap_dir)
-    print(f"Files with type '{filetype}' moved from {bdap_download_dir} to {bdap_dir}: {num_files}")
-    filetype = "xlsx"
-    num_files = move_files(istat_download_dir, filetype, istat_dir)
-    print(f"Files with type '{filetype}' moved from {istat_download_dir} to {istat_dir}: {num_files}")
-    num_files = move_files(bdap_download_dir, filetype, bdap_dir)
-    print(f"Files with type '{filetype}' moved from {bdap_download_dir} to {bdap_dir}: {num_files}")
-    print()
+    with metrics_stage(report, "urls"):
+        print(">> Generating static URLs - ISTAT")
+        istat_list_urls_sta = read_urls_from_json(istat_url_statics_file)
+        istat_list_urls_sta_len = len(istat_list_urls_sta)
+        print("URLs generated (num):", istat_list_urls_sta_len)
+        logger.debug(f"URLs: {istat_list_urls_sta}")
+        print()
+
+        print(">> Generating static URLs - BDAP")
+        bdap_list_urls_sta = read_urls_from_json(bdap_url_statics_file)
+        bdap_list_urls_sta_len = len(bdap_list_urls_sta)
+        print("URLs generated (num):", bdap_list_urls_sta_len)
+        logger.debug(f"URLs: {bdap_list_urls_sta}")
+        metrics_count(report, "urls", istat_list_urls_sta_len + bdap_list_urls_sta_len)
+        print()
+
+    with metrics_stage(report, "download_istat"):
+        print(">> Downloading from URLs - ISTAT")
+        print("Download directory:", istat_download_dir)
+        dic_result = url_download(istat_list_urls_sta, istat_download_dir, download_workers, download_max_per_host, refresh=True)
+        print("Download results")
+        print(dic_result)
+        logger.info(f"Download ISTAT completed - Results: {dic_result}")
+        metrics_update(report, dic_result)
+        print()
+
+    with metrics_stage(report, "download_bdap"):
+        print(">> Downloading from URLs - BDAP")
+        print("Download directory:", bdap_download_dir)
+        dic_result = url_download(bdap_list_urls_sta, bdap_download_dir, download_workers, download_max_per_host, refresh=True)
+        print("Download results")
+        print(dic_result)
+        logger.info(f"Download BDAP completed - Results: {dic_result}")
+        metrics_update(report, dic_result)
+        print()
+
+    if verify_do:
+        with metrics_stage(report, "verify"):
+            print(">> Verifying downloaded files")
+            for download_dir in [istat_download_dir, bdap_download_dir]:
+                dic_verify = download_repair(download_dir, download_workers, download_max_per_host, verify_workers)
+                print(f"Verification results in '{download_dir}': {dic_verify}")
+                logger.info(f"Verification of {download_dir} completed - Results: {dic_verify}")
+                metrics_update(report, dic_verify) # damaged files
+                metrics_update(report, dic_verify["refetch"]) # new downloads
+            print()
+
+    with metrics_stage(report, "unzip"):
+        print(">> Unzipping files")
+        print("Directory:", istat_download_dir)
+        unzipped_files = url_unzip(istat_download_dir, unzip_workers)
+        print(f"Unzipped files in '{istat_download_dir}': {len(unzipped_files)}")
+        metrics_count(report, "files_unzipped", len(unzipped_files))
+        print("Directory:", bdap_download_dir)
+        unzipped_files = url_unzip(bdap_download_dir, unzip_workers)
+        print(f"Unzipped files in '{bdap_download_dir}': {len(unzipped_files)}")
+        metrics_count(report, "files_unzipped", len(unzipped_files))
+        # print(unzipped_files) # debug
+        print()
+
+    with metrics_stage(report, "move"):
+        print(">> Moving files")
+        filetype = "csv"
+        num_files = move_files(istat_download_dir, filetype, istat_dir)
+        print(f"Files with type '{filetype}' moved from {istat_download_dir} to {istat_dir}: {num_files}")
+        metrics_count(report, "files_moved", num_files)
+        num_files = move_files(bdap_download_dir, filetype, bdap_dir)
+        print(f"Files with type '{filetype}' moved from {bdap_download_dir} to {bdap_dir}: {num_files}")
+        metrics_count(report, "files_moved", num_files)
+        filetype = "xlsx"
+        num_files = move_files(istat_download_dir, filetype, istat_dir)
+        print(f"Files with type '{filetype}' moved from {istat_download_dir} to {istat_dir}: {num_files}")
+        metrics_count(report, "files_moved", num_files)
+        num_files = move_files(bdap_download_dir, filetype, bdap_dir)
+        print(f"Files with type '{filetype}' moved from {bdap_download_dir} to {bdap_dir}: {num_files}")
+        metrics_count(report, "files_moved", num_files)
+        print()
     
     # end
     end_time = datetime.now().replace(microsecond=0)
@@ -113,10 +168,16 @@ def main() -> None:
     print()
     print("End process:", end_time)
     print("Time to finish:", delta_time)
+    logger.info(f"End process: {end_time}")
+    logger.info(f"Time to finish: {delta_time}")
+    path_report = metrics_write(report, log_file)
+    print("Run report:", path_report)
+    logger.info(f"Run report: {path_report}")
     print()
 
     print()
     print("*** PROGRAM END ***")
+    logger.info("PROGRAM END")
     print()
 
 if __name__ == "__main__":
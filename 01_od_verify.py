@@ -0,0 +1,97 @@
+# 01_od_verify.py
+
+"""
+Script name: 01_od_verify.py
+Author: R. Nai
+Creation date: 17/10/2026
+Last modified: 17/10/2026
+Description: standalone integrity check of the download directories (ANAC, ISTAT, Open BDAP).
+Every archive is CRC-tested, its size and sha256 are recorded in the directory manifest, and damaged files are quarantined and downloaded again.
+Usage: python 01_od_verify.py [download_dir ...] [--no-refetch]
+"""
+
+### IMPORT ###
+import argparse
+import logging
+from datetime import datetime
+from pathlib import Path
+
+### LOCAL IMPORT ###
+from config import config_reader
+from utility_manager.utilities import download_repair, verify_downloads
+
+### GLOBALS ###
+yaml_config = config_reader.config_read_yaml("config.yml", "config")
+download_dirs = [str(yaml_config["ANAC_DOWNLOAD_DIR"]), str(yaml_config["ISTAT_DOWNLOAD_DIR"]), str(yaml_config["BDAP_DOWNLOAD_DIR"])]
+download_workers = int(yaml_config.get("DOWNLOAD_WORKERS", 1))
+download_max_per_host = int(yaml_config.get("DOWNLOAD_MAX_PER_HOST", 4))
+verify_workers = int(yaml_config.get("VERIFY_WORKERS", 0)) or None # None = number of CPUs
+log_level = str(yaml_config.get("LOG_LEVEL", "INFO")).upper() # DEBUG: detailed diagnostics
+
+### MAIN ###
+
+def main() -> None:
+    """
+    Main script function.
+    Parameters: None
+    Returns: None
+    """
+
+    parser = argparse.ArgumentParser(description="Verify (and repair) the download directories.")
+    parser.add_argument("dirs", nargs="*", default=download_dirs, help="download directories to be verified (default: all the configured ones)")
+    parser.add_argument("--no-refetch", action="store_true", help="only verify and quarantine, do not download damaged files again")
+    args = parser.parse_args()
+
+    # Logging setup
+    log_file = f"{Path(__file__).stem}.log"
+    logging.basicConfig(
+        level=log_level,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(log_file),
+            logging.StreamHandler()
+        ]
+    )
+    logger = logging.getLogger(__name__)
+
+    print()
+    print("*** PROGRAM START ***")
+    print()
+
+    start_time = datetime.now().replace(microsecond=0)
+    print("Start process: " + str(start_time))
+    logger.info(f"Start process: {start_time}")
+    print()
+
+    for download_dir in args.dirs:
+        print(">> Verifying directory:", download_dir)
+        if not Path(download_dir).is_dir():
+            print(f"WARNING! Directory '{download_dir}' does not exist, skipping.\n")
+            continue
+        if args.no_refetch:
+            dic_damaged = verify_downloads(download_dir, verify_workers)
+            dic_verify = {"damaged": len(dic_damaged), "refetch": {}}
+        else:
+            dic_verify = download_repair(download_dir, download_workers, download_max_per_host, verify_workers)
+        print("Verification results")
+        print(dic_verify)
+        logger.info(f"Verification of {download_dir} completed - Results: {dic_verify}")
+        print()
+
+    # end
+    end_time = datetime.now().replace(microsecond=0)
+    delta_time = end_time - start_time
+
+    print()
+    print("End process:", end_time)
+    print("Time to finish:", delta_time)
+    logger.info(f"End process: {end_time}")
+    logger.info(f"Time to finish: {delta_time}")
+    print()
+
+    print()
+    print("*** PROGRAM END ***")
+    print()
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,38 @@
 # 02_anac_od_select.py
 
 """
-Script name: 01_istat_bdap_od_download.py
+Script name: 02_anac_od_select.py
 Author: R. Nai
 Creation date: 10/01/2024
 Last modified: 01/03/2024 (added class SSLAdapter)
 Description: selects data from the general dataset by filtering them on the basis of ANAC_OD_SELECT and ANAC_OD_REGION. It then applies a join to the PA data obtained from ANAC and Open BDAP.
+
+[2026-10-17]: logging and per-stage metrics (time, rows read and written, output size, peak RSS) written to a JSON run report next to the log file.
+[2026-10-17]: logging level from LOG_LEVEL: the previews, distinct values, NaN counts and filter values are computed and printed only at the DEBUG level.
 """
 
 ### IMPORT ###
+import argparse
+import logging
+import tempfile
+import numpy as np
 import pandas as pd
-import csv
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 
 ### LOCAL IMPORT ###
 from config import config_reader
-from utility_manager.utilities import json_to_list_dict, check_and_create_directory
+from utility_manager.utilities import json_to_list_dict, check_and_create_directory, csv_sources
+from utility_manager.parquet_store import read_parquet_store
+from utility_manager.pa_registry import pa_registry_load, pa_registry_join
+from utility_manager.anac_schema import schema_read_args, schema_apply, memory_report
+from utility_manager.transforms import apply_transforms
+from utility_manager.dedup import dedup_rows
+from utility_manager.output_writer import output_write, output_path, arrow_import, date_formats_update, CSV_COMPRESSIONS
+from utility_manager.spill import spill_write, spill_close, spill_read, spill_parts, spill_partition, spill_split, spill_groups
+from utility_manager.metrics import metrics_start, metrics_stage, metrics_count, metrics_write
+from utility_manager.select_state import config_fingerprint, source_signatures, state_read, state_write, state_clear, seen_keys_read, select_plan, csv_append, csv_patch, SELECT_STATE
 
 ### GLOBALS ###
 yaml_config = config_reader.config_read_yaml("config.yml", "config")
@@ -29,59 +45,178 @@ year_end = int(yaml_config["YEAR_END_DOWNLOAD"])
 # Registry
 pa_reg_dir = str(yaml_config["OD_BDAP_DIR"])
 pa_reg_file = str(yaml_config["OD_BDAP_FILE"])
-pa_reg_columns = list(yaml_config["PA_REG_SCHEMA"])
-pa_reg_dict = dict(yaml_config["PA_REG_SCHEMA"])
+pa_reg_columns = list(yaml_config["OD_BDAP__SCHEMA"])
+pa_reg_dict = dict(yaml_config["OD_BDAP__SCHEMA"])
+pa_reg_sep = str(yaml_config.get("OD_BDAP_CSV_SEP", ","))
 
 # INPUT
 data_file = f"bando_cig_{year_start}-{year_end}.csv" # starting file with all the tenders following years
 data_dir = str(yaml_config["OD_ANAC_DIR"])
+anac_download_dir = str(yaml_config["ANAC_DOWNLOAD_DIR"])
+cig_prefix = str(yaml_config["CIG_PREFIX"])
+anac_read_from_zip = bool(yaml_config.get("ANAC_READ_FROM_ZIP", False)) # read the monthly archives instead of the merged CSV file
+anac_read_chunksize = int(yaml_config.get("ANAC_READ_CHUNKSIZE", 0)) # rows per chunk when reading the CSV files (0 = whole file at once)
+anac_cig_schema = dict(yaml_config["ANAC_CIG_SCHEMA"])
+anac_memory_report_do = bool(yaml_config.get("ANAC_MEMORY_REPORT_DO", False))
+anac_parquet_do = bool(yaml_config.get("ANAC_PARQUET_DO", False)) # read the Parquet store instead of the CSV files
+anac_parquet_dir = str(yaml_config.get("ANAC_PARQUET_DIR", ""))
+anac_parquet_partitions = list(yaml_config.get("ANAC_PARQUET_PARTITIONS", []))
+anac_dedup_keys = list(yaml_config.get("ANAC_DEDUP_KEYS", []) or []) # deduplication keys (empty = whole row)
+anac_incremental_do = bool(yaml_config.get("ANAC_INCREMENTAL_DO", False)) # process only the new monthly sources (requires ANAC_READ_FROM_ZIP and ANAC_DEDUP_KEYS)
+anac_transforms = dict(yaml_config.get("ANAC_TRANSFORMS", {})) # transformation rules ('clean' and 'regional')
+anac_memory_budget_mb = int(yaml_config.get("ANAC_MEMORY_BUDGET_MB", 0) or 0) # memory budget of the partitioned mode (0 = in-memory run)
 
 # OUTPUT
 anac_stats_dir = str(yaml_config["ANAC_STATS_DIR"])
 anac_stats_file = str(yaml_config["ANAC_STATS_FILE"])
+anac_memory_report_file = str(yaml_config.get("ANAC_MEMORY_REPORT_FILE", "anac_memory_report.csv"))
+output_format = str(yaml_config.get("OUTPUT_FORMAT", "csv")) # csv, csv.gz, csv.zst, parquet or feather
+output_compression = yaml_config.get("OUTPUT_COMPRESSION") # compression of the parquet and feather outputs (None = default)
+output_csv_engine = str(yaml_config.get("OUTPUT_CSV_ENGINE", "auto")) # CSV writer: auto, arrow or pandas
+output_write_workers = max(1, int(yaml_config.get("OUTPUT_WRITE_WORKERS", 1))) # output files written concurrently
+log_level = str(yaml_config.get("LOG_LEVEL", "INFO")).upper() # DEBUG: detailed diagnostics (previews, distinct values, NaN counts)
 list_stats = []
+run_report = metrics_start(__file__) # run metrics (see utility_manager/metrics.py)
+
+SORT_COLS = ['anno_pubblicazione', 'cig'] # sort of the outputs with BDAP
+SELECT_MEMORY_FACTOR = 6 # partitioned mode: memory used to process a partition (or a chunk) / its size
+SELECT_ROW_BYTES = 1024 # partitioned mode: estimated size of a row being read
+SELECT_MAX_PREFIX = 4 # partitioned mode: longest CIG prefix of a partition (partitions larger than the budget are split by a longer prefix)
 
 ### FUNCTIONS ###
-def read_anac_data(path: str, col_list: list, col_type:dict, csv_sep: str = ";") -> pd.DataFrame:
+def read_anac_data(path, col_list: list, col_type:dict, csv_sep: str = ";", filter_dnf: list = None, chunksize: int = 0, schema: dict = None, dedup_keys: list = None, seen=None) -> tuple:
     """
     Reads data from a CSV file into a pandas DataFrame with specified columns and data types.
+    A list of paths can be given instead of a single path: each source (.csv or single-CSV .zip archive, read without extracting it) is read and the results are concatenated.
+    With 'chunksize', the file is parsed in chunks and the rows not matching 'filter_dnf' are dropped chunk by chunk, so they are never held in memory.
+    With 'dedup_keys', a row is dropped if its key was already seen in an earlier row (of any source, before filtering); otherwise duplicated rows are dropped at the end.
 
     Parameters:
-        path (str): the file path to the CSV file to be read.
+        path (str | list): the file path to the CSV file to be read, or a list of .csv/.zip paths.
         columns (list): a list of column names to be read from the CSV file.
         sep (str): the delimiter string used in the CSV file. Defaults to ';'.
+        filter_dnf (list, optional): the rows to be kept, in disjunctive normal form (see filters_to_dnf); None keeps every row.
+        chunksize (int): the number of rows per chunk (0 = whole file at once).
+        schema (dict, optional): the ANAC schema, applied to the result (date parsing, categories of the concatenated chunks).
+        dedup_keys (list, optional): the key columns of the deduplication (see utility_manager/dedup.py).
+        seen (np.ndarray, optional): the seen-key set of the rows read before (e.g., by a previous run).
 
     Returns:
-        pd.DataFrame: a pandas DataFrame containing the data read from the CSV file.
+        tuple: a pandas DataFrame containing the data read from the CSV file and the updated seen-key set (None without 'dedup_keys').
     """
 
-    df = pd.read_csv(path, usecols=col_list, dtype=col_type, sep=csv_sep, low_memory=False)
-    df = df.drop_duplicates()
-    return df
-
-def read_pa_data(path: str, col_list: list, col_type: dict):
+    dic_dedup = {"seen": seen, "duplicated": 0}
+    list_df = list(read_anac_chunks(path, col_list, col_type, csv_sep, filter_dnf, chunksize, dedup_keys, dic_dedup))
+    df = pd.concat(list_df, ignore_index=True) if len(list_df) > 1 else list_df[0]
+    if schema is not None:
+        df = schema_apply(df, schema)
+    if dedup_keys:
+        print(f"Rows with a duplicated key {dedup_keys}: {dic_dedup['duplicated']}")
+    else:
+        df = df.drop_duplicates()
+    return df, dic_dedup["seen"]
+
+def read_anac_chunks(path, col_list: list, col_type: dict, csv_sep: str = ";", filter_dnf: list = None, chunksize: int = 0, dedup_keys: list = None, dic_dedup: dict = None):
     """
-    Reads an XLSX file and converts specific columns to 'object' type.
+    Reads the CSV sources chunk by chunk (see read_anac_data), dropping the rows not matching 'filter_dnf' and, with 'dedup_keys', the rows with a key already seen.
 
-    Parameters:    
-        path (str): the file path to the XLSX file to be read.
+    Parameters:
+        path (str | list): the file path to the CSV file to be read, or a list of .csv/.zip paths.
         col_list (list): a list of column names to be read from the CSV file.
-        col_type (dict): a dictionary mapping column names to their respective data types.    
+        col_type (dict): the dtype mapping of the columns.
+        csv_sep (str): the delimiter string used in the CSV file. Defaults to ';'.
+        filter_dnf (list, optional): the rows to be kept, in disjunctive normal form (see filters_to_dnf); None keeps every row.
+        chunksize (int): the number of rows per chunk (0 = whole file at once).
+        dedup_keys (list, optional): the key columns of the deduplication (see utility_manager/dedup.py).
+        dic_dedup (dict, optional): the seen-key set ("seen") and the number of rows with a duplicated key ("duplicated"), updated while reading.
+
+    Yields:
+        pd.DataFrame: the kept rows of each chunk, in read order.
+    """
+
+    list_path = path if isinstance(path, list) else [path]
+    for path_source in list_path:
+        print(f"Reading: {path_source}")
+        if chunksize > 0:
+            reader = pd.read_csv(path_source, usecols=col_list, dtype=col_type, sep=csv_sep, low_memory=False, chunksize=chunksize)
+        else:
+            reader = [pd.read_csv(path_source, usecols=col_list, dtype=col_type, sep=csv_sep, low_memory=False)]
+        rows_read = 0
+        for df_chunk in reader:
+            rows_read += len(df_chunk)
+            metrics_count(run_report, "rows_read", len(df_chunk))
+            mask = filter_mask(df_chunk, filter_dnf).to_numpy()
+            if dedup_keys:
+                mask_new, dic_dedup["seen"] = dedup_rows(df_chunk, dedup_keys, dic_dedup["seen"])
+                dic_dedup["duplicated"] += int((~mask_new).sum())
+                mask &= mask_new
+            yield df_chunk[mask]
+        print(f"Rows read: {rows_read}")
+
+def filter_mask(df: pd.DataFrame, filter_dnf: list) -> pd.Series:
+    """
+    Computes the rows of a DataFrame matching a predicate in disjunctive normal form (see filters_to_dnf).
+
+    Parameters:
+        df (pd.DataFrame): the DataFrame to be checked.
+        filter_dnf (list): a list of lists of (column, "in", values) tuples; None matches every row.
 
     Returns:
-        pandas.DataFrame: The DataFrame with specified columns converted to 'object' type.
+        pd.Series: a boolean mask of the matching rows.
     """
 
-    df = pd.read_excel(path, usecols=col_list, dtype=col_type)
-    df = df.drop_duplicates()
-    print_details(df, "Initial PA registry")
+    if not filter_dnf:
+        return pd.Series(True, index=df.index)
+    mask = pd.Series(False, index=df.index)
+    for conjunction in filter_dnf:
+        mask_conjunction = pd.Series(True, index=df.index)
+        for key, _, values in conjunction:
+            mask_conjunction &= df[key].isin(values)
+        mask |= mask_conjunction
+    return mask
+
+def filters_to_dnf(filter_lists: list, col_list: list) -> list:
+    """
+    Converts filter lists (as used by filter_data) into a predicate in disjunctive normal form: a row is kept if it matches all the filters of at least one list.
 
-    # Return the DataFrame with specified columns converted to 'object' type
-    return df
+    Parameters:
+        filter_lists (list): a list of filter lists (each one a list of {column: [values]} dict).
+        col_list (list): the available columns (filters on other columns are ignored, as in filter_data).
+
+    Returns:
+        list: a list of lists of (column, "in", values) tuples, or None if at least one filter list keeps every row.
+    """
+
+    dnf = []
+    for filter_list in filter_lists:
+        conjunction = [(key, "in", list(values)) for filter_dict in filter_list for key, values in filter_dict.items() if key in col_list and len(values) > 0]
+        if not conjunction:
+            return None # no constraint: every row is needed
+        dnf.append(conjunction)
+    return dnf
+
+def distinct_values(series: pd.Series):
+    """
+    Returns the distinct values of a column. For a categorical column they are read from the category codes
+    (the categories in use), without comparing the values of the rows.
+
+    Parameters:
+        series (pd.Series): the column.
+
+    Returns:
+        array-like: the distinct values (for a categorical column, in the order of the categories).
+    """
+
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        categories = series.cat.categories
+        used = np.bincount(series.cat.codes.to_numpy().astype(np.intp) + 1, minlength=len(categories) + 1) > 0 # code -1 = missing value
+        values = categories[used[1:]].to_numpy()
+        return np.append(values, np.nan) if used[0] else values
+    return series.unique()
 
 def print_details(df: pd.DataFrame, title: str) -> None:
     """
-    Prints details of a pandas DataFrame, including its size and a preview of its contents,
+    Prints details of a pandas DataFrame: its size and, at the DEBUG logging level (see LOG_LEVEL), a preview of its contents,
     along with any available information on publication years and regions if present in the DataFrame.
 
     Parameters:
@@ -94,15 +229,12 @@ def print_details(df: pd.DataFrame, title: str) -> None:
 
     print(f">> {title}")
     print(f"Dataframe size: {df.shape}\n")
+    if not logging.getLogger(__name__).isEnabledFor(logging.DEBUG):
+        return
     # ANAC
-    if "anno_pubblicazione" in df.columns:
-        print(f"anno_pubblicazione distinct values: {df['anno_pubblicazione'].unique()}\n")
-    if "sezione_regionale" in df.columns:
-        print(f"sezione_regionale distinct values: {df['sezione_regionale'].unique()}\n")
-    if "oggetto_principale_contratto" in df.columns:
-        print(f"oggetto_principale_contratto distinct values: {df['oggetto_principale_contratto'].unique()}\n")
-    if "settore" in df.columns:
-        print(f"settore distinct values: {df['settore'].unique()}\n")
+    for col in ["anno_pubblicazione", "sezione_regionale", "oggetto_principale_contratto", "settore"]:
+        if col in df.columns:
+            print(f"{col} distinct values: {distinct_values(df[col])}\n")
     print(f"{title} dataframe preview:")
     print(df.head(), "\n\n")
     print(df.columns, "\n\n")
@@ -123,11 +255,13 @@ def filter_data(df: pd.DataFrame, filter_list: list) -> pd.DataFrame:
 
     # Filter
 
+    details = logging.getLogger(__name__).isEnabledFor(logging.DEBUG)
     for filter_data in filter_list:
         for key, key_value_list in filter_data.items():
-            print(f"Key: {key}")
-            print(f"Value: {key_value_list}")
-            print()
+            if details:
+                print(f"Key: {key}")
+                print(f"Value: {key_value_list}")
+                print()
             if key in df.columns:
                 if len(key_value_list) > 0:
                     df = df[df[key].isin(key_value_list)]
@@ -135,123 +269,263 @@ def filter_data(df: pd.DataFrame, filter_list: list) -> pd.DataFrame:
     # filtered_df = df.copy()
     return df
 
-def clean_data(df: pd.DataFrame,) -> pd.DataFrame:
-    # Clean
-    df['sezione_regionale'] = df['sezione_regionale'].str.replace("SEZIONE REGIONALE ", "", regex=False)
-    df['settore'] = df['settore'].str.replace("SETTORI ", "", regex=False)
-    # CPV division
-    df['cpv_division'] = df['cod_cpv'].apply(lambda x: x[:2] if pd.notnull(x) and x != '' else '')
+def clean_data(df: pd.DataFrame, rules: list) -> pd.DataFrame:
+    """
+    Cleans the data with the transformation rules (see utility_manager/transforms.py) and sorts it by year of publication and CIG.
+
+    Parameters:
+        df (pd.DataFrame): the DataFrame to be cleaned.
+        rules (list): the transformation rules.
+
+    Returns:
+        pd.DataFrame: the cleaned DataFrame.
+    """
+
+    df = apply_transforms(df, rules)
     # Order
-    df = df.sort_values(by=['anno_pubblicazione', 'cig'])
+    df = df.sort_values(by=SORT_COLS, kind="stable")
     return df
 
 def save_data(df: pd.DataFrame, path: str, sep: str = ",") -> None:
     """
-    Saves a pandas DataFrame to a CSV file at the specified path, using the specified delimiter.
+    Saves a pandas DataFrame to a file at the specified path, in the output format (OUTPUT_FORMAT), using the specified delimiter for the CSV formats.
 
     Parameters:
         df (pd.DataFrame): the DataFrame to be saved.
-        path (str): the file path where the CSV file will be saved.
+        path (str): the file path where the file will be saved (see output_path).
         sep (str, optional): the delimiter string to be used in the CSV file. Defaults to ','.
 
     Returns:
         None
     """
 
-    df.to_csv(path, sep=sep, index=False, quoting=csv.QUOTE_ALL)
-    print(f"Data saved to: {path}\n\n")
+    writer = output_write(df, path, output_format, sep, output_csv_engine, output_compression)
+    print(f"Data saved to: {path} ({writer})\n\n")
 
-def merge_dataframes(df1, df2, common_field_df1, common_field_df2, columns_to_drop=None):
+def save_output(df: pd.DataFrame, path: str, sep: str = ",", incremental: bool = False, sort_cols: list = None) -> None:
     """
-    Merge two dataframes based on common fields, rename the common field, and create a new column 'pa_type'.
-    Then drops specified columns.
+    Saves an output: the whole DataFrame, or only the new rows of an incremental run (appended, or merged in the sort order of a sorted output).
 
-    Args:
-        df1 (pandas.DataFrame): First DataFrame.
-        df2 (pandas.DataFrame): Second DataFrame.
-        common_field_df1 (str): Common field in the first DataFrame.
-        common_field_df2 (str): Common field in the second DataFrame.
-        columns_to_drop (list): List of column names to drop.
+    Parameters:
+        df (pd.DataFrame): the DataFrame (the new rows, in an incremental run).
+        path (str): the file path of the output.
+        sep (str, optional): the delimiter string to be used in the CSV file. Defaults to ','.
+        incremental (bool): whether the run is incremental.
+        sort_cols (list, optional): the sort columns of the output (None for an unsorted output).
 
     Returns:
-        pandas.DataFrame: Merged DataFrame with the new column 'pa_type' and specified columns dropped.
+        None
     """
-    # Merge the dataframes based on the common fields
-    merged_df = pd.merge(df1, df2, left_on=common_field_df1, right_on=common_field_df2, how='inner')
 
-    # Rename the common field to 'cf_pa'
-    merged_df.rename(columns={common_field_df1: 'cf_pa'}, inplace=True)
+    if not incremental:
+        save_data(df, path, sep)
+    elif sort_cols:
+        csv_patch(df, path, sort_cols, sep, output_csv_engine)
+    else:
+        csv_append(df, path, sep, output_csv_engine)
 
-    # Create new column 'pa_type' based on 'Descr_Tipologia_SIOPE' or 'Descr_Tipologia_MIUR'
-    merged_df['pa_type'] = merged_df['Descr_Tipologia_SIOPE'].fillna(merged_df['Descr_Tipologia_MIUR'])
+def partition_keys(df: pd.DataFrame, prefix_len: int = 1) -> pd.Series:
+    """
+    Computes the partition keys of the partitioned mode: the year of publication and the first characters of the CIG.
+    The keys sort as the outputs with BDAP (SORT_COLS, missing values last), so the partitions can be processed and appended in key order.
 
-    # Drop specified columns if provided
-    if columns_to_drop:
-        merged_df.drop(columns=columns_to_drop, inplace=True)
+    Parameters:
+        df (pd.DataFrame): the DataFrame.
+        prefix_len (int): the number of characters of the CIG.
+
+    Returns:
+        pd.Series: the keys (text).
+    """
 
-    return merged_df
+    year = ("0" + df['anno_pubblicazione'].astype("string")).fillna("1")
+    cig = ("0" + df['cig'].astype("string").str[:prefix_len]).fillna("1")
+    return year + "\x00" + cig
 
-def convert_columns_to_lowercase(df: pd.DataFrame, columns_to_modify:list) -> pd.DataFrame:
+def partition_plan(spill_dir: str, dic_parts: dict, dic_bytes: dict, max_bytes: int, prefix_len: int = 1) -> list:
     """
-    Converts the text of specified columns in a DataFrame to lowercase.
-    
+    Orders the partitions by key and splits the ones larger than 'max_bytes' by a longer CIG prefix (up to SELECT_MAX_PREFIX characters).
+
     Parameters:
-        df (pd.DataFrame): The DataFrame to operate on.
-        columns_to_modify (list of str): List of the names of the columns to be converted to lowercase.
+        spill_dir (str): the spill directory.
+        dic_parts (dict): the partition name of each key (see partition_keys).
+        dic_bytes (dict): the size of each partition in memory (updated by the splits).
+        max_bytes (int): the maximum size of a partition.
+        prefix_len (int): the number of characters of the CIG in the keys.
 
     Returns:
-        pd.Dataframe
+        list: the partition names, in output order.
     """
 
-    for col in columns_to_modify:
-        if col in df.columns:  # Checks if the column exists in the DataFrame
-            if columns_to_modify == 'sezione_regionale':
-                df[col] = df[col].str.capitalize()
-            else:
-                df[col] = df[col].str.lower()
+    list_plan = []
+    for key in sorted(dic_parts):
+        name = dic_parts[key]
+        if dic_bytes[name] > max_bytes and prefix_len < SELECT_MAX_PREFIX:
+            dic_split = spill_split(spill_dir, name, lambda df: partition_keys(df, prefix_len + 1), dic_bytes, max_bytes)
+            list_plan += partition_plan(spill_dir, dic_split, dic_bytes, max_bytes, prefix_len + 1)
         else:
-            print(f"The column '{col}' does not exist in the DataFrame.")
+            list_plan.append(name)
+    return list_plan
 
-    return df
+def save_part(df: pd.DataFrame, path: str, sep: str, written: set, date_formats: dict = None) -> None:
+    """
+    Saves a part of an output of the partitioned mode: the first part is written with the header, the next ones are appended.
 
-### MAIN ###
+    Parameters:
+        df (pd.DataFrame): the part.
+        path (str): the file path of the output.
+        sep (str): the delimiter string to be used in the CSV file.
+        written (set): the outputs already written (updated).
+        date_formats (dict, optional): the format of the date columns of the whole output (see date_formats_update).
 
-def main():
-    print()
-    print("*** PROGRAM START ***")
-    print()
+    Returns:
+        None
+    """
 
-    start_time = datetime.now().replace(microsecond=0)
-    print("Start process: " + str(start_time))
-    print()
-    print()
+    if str(path) in written and len(df) == 0:
+        return
+    output_write(df, path, output_format, sep, output_csv_engine, output_compression, append=str(path) in written, date_formats=date_formats)
+    written.add(str(path))
+    metrics_count(run_report, "rows_written", len(df))
 
-    print(">> Generating output directories")
-    check_and_create_directory(data_dir)
-    check_and_create_directory(anac_stats_dir)
-    print()
+def select_partitioned(path_anac_od, filter_list: list, regions_list: list, df_pa_registry: pd.DataFrame, read_filters: list, memory_budget_mb: int) -> tuple:
+    """
+    Selects the data in the partitioned mode, within a memory budget: the outputs are the same as the in-memory run, written in parts.
+    1. The sources are read in chunks sized on the budget. The rows of the generic filter are spilled to disk in read order; the rows joined
+       with BDAP and needed by the generic filter or by a region are spilled by year of publication and CIG prefix (see partition_keys).
+    2. The partitions are cleaned and sorted in key order, in groups within the budget, and appended to the outputs: the concatenation
+       is sorted as a whole. The date columns keep the format of the whole output (see date_formats_update).
+    Without deduplication keys, the duplicated rows are found by a hash of the whole row, instead of pandas drop_duplicates.
+    The two steps are the "read" and "select" stages of the run report.
 
-    print(">> Reading ANAC filter JSON")
-    print("File:", anac_odfilter_json)
-    filter_list = json_to_list_dict(anac_odfilter_json)
-    filter_list_len = len(filter_list)
-    print("Filters found in JSON:", filter_list_len)
-    print(filter_list)
-    print()
+    Parameters:
+        path_anac_od (Path | list): the CSV sources (see read_anac_data).
+        filter_list (list): the generic filter.
+        regions_list (list): the regions.
+        df_pa_registry (pd.DataFrame): the PA registry.
+        read_filters (list): the rows kept while reading (see filters_to_dnf).
+        memory_budget_mb (int): the memory budget (MB).
 
-    print(">> Reading ANAC regions JSON")
-    print("File:", anac_regions_json)
-    regions_list = json_to_list_dict(anac_regions_json)
-    regions_list_len = len(regions_list)
-    print("Regions found in JSON:", regions_list_len)
-    print(regions_list)
+    Returns:
+        tuple: the seen-key set (None without ANAC_DEDUP_KEYS) and the paths of the outputs.
+    """
+
+    schema_cols, schema_type, _ = schema_read_args(anac_cig_schema)
+    budget = memory_budget_mb * 1024 ** 2
+    chunksize = max(1000, budget // (SELECT_MEMORY_FACTOR * SELECT_ROW_BYTES))
+    if anac_read_chunksize > 0:
+        chunksize = min(chunksize, anac_read_chunksize)
+    max_bytes = budget // SELECT_MEMORY_FACTOR
+    print(f"Memory budget: {memory_budget_mb} MB (rows per chunk: {chunksize}, partition size: {max_bytes / 1024 ** 2:.1f} MB)")
+
+    regions_filter = [region_dic[next(iter(region_dic))] for region_dic in regions_list]
+    path_filtered = output_path(Path(data_dir) / f"bando_cig_{year_start}-{year_end}_filtered.csv", output_format)
+    path_bdap = output_path(Path(data_dir) / f"bando_cig_{year_start}-{year_end}_filtered_bdap.csv", output_format)
+    list_outputs = [str(path_filtered), str(path_bdap)]
+    list_outputs += [str(output_path(Path(data_dir) / f"bando_cig_{year_start}-{year_end}_{next(iter(region_dic))}.csv", output_format)) for region_dic in regions_list]
+
+    dic_dedup = {"seen": None, "duplicated": 0}
+    seen_rows = None # hashes of the whole rows, without deduplication keys
+    dic_formats_filtered, dic_formats_bdap, dic_formats_regions = {}, {}, {}
+    dic_writers_filtered, dic_writers, dic_parts, dic_bytes = {}, {}, {}, {}
+    df_empty = None
+    with tempfile.TemporaryDirectory(prefix="select_spill_", dir=data_dir) as spill_dir:
+        with metrics_stage(run_report, "read"):
+            print(">> Partitioning (1 - reading and spilling)")
+            try:
+                for df_chunk in read_anac_chunks(path_anac_od, schema_cols, schema_type, csv_sep, read_filters, chunksize, anac_dedup_keys, dic_dedup):
+                    df_chunk = schema_apply(df_chunk.copy(deep=False), anac_cig_schema)
+                    if not anac_dedup_keys:
+                        mask_new, seen_rows = dedup_rows(df_chunk, list(df_chunk.columns), seen_rows)
+                        dic_dedup["duplicated"] += int((~mask_new).sum())
+                        df_chunk = df_chunk[mask_new]
+                    if df_empty is None:
+                        df_empty = df_chunk.iloc[0:0]
+                    # Generic filter without BDAP (read order)
+                    df_filtered = df_chunk[filter_mask(df_chunk, filters_to_dnf([filter_list], df_chunk.columns)).to_numpy()]
+                    date_formats_update(dic_formats_filtered, df_filtered)
+                    if len(df_filtered) > 0:
+                        spill_write(dic_writers_filtered, spill_dir, "filtered", df_filtered)
+                    # Merge with BDAP: the rows of the generic filter (flag '_bdap') or of a region
+                    df_merged = pa_registry_join(df_chunk, df_pa_registry, 'cf_amministrazione_appaltante')
+                    mask_bdap = filter_mask(df_merged, filters_to_dnf([filter_list], df_merged.columns)).to_numpy()
+                    mask_regions = df_merged['sezione_regionale'].isin(regions_filter).to_numpy()
+                    date_formats_update(dic_formats_bdap, df_merged[mask_bdap])
+                    for region_filter, df_region in df_merged[mask_regions].groupby('sezione_regionale', sort=False, observed=True):
+                        date_formats_update(dic_formats_regions.setdefault(region_filter, {}), df_region)
+                    df_merged = df_merged[mask_bdap | mask_regions].assign(_bdap=mask_bdap[mask_bdap | mask_regions])
+                    spill_partition(dic_writers, spill_dir, "part", df_merged, partition_keys(df_merged), dic_parts, dic_bytes)
+            finally:
+                spill_close(dic_writers_filtered)
+                spill_close(dic_writers)
+            if anac_dedup_keys:
+                print(f"Rows with a duplicated key {anac_dedup_keys}: {dic_dedup['duplicated']}")
+            else:
+                print(f"Duplicated rows: {dic_dedup['duplicated']}")
+            if df_empty is None:
+                df_empty = schema_apply(pd.DataFrame({col: pd.Series(dtype=schema_type.get(col, object)) for col in schema_cols}), anac_cig_schema)
+            print(f"Partitions: {len(dic_parts)} ({sum(dic_bytes.values()) / 1024 ** 2:.1f} MB)")
+            print()
+
+        with metrics_stage(run_report, "select"):
+            print(">> Partitioning (2 - saving the outputs)")
+            written = set()
+            rows_filtered = 0
+            for df_part in spill_parts(spill_dir, "filtered", max_bytes):
+                save_part(schema_apply(df_part, anac_cig_schema), path_filtered, csv_sep, written, dic_formats_filtered)
+                rows_filtered += len(df_part)
+            save_part(df_empty, path_filtered, csv_sep, written)
+            print(f"Data filtered (1 - generic) without BDAP: {rows_filtered} rows saved to: {path_filtered}")
+
+            list_groups = spill_groups(partition_plan(spill_dir, dic_parts, dic_bytes, max_bytes), dic_bytes, max_bytes)
+            df_merged_empty = pa_registry_join(df_empty, df_pa_registry, 'cf_amministrazione_appaltante').assign(_bdap=False)
+            dic_sizes = {"all": 0}
+            for i, names in enumerate(list_groups or [None]):
+                df_merged = schema_apply(spill_read(spill_dir, names), anac_cig_schema) if names else df_merged_empty
+                print(f"[{i + 1} / {max(1, len(list_groups))}] partitions: {len(names or [])}, rows: {len(df_merged)}")
+                # Generic filter (1) with BDAP
+                df_filtered_1_clean = clean_data(df_merged[df_merged['_bdap'].to_numpy()].drop(columns="_bdap"), anac_transforms.get("clean", []))
+                save_part(df_filtered_1_clean, path_bdap, csv_sep, written, dic_formats_bdap)
+                dic_sizes["all"] += len(df_filtered_1_clean)
+                # Regions (2)
+                merged_regions = df_merged[df_merged['sezione_regionale'].isin(regions_filter).to_numpy()].drop(columns="_bdap")
+                region_partition_key = merged_regions['sezione_regionale'].copy() # original values, before the transformations
+                merged_regions = apply_transforms(merged_regions, anac_transforms.get("regional", []))
+                df_regions_clean = clean_data(merged_regions, anac_transforms.get("clean", []))
+                dic_regions = {region_filter: df_region for region_filter, df_region in df_regions_clean.groupby(region_partition_key, sort=False, observed=True)}
+                for region_dic, path_region in zip(regions_list, list_outputs[2:]):
+                    region_output = next(iter(region_dic))
+                    df_filtered_2_clean = dic_regions.get(region_dic[region_output], df_regions_clean.iloc[0:0])
+                    save_part(df_filtered_2_clean, path_region, csv_sep, written, dic_formats_regions.get(region_dic[region_output]))
+                    dic_sizes[region_output] = dic_sizes.get(region_output, 0) + len(df_filtered_2_clean)
+                del df_merged, df_filtered_1_clean, merged_regions, df_regions_clean, dic_regions
+    print(f"Data filtered with BDAP (1 - generic) saved to: {path_bdap}")
+    print(f"Data filtered (2 - by region) saved to: {list_outputs[2:]}")
     print()
 
-    print(">> Reading initial ANAC Open Data")
-    path_anac_od = Path(data_dir) / data_file
-    schema_cols = ["cig","cig_accordo_quadro","numero_gara","oggetto_gara","importo_complessivo_gara","n_lotti_componenti","oggetto_lotto","importo_lotto","oggetto_principale_contratto","stato","settore","luogo_istat","provincia","data_pubblicazione","data_scadenza_offerta","cod_tipo_scelta_contraente","tipo_scelta_contraente","cod_modalita_realizzazione","modalita_realizzazione","codice_ausa","cf_amministrazione_appaltante","denominazione_amministrazione_appaltante","sezione_regionale","id_centro_costo","denominazione_centro_costo","anno_pubblicazione","mese_pubblicazione","cod_cpv","descrizione_cpv","flag_prevalente"]
-    schema_type = {"cig":object,"cig_accordo_quadro":object, "anno_pubblicazione":object}
-    df_anac = read_anac_data(path_anac_od, schema_cols, schema_type, csv_sep)
+    list_stats.append({"region": "all", "size": dic_sizes["all"]})
+    for region_dic in regions_list:
+        region_output = next(iter(region_dic))
+        list_stats.append({"region": region_output, "size": dic_sizes[region_output]})
+    return dic_dedup["seen"], list_outputs
+
+def select_in_memory(df_anac: pd.DataFrame, filter_list: list, regions_list: list, df_pa_registry: pd.DataFrame, incremental: bool, state: dict) -> list:
+    """
+    Selects the data in memory: filters the ANAC data, joins it with BDAP once and saves the outputs (written concurrently, while the next ones are computed).
+
+    Parameters:
+        df_anac (pd.DataFrame): the ANAC data (the rows needed by the generic filter or by a region).
+        filter_list (list): the generic filter.
+        regions_list (list): the regions.
+        df_pa_registry (pd.DataFrame): the PA registry.
+        incremental (bool): whether the run is incremental (the rows are added to the outputs of the previous run).
+        state (dict): the state of the previous run (see utility_manager/select_state.py).
+
+    Returns:
+        list: the paths of the outputs.
+    """
+
+    regions_list_len = len(regions_list)
+    print(f"Memory usage: {df_anac.memory_usage(deep=True).sum() / 1024 ** 2:.1f} MB")
     print_details(df_anac, "Initial ANAC Open Data")
     print()
     
@@ -263,44 +537,66 @@ def main():
     # Save
     print(">> Saving data filtered (1 - generic) without BDAP")
     data_file_out = f"bando_cig_{year_start}-{year_end}_filtered.csv"
-    path_out = Path(data_dir) / data_file_out
+    path_out = output_path(Path(data_dir) / data_file_out, output_format)
     print("Path:", path_out)
-    save_data(df_filtered_1, path_out, csv_sep)
+    # The output files are written concurrently, while the next ones are computed
+    writer_pool = ThreadPoolExecutor(max_workers=output_write_workers)
+    list_writes = [writer_pool.submit(save_output, df_filtered_1, path_out, csv_sep, incremental)]
+    metrics_count(run_report, "rows_written", len(df_filtered_1))
+    list_outputs = [str(path_out)]
     print()
 
-    # Loading BDAP
-    print(">> Reading BDAP")
-    path_pa_registry = Path(pa_reg_dir) / pa_reg_file
-    df_pa_registry = read_pa_data(path_pa_registry, pa_reg_columns, pa_reg_dict)
-    print()
-    
-    # Merge with BDAP
+    # Merge with BDAP: once, on all the rows needed by the generic filter or by a region
     print(">> Merging ANAC Open Data and BDAP")
-    columns_to_drop = ['Codice_Tipologia_MIUR', 'Codice_Tipologia_SIOPE', 'Denominazione', 'Descr_Tipologia_MIUR', 'Descr_Tipologia_SIOPE', 'CF']
-    merged_data = merge_dataframes(df_filtered_1, df_pa_registry, 'cf_amministrazione_appaltante', 'CF', columns_to_drop)
-    merged_data = merged_data.drop_duplicates()
-    merged_data_len = len(merged_data)
+    # No deduplication after the join: the ANAC rows are already unique and the registry has unique (CF, pa_type) pairs
+    merged_all = pa_registry_join(df_anac, df_pa_registry, 'cf_amministrazione_appaltante')
     print("done!")
     print()
 
+    # Filter (the filters are row-wise, so filtering after the join gives the same rows as joining the filtered data)
+    merged_data = filter_data(merged_all, filter_list).copy()
+
     # Clean
-    df_filtered_1_clean = clean_data(merged_data)
+    df_filtered_1_clean = clean_data(merged_data, anac_transforms.get("clean", []))
     # Print
     print_details(df_filtered_1, "Filtered ANAC Open Data with BDAP (1 - generic)")
 
     # Stats on dataframe
-    dic_stat = {"region":"all", "size":len(df_filtered_1_clean)}
+    dic_stat = {"region":"all", "size":len(df_filtered_1_clean) + state.get("stats", {}).get("all", 0)}
     list_stats.append(dic_stat)
 
     # Save
     print(">> Saving data filtered with BDAP (1 - generic)")
     data_file_out = f"bando_cig_{year_start}-{year_end}_filtered_bdap.csv"
-    path_out = Path(data_dir) / data_file_out
+    path_out = output_path(Path(data_dir) / data_file_out, output_format)
     print("Path:", path_out)
-    save_data(df_filtered_1_clean, path_out, csv_sep)
+    list_writes.append(writer_pool.submit(save_output, df_filtered_1_clean, path_out, csv_sep, incremental, SORT_COLS))
+    metrics_count(run_report, "rows_written", len(df_filtered_1_clean))
+    list_outputs.append(str(path_out))
     print()
 
     print(">> Filtering (2 - by region)")
+    # All the regions are selected, lowercased and cleaned in one pass, then split by 'sezione_regionale'
+    regions_filter = [region_dic[next(iter(region_dic))] for region_dic in regions_list]
+    print("Regions (filter):", regions_filter)
+    merged_regions = filter_data(merged_all, [{"sezione_regionale": regions_filter}]).copy()
+    region_partition_key = merged_regions['sezione_regionale'].copy() # original values, before the transformations
+    print()
+
+    if logging.getLogger(__name__).isEnabledFor(logging.DEBUG):
+        print(">> Cecking NaN columns")
+        df_nan = merged_regions.isna().sum()
+        print(df_nan)
+        print()
+
+    print(">> Regional transformations (lowercase)")
+    merged_regions = apply_transforms(merged_regions, anac_transforms.get("regional", []))
+    print()
+
+    # Clean
+    df_regions_clean = clean_data(merged_regions, anac_transforms.get("clean", []))
+    # Single pass partition (the row order of each group follows the cleaned dataframe)
+    dic_regions = {region_filter: df_region for region_filter, df_region in df_regions_clean.groupby(region_partition_key, sort=False, observed=True)}
 
     i = 0
 
@@ -317,60 +613,201 @@ def main():
         region_key = next(iter(region_dic))
         region_filter = region_dic[region_key]
         region_output = region_key
-        region_filter_list = [{"sezione_regionale": [region_filter]}] # the filter is a list of dict
-    
 
-        print(">> Filtering data from ANAC Open Data")
         print("Region (filter):", region_filter)
         print("Region (output):", region_output)
-        df_filtered = filter_data(df_anac, region_filter_list)
+        df_filtered_2_clean = dic_regions.get(region_filter, df_regions_clean.iloc[0:0])
+
+        print(">> Saving data filtered (2 - by region)")
+        data_file_out = f"bando_cig_{year_start}-{year_end}_{region_output}.csv"
+        print_details(df_filtered_2_clean, "Final dataframe")
+        path_out = output_path(Path(data_dir) / data_file_out, output_format)
+        list_writes.append(writer_pool.submit(save_output, df_filtered_2_clean, path_out, csv_sep, incremental, SORT_COLS))
+        metrics_count(run_report, "rows_written", len(df_filtered_2_clean))
+        list_outputs.append(str(path_out))
         print()
 
+        # Stats on dataframe by region
+        dic_stat = {"region":region_output, "size":len(df_filtered_2_clean) + state.get("stats", {}).get(region_output, 0)}
+        list_stats.append(dic_stat)
 
-        # Merge df_filtered with df_pa_registry and drop columns not needed
-        print(">> Merging ANAC Open Data and PA Registry")
-        columns_to_drop = ['Codice_Tipologia_MIUR', 'Codice_Tipologia_SIOPE', 'Denominazione', 'Descr_Tipologia_MIUR', 'Descr_Tipologia_SIOPE', 'CF']
-        merged_data = merge_dataframes(df_filtered, df_pa_registry, 'cf_amministrazione_appaltante', 'CF', columns_to_drop)
-        merged_data = merged_data.drop_duplicates()
-        merged_data_len = len(merged_data)
-        print()
+    print(">> Waiting for the output files")
+    for future in list_writes:
+        future.result() # raises the errors of the writes
+    writer_pool.shutdown()
+    print()
+    return list_outputs
 
-        print(">> Cecking NaN columns")
-        df_nan = merged_data.isna().sum()
-        print(df_nan)
-        print()
+### MAIN ###
 
-        print(">> Columns to lowercase")
-        col_low = ['oggetto_principale_contratto', 'settore', 'sezione_regionale', 'pa_type']
-        merged_data = convert_columns_to_lowercase(merged_data,col_low)
-        print()
+def main():
+    parser = argparse.ArgumentParser(description="Select the ANAC data by the generic and regional filters and join them with BDAP.")
+    parser.add_argument("--memory-budget", type=int, default=anac_memory_budget_mb, metavar="MB", help="memory budget of the partitioned mode, in MB (default: ANAC_MEMORY_BUDGET_MB; 0 = in-memory run)")
+    args = parser.parse_args()
+
+    # Logging setup
+    log_file = f"{Path(__file__).stem}.log"
+    logging.basicConfig(
+        level=log_level,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(log_file),
+            logging.StreamHandler()
+        ]
+    )
+    logger = logging.getLogger(__name__)
+
+    print()
+    print("*** PROGRAM START ***")
+    print()
 
-        # Clean
-        df_filtered_2_clean = clean_data(merged_data)
+    start_time = datetime.now().replace(microsecond=0)
+    print("Start process: " + str(start_time))
+    logger.info(f"Start process: {start_time}")
+    print()
+    print()
 
-        print(">> Saving data filtered (2 - by region)")
-        data_file_out = f"bando_cig_{year_start}-{year_end}_{region_output}.csv"
-        print_details(df_filtered_2_clean, "Final dataframe")
-        path_out = Path(data_dir) / data_file_out
-        save_data(df_filtered_2_clean, path_out, csv_sep)
+    print(">> Generating output directories")
+    check_and_create_directory(data_dir)
+    check_and_create_directory(anac_stats_dir)
+    print()
+
+    print(">> Reading ANAC filter JSON")
+    print("File:", anac_odfilter_json)
+    filter_list = json_to_list_dict(anac_odfilter_json)
+    filter_list_len = len(filter_list)
+    print("Filters found in JSON:", filter_list_len)
+    print(filter_list)
+    print()
+
+    print(">> Reading ANAC regions JSON")
+    print("File:", anac_regions_json)
+    regions_list = json_to_list_dict(anac_regions_json)
+    regions_list_len = len(regions_list)
+    print("Regions found in JSON:", regions_list_len)
+    print(regions_list)
+    print()
+
+    # Loading BDAP
+    with metrics_stage(run_report, "registry"):
+        print(">> Reading BDAP")
+        path_pa_registry = Path(pa_reg_dir) / pa_reg_file
+        df_pa_registry, pa_registry_version = pa_registry_load(path_pa_registry, pa_reg_columns, pa_reg_dict, pa_reg_sep)
+        print(f"PA registry size: {len(df_pa_registry)} (version {pa_registry_version[:12]})")
+        metrics_count(run_report, "rows_read", len(df_pa_registry))
         print()
 
-        # Stats on dataframe by region
-        dic_stat = {"region":region_output, "size":merged_data_len}
-        list_stats.append(dic_stat)
+    # Incremental run: only the monthly sources not processed by the previous run
+    parquet_read = anac_parquet_do and Path(anac_parquet_dir).is_dir()
+    incremental_available = anac_incremental_do and anac_read_from_zip and bool(anac_dedup_keys) and not parquet_read and output_format == "csv"
+    incremental = False
+    state = {}
+    seen = None
+    if incremental_available:
+        print(">> Checking the state of the previous outputs")
+        list_sources = csv_sources(anac_download_dir, cig_prefix)
+        dic_signatures = source_signatures(list_sources)
+        fingerprint = config_fingerprint({
+            "filters": filter_list, "regions": regions_list, "schema": anac_cig_schema, "transforms": anac_transforms,
+            "dedup_keys": anac_dedup_keys, "csv_sep": csv_sep, "cig_prefix": cig_prefix, "years": [year_start, year_end],
+        })
+        state = state_read(data_dir)
+        new_sources, reason = select_plan(state, data_dir, fingerprint, pa_registry_version, dic_signatures)
+        print("Incremental run:", new_sources is not None, f"({reason})")
+        if new_sources is None:
+            state = {}
+        else:
+            if not new_sources:
+                print("Outputs up to date: nothing to do")
+                path_report = metrics_write(run_report, log_file)
+                print("Run report:", path_report)
+                logger.info(f"Outputs up to date - Run report: {path_report}")
+                print()
+                return
+            incremental = True
+            seen = seen_keys_read(data_dir)
+        print()
+    elif anac_incremental_do:
+        print("Incremental run not available (requires ANAC_READ_FROM_ZIP, ANAC_DEDUP_KEYS and OUTPUT_FORMAT csv, without the Parquet store): full run")
+        print()
+    state_clear(data_dir) # the outputs are going to change: an interrupted run leads to a full rebuild
+
+    # Partitioned mode: the outputs are computed in parts within the memory budget
+    partitioned = args.memory_budget > 0
+    if partitioned and (incremental or parquet_read or output_format not in CSV_COMPRESSIONS or arrow_import() is None):
+        print("Partitioned mode not available (requires a full run from the CSV files, OUTPUT_FORMAT csv, csv.gz or csv.zst, and pyarrow): in-memory run")
+        print()
+        partitioned = False
+
+    with metrics_stage(run_report, "read"):
+        print(">> Reading initial ANAC Open Data")
+        schema_cols, schema_type, _ = schema_read_args(anac_cig_schema)
+        # Only the rows needed by the generic filter or by one of the regions are kept while reading
+        region_filter_lists = [[{"sezione_regionale": list(region_dic.values())}] for region_dic in regions_list]
+        read_filters = filters_to_dnf([filter_list] + region_filter_lists, schema_cols)
+        print("Filters applied while reading:", read_filters)
+        if incremental:
+            path_anac_od = [source for source in list_sources if source.stem in new_sources]
+            print("New sources:", [source.name for source in path_anac_od])
+            df_anac, seen = read_anac_data(path_anac_od, schema_cols, schema_type, csv_sep, read_filters, anac_read_chunksize, anac_cig_schema, anac_dedup_keys, seen)
+        elif parquet_read:
+            print("Parquet store:", anac_parquet_dir)
+            df_anac = read_parquet_store(anac_parquet_dir, anac_cig_schema, anac_parquet_partitions, read_filters)
+            metrics_count(run_report, "rows_read", len(df_anac)) # rows kept by the filters
+            if not anac_dedup_keys: # with keys, the rows are deduplicated when the store is built
+                df_anac = df_anac.drop_duplicates()
+        else:
+            if anac_read_from_zip:
+                path_anac_od = csv_sources(anac_download_dir, cig_prefix) # monthly archives, read without extraction
+                print(f"Sources in '{anac_download_dir}' with prefix '{cig_prefix}':", len(path_anac_od))
+            else:
+                path_anac_od = Path(data_dir) / data_file
+            if anac_memory_report_do:
+                print(">> Memory report (default types vs ANAC_CIG_SCHEMA, sample)")
+                path_sample = path_anac_od[0] if isinstance(path_anac_od, list) else path_anac_od
+                df_memory = memory_report(path_sample, anac_cig_schema, csv_sep)
+                print(df_memory.to_string(index=False))
+                path_memory = Path(anac_stats_dir) / anac_memory_report_file
+                df_memory.to_csv(path_memory, sep=csv_sep, index=False)
+                print("Memory report path:", path_memory)
+                print()
+            if not partitioned:
+                df_anac, seen = read_anac_data(path_anac_od, schema_cols, schema_type, csv_sep, read_filters, anac_read_chunksize, anac_cig_schema, anac_dedup_keys)
+    if partitioned: # reads the sources in its own "read" stage
+        seen, list_outputs = select_partitioned(path_anac_od, filter_list, regions_list, df_pa_registry, read_filters, args.memory_budget)
+    else:
+        with metrics_stage(run_report, "select"):
+            list_outputs = select_in_memory(df_anac, filter_list, regions_list, df_pa_registry, incremental, state)
+    metrics_count(run_report, "bytes_written", sum(Path(path_out).stat().st_size for path_out in list_outputs if Path(path_out).exists()), "select")
 
     print(">> Saving data stats")
     df_stats = pd.DataFrame.from_records(list_stats)
-    path_stats = Path(anac_stats_dir) / anac_stats_file
-    df_stats.to_csv(path_stats, sep=csv_sep, index=False)
+    path_stats = output_path(Path(anac_stats_dir) / anac_stats_file, output_format)
+    output_write(df_stats, path_stats, output_format, csv_sep, output_csv_engine, output_compression, quote_all=False)
     print("Stats path:", path_stats)
     print()
 
+    if incremental_available:
+        print(">> Saving the state of the outputs")
+        processed = state.get("sources", {})
+        processed.update({source.stem: dic_signatures[source.stem] for source in path_anac_od})
+        state_write(data_dir, {
+            "fingerprint": fingerprint, "registry": pa_registry_version, "sources": processed, "outputs": list_outputs,
+            "stats": {dic_stat["region"]: dic_stat["size"] for dic_stat in list_stats}, "updated": str(datetime.now().replace(microsecond=0)),
+        }, seen)
+        print("State path:", Path(data_dir) / SELECT_STATE)
+        print()
+
     end_time = datetime.now().replace(microsecond=0)
     delta_time = end_time - start_time
 
     print("End process:", end_time)
     print("Time to finish:", delta_time)
+    logger.info(f"End process: {end_time}")
+    logger.info(f"Time to finish: {delta_time}")
+    path_report = metrics_write(run_report, log_file)
+    print("Run report:", path_report)
+    logger.info(f"Run report: {path_report}")
     print()
 
     print()
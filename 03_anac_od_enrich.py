@@ -0,0 +1,107 @@
+# 03_anac_od_enrich.py
+
+"""
+Script name: 03_anac_od_enrich.py
+Author: R. Nai
+Creation date: 17/10/2026
+Last modified: 17/10/2026
+Description: enriches the tenders selected by 02_anac_od_select.py with the award and execution datasets (ANAC_ENRICH_DATASETS:
+aggiudicazioni, aggiudicatari, fine-contratto, varianti), joined on 'cig' out of core within a memory budget (ANAC_ENRICH_MEMORY_MB).
+The enriched file (one row per tender row) is written next to the bando_cig_* files.
+Usage: python 03_anac_od_enrich.py [--input FILE] [--output FILE] [--memory-mb MB]
+"""
+
+### IMPORT ###
+import argparse
+import logging
+from datetime import datetime
+from pathlib import Path
+
+### LOCAL IMPORT ###
+from config import config_reader
+from utility_manager.enrich import enrich_tenders
+from utility_manager.output_writer import output_path, CSV_COMPRESSIONS
+
+### GLOBALS ###
+yaml_config = config_reader.config_read_yaml("config.yml", "config")
+csv_sep = str(yaml_config["CSV_SEP"])
+year_start = int(yaml_config["YEAR_START_DOWNLOAD"])
+year_end = int(yaml_config["YEAR_END_DOWNLOAD"])
+data_dir = str(yaml_config["OD_ANAC_DIR"])
+anac_download_dir = str(yaml_config["ANAC_DOWNLOAD_DIR"])
+anac_enrich_datasets = dict(yaml_config.get("ANAC_ENRICH_DATASETS") or {})
+anac_enrich_memory_mb = int(yaml_config.get("ANAC_ENRICH_MEMORY_MB", 1024))
+output_format = str(yaml_config.get("OUTPUT_FORMAT", "csv"))
+log_level = str(yaml_config.get("LOG_LEVEL", "INFO")).upper() # DEBUG: detailed diagnostics
+
+# INPUT (tenders with BDAP, as written by 02_anac_od_select.py) and OUTPUT
+data_file = f"bando_cig_{year_start}-{year_end}_filtered_bdap.csv"
+data_file_out = f"bando_cig_{year_start}-{year_end}_enriched.csv"
+
+### MAIN ###
+
+def main() -> None:
+    """
+    Main script function.
+    Parameters: None
+    Returns: None
+    """
+
+    parser = argparse.ArgumentParser(description="Enrich the selected tenders with the award and execution datasets.")
+    parser.add_argument("--input", default=None, help=f"tenders file (default: {data_file} in OD_ANAC_DIR, in OUTPUT_FORMAT)")
+    parser.add_argument("--output", default=str(Path(data_dir) / data_file_out), help="enriched CSV file")
+    parser.add_argument("--memory-mb", type=int, default=anac_enrich_memory_mb, help="memory budget of a join partition (default: ANAC_ENRICH_MEMORY_MB)")
+    args = parser.parse_args()
+
+    # Logging setup
+    log_file = f"{Path(__file__).stem}.log"
+    logging.basicConfig(
+        level=log_level,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(log_file),
+            logging.StreamHandler()
+        ]
+    )
+    logger = logging.getLogger(__name__)
+
+    print()
+    print("*** PROGRAM START ***")
+    print()
+
+    start_time = datetime.now().replace(microsecond=0)
+    print("Start process: " + str(start_time))
+    logger.info(f"Start process: {start_time}")
+    print()
+
+    path_tenders = Path(args.input) if args.input else output_path(Path(data_dir) / data_file, output_format)
+    if path_tenders.suffix not in (".csv", ".gz", ".zst") or (not args.input and output_format not in CSV_COMPRESSIONS):
+        print(f"WARNING! The tenders file must be a CSV file (OUTPUT_FORMAT: {output_format}), nothing to enrich.\n")
+    elif not path_tenders.is_file():
+        print(f"WARNING! File '{path_tenders}' does not exist (run 02_anac_od_select.py first), nothing to enrich.\n")
+    else:
+        print(f">> Enriching '{path_tenders}' with: {list(anac_enrich_datasets)}")
+        dic_result = enrich_tenders(path_tenders, args.output, anac_download_dir, anac_enrich_datasets, csv_sep, args.memory_mb)
+        print("Enrichment results")
+        print(dic_result)
+        print("Path:", args.output)
+        logger.info(f"Enrichment of {path_tenders} completed - Results: {dic_result}")
+        print()
+
+    # end
+    end_time = datetime.now().replace(microsecond=0)
+    delta_time = end_time - start_time
+
+    print()
+    print("End process:", end_time)
+    print("Time to finish:", delta_time)
+    logger.info(f"End process: {end_time}")
+    logger.info(f"Time to finish: {delta_time}")
+    print()
+
+    print()
+    print("*** PROGRAM END ***")
+    print()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# 03_anac_od_sqlite.py
+
+"""
+Script name: 03_anac_od_sqlite.py
+Author: R. Nai
+Creation date: 17/10/2026
+Last modified: 17/10/2026
+Description: loads all the downloaded ANAC datasets into a local SQLite store (one table per dataset, indexed on the
+configured columns), for ad hoc queries without reading the CSV files again. Reruns load only the new or changed files.
+Usage: python 03_anac_od_sqlite.py [--db DB] [--source-dir DIR] [--all-snapshots]
+"""
+
+### IMPORT ###
+import argparse
+import logging
+from datetime import datetime
+from pathlib import Path
+
+### LOCAL IMPORT ###
+from config import config_reader
+from utility_manager.sqlite_store import sqlite_load
+
+### GLOBALS ###
+yaml_config = config_reader.config_read_yaml("config.yml", "config")
+anac_download_dir = str(yaml_config["ANAC_DOWNLOAD_DIR"])
+csv_sep = str(yaml_config["CSV_SEP"])
+sqlite_db = str(yaml_config.get("SQLITE_DB", "open_data_anac/anac_od.sqlite"))
+sqlite_batch_rows = int(yaml_config.get("SQLITE_BATCH_ROWS", 50000))
+sqlite_latest_snapshot = bool(yaml_config.get("SQLITE_LATEST_SNAPSHOT", True))
+sqlite_index_columns = list(yaml_config.get("SQLITE_INDEX_COLUMNS") or [])
+log_level = str(yaml_config.get("LOG_LEVEL", "INFO")).upper() # DEBUG: detailed diagnostics
+
+### MAIN ###
+
+def main() -> None:
+    """
+    Main script function.
+    Parameters: None
+    Returns: None
+    """
+
+    parser = argparse.ArgumentParser(description="Load the downloaded ANAC datasets into the SQLite store.")
+    parser.add_argument("--db", default=sqlite_db, help="SQLite database file (default: SQLITE_DB)")
+    parser.add_argument("--source-dir", default=anac_download_dir, help="directory of the downloaded files (default: ANAC_DOWNLOAD_DIR)")
+    parser.add_argument("--all-snapshots", action="store_true", help="load every dated snapshot of a dataset, not only the latest one")
+    args = parser.parse_args()
+
+    # Logging setup
+    log_file = f"{Path(__file__).stem}.log"
+    logging.basicConfig(
+        level=log_level,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(log_file),
+            logging.StreamHandler()
+        ]
+    )
+    logger = logging.getLogger(__name__)
+
+    print()
+    print("*** PROGRAM START ***")
+    print()
+
+    start_time = datetime.now().replace(microsecond=0)
+    print("Start process: " + str(start_time))
+    logger.info(f"Start process: {start_time}")
+    print()
+
+    if not Path(args.source_dir).is_dir():
+        print(f"WARNING! Directory '{args.source_dir}' does not exist, nothing to load.\n")
+    else:
+        print(f">> Loading '{args.source_dir}' into '{args.db}'")
+        latest_snapshot = sqlite_latest_snapshot and not args.all_snapshots
+        dic_result = sqlite_load(args.db, args.source_dir, csv_sep, sqlite_index_columns, latest_snapshot, sqlite_batch_rows)
+        print("Loading results")
+        print(dic_result)
+        logger.info(f"Loading of {args.source_dir} completed - Results: {dic_result}")
+        print()
+
+    # end
+    end_time = datetime.now().replace(microsecond=0)
+    delta_time = end_time - start_time
+
+    print()
+    print("End process:", end_time)
+    print("Time to finish:", delta_time)
+    logger.info(f"End process: {end_time}")
+    logger.info(f"Time to finish: {delta_time}")
+    print()
+
+    print()
+    print("*** PROGRAM END ***")
+    print()
+
+if __name__ == "__main__":
+    main()
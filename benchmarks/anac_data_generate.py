@@ -0,0 +1,365 @@
+# anac_data_generate.py
+
+"""
+Script name: anac_data_generate.py
+Author: R. Nai
+Creation date: 17/10/2026
+Description: generator of synthetic ANAC and BDAP open data for the benchmarks: monthly 'cig_csv_YYYY_MM.zip' archives with the columns
+of the ANAC 'bando CIG' files (ANAC_CIG_SCHEMA, plus a few columns that are not read) and the BDAP registry 'Anagrafe-Enti---Ente.csv'.
+The values follow the shape of the real data (CIG formats, code/description pairs, amounts, dates, free text with separators, quotes
+and line breaks, contracting authorities not in the registry, duplicated rows within a month and republished from earlier months).
+The output is reproducible for a given seed (whatever the number of processes) and the memory used does not depend on the number of rows (months are written in chunks).
+Usage: python benchmarks/anac_data_generate.py OUT_DIR [--rows 1000000] [--years 2016 2025] [--registry-rows 20000] [--seed 0] [--workers N]
+"""
+
+### IMPORT ###
+import argparse
+import io
+import os
+import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+### LOCAL IMPORT ###
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from config import config_reader
+
+### GLOBALS ###
+yaml_config = config_reader.config_read_yaml("config.yml") # config directory, whatever the working directory
+anac_cig_schema = dict(yaml_config["ANAC_CIG_SCHEMA"])
+cig_prefix = str(yaml_config["CIG_PREFIX"])
+csv_sep = str(yaml_config["CSV_SEP"])
+pa_reg_file = str(yaml_config["OD_BDAP_FILE"])
+pa_reg_columns = list(yaml_config["OD_BDAP__SCHEMA"])
+pa_reg_sep = str(yaml_config.get("OD_BDAP_CSV_SEP", ","))
+year_start = int(yaml_config["YEAR_START_DOWNLOAD"])
+year_end = int(yaml_config["YEAR_END_DOWNLOAD"])
+
+GENERATE_CHUNK_ROWS = 200000 # rows generated and written at a time
+EXTRA_COLUMNS = ["cod_esito", "esito", "data_comunicazione_esito", "cod_strumento_svolgimento", "strumento_svolgimento"] # columns of the ANAC files not read by the scripts
+
+REGIONS = [
+    "ABRUZZO", "BASILICATA", "CALABRIA", "CAMPANIA", "EMILIA ROMAGNA", "FRIULI VENEZIA GIULIA", "LAZIO", "LIGURIA", "LOMBARDIA", "MARCHE",
+    "MOLISE", "PIEMONTE", "PROVINCIA AUTONOMA DI BOLZANO", "PROVINCIA AUTONOMA DI TRENTO", "PUGLIA", "SARDEGNA", "SICILIA", "TOSCANA",
+    "UMBRIA", "VALLE DAOSTA", "VENETO", "CENTRALE",
+]
+PROVINCES = ["TO", "MI", "VE", "PD", "VR", "BO", "FI", "RM", "NA", "BA", "PA", "CA", "GE", "TN", "BZ", "AO", "PG", "AN", "CB", "PZ", "CZ", "TS"]
+CONTRACT_TYPES = ["FORNITURE", "LAVORI", "SERVIZI"]
+SECTORS = ["SETTORI ORDINARI", "SETTORI SPECIALI"]
+STATES = ["ATTIVO", "CANCELLATO", "NON PERFEZIONATO"]
+PROCEDURES = {
+    "1": "PROCEDURA APERTA", "3": "PROCEDURA RISTRETTA", "4": "PROCEDURA NEGOZIATA SENZA PREVIA PUBBLICAZIONE",
+    "23": "AFFIDAMENTO DIRETTO", "26": "AFFIDAMENTO DIRETTO IN ADESIONE AD ACCORDO QUADRO/CONVENZIONE",
+    "37": "PROCEDURA NEGOZIATA SENZA PREVIA INDIZIONE DI GARA (ART. 76 D.LGS. 36/2023)",
+}
+MODES = {"1": "CONTRATTO D'APPALTO", "9": "ACCORDO QUADRO", "11": "CONTRATTO DI CONCESSIONE DI SERVIZI", "15": "CONVENZIONE"}
+OUTCOMES = {"1": "AGGIUDICATA", "2": "DESERTA", "3": "NON AGGIUDICATA", "": ""}
+INSTRUMENTS = {"1": "PIATTAFORMA TELEMATICA", "2": "MERCATO ELETTRONICO", "": ""}
+PA_TYPES_SIOPE = ["Comuni", "Province", "Regioni", "Aziende sanitarie locali", "Aziende ospedaliere", "Universita' e istituti di istruzione universitaria pubblici", "Camere di commercio"]
+PA_TYPES_MIUR = ["Istituti comprensivi", "Istituti di istruzione secondaria superiore", "Circoli didattici"]
+WORDS = [
+    "fornitura", "servizio", "lavori", "manutenzione", "ordinaria", "straordinaria", "di", "per", "la", "il", "materiale", "sanitario",
+    "pulizia", "locali", "scuola", "comunale", "strade", "illuminazione", "pubblica", "software", "licenze", "noleggio", "mensa",
+    "trasporto", "scolastico", "ristrutturazione", "edificio", "adeguamento", "sismico", "farmaci", "dispositivi", "medici", "consulenza",
+]
+
+### FUNCTIONS ###
+def text_generate(rng: np.random.Generator, rows: int, words: int = 6, special: float = 0.02) -> np.ndarray:
+    """
+    Generates free text (e.g., the object of a tender): random words, with a fraction of the values containing the CSV separator, quotes or line breaks.
+
+    Parameters:
+        rng (np.random.Generator): the random generator.
+        rows (int): the number of values.
+        words (int): the maximum number of words of a value.
+        special (float): the fraction of values with separators, quotes or line breaks.
+
+    Returns:
+        np.ndarray: the values (object).
+    """
+
+    n_words = rng.integers(1, words + 1, rows)
+    list_words = np.array(WORDS, dtype=object)[rng.integers(0, len(WORDS), (rows, words))]
+    text = np.array([" ".join(row[:n]) for row, n in zip(list_words, n_words)], dtype=object)
+    pos = np.flatnonzero(rng.random(rows) < special)
+    suffixes = np.array([f'{csv_sep} lotto "A"', '\nCIG "urgente"', f"{csv_sep} via Roma, 1"], dtype=object)
+    text[pos] = text[pos] + suffixes[rng.integers(0, len(suffixes), len(pos))]
+    return text
+
+def cig_generate(rng: np.random.Generator, rows: int) -> np.ndarray:
+    """
+    Generates CIG codes: 'smart CIG' (Z + 9 hexadecimal characters) or ordinary CIG (7 digits + 3 hexadecimal characters).
+
+    Parameters:
+        rng (np.random.Generator): the random generator.
+        rows (int): the number of values.
+
+    Returns:
+        np.ndarray: the codes (object).
+    """
+
+    smart = rng.random(rows) < 0.4
+    hex_smart = rng.integers(0, 16 ** 9, rows)
+    digits = rng.integers(0, 10 ** 7, rows)
+    hex_suffix = rng.integers(0, 16 ** 3, rows)
+    return np.array([f"Z{h:09X}" if s else f"{d:07d}{x:03X}" for s, h, d, x in zip(smart, hex_smart, digits, hex_suffix)], dtype=object)
+
+def missing(rng: np.random.Generator, values: np.ndarray, fraction: float) -> np.ndarray:
+    """
+    Replaces a fraction of the values with empty values.
+
+    Parameters:
+        rng (np.random.Generator): the random generator.
+        values (np.ndarray): the values (object).
+        fraction (float): the fraction of empty values.
+
+    Returns:
+        np.ndarray: the values.
+    """
+
+    values = values.astype(object)
+    values[rng.random(len(values)) < fraction] = ""
+    return values
+
+def stations_generate(rng: np.random.Generator, registry_cf: np.ndarray, n_stations: int) -> pd.DataFrame:
+    """
+    Generates the contracting authorities: fiscal code (mostly in the registry), AUSA code, name, region and province.
+
+    Parameters:
+        rng (np.random.Generator): the random generator.
+        registry_cf (np.ndarray): the fiscal codes of the registry.
+        n_stations (int): the number of contracting authorities.
+
+    Returns:
+        pd.DataFrame: the contracting authorities.
+    """
+
+    in_registry = rng.random(n_stations) < 0.9
+    cf = np.where(in_registry, registry_cf[rng.integers(0, len(registry_cf), n_stations)], [f"9{n:010d}" for n in range(n_stations)])
+    region = rng.integers(0, len(REGIONS), n_stations)
+    return pd.DataFrame({
+        "cf_amministrazione_appaltante": cf,
+        "codice_ausa": [f"{n:010d}" for n in rng.permutation(n_stations) + 10 ** 8],
+        "denominazione_amministrazione_appaltante": [f"ENTE APPALTANTE {n}" for n in range(n_stations)],
+        "sezione_regionale": [f"SEZIONE REGIONALE {REGIONS[r]}" for r in region],
+        "provincia": np.array(PROVINCES, dtype=object)[region % len(PROVINCES)],
+    })
+
+def cig_chunk_generate(rng: np.random.Generator, rows: int, year: int, month: int, stations: pd.DataFrame, cpv: pd.DataFrame) -> pd.DataFrame:
+    """
+    Generates a chunk of rows of a monthly 'bando CIG' file.
+
+    Parameters:
+        rng (np.random.Generator): the random generator.
+        rows (int): the number of rows.
+        year (int): the year of publication.
+        month (int): the month of publication.
+        stations (pd.DataFrame): the contracting authorities (see stations_generate).
+        cpv (pd.DataFrame): the CPV codes and descriptions.
+
+    Returns:
+        pd.DataFrame: the rows, with the columns of ANAC_CIG_SCHEMA and EXTRA_COLUMNS (text, empty for missing values).
+    """
+
+    days = rng.integers(1, 29, rows)
+    procedure = rng.integers(0, len(PROCEDURES), rows)
+    mode = rng.integers(0, len(MODES), rows)
+    outcome = rng.integers(0, len(OUTCOMES), rows)
+    instrument = rng.integers(0, len(INSTRUMENTS), rows)
+    station = stations.iloc[rng.integers(0, len(stations), rows)].reset_index(drop=True)
+    cpv_rows = cpv.iloc[rng.integers(0, len(cpv), rows)].reset_index(drop=True)
+    amount = np.round(rng.lognormal(10, 2, rows), 2)
+    deadline = pd.to_datetime({"year": year, "month": month, "day": days}) + pd.to_timedelta(rng.integers(10, 60, rows), unit="D")
+
+    df = pd.DataFrame({
+        "cig": missing(rng, cig_generate(rng, rows), 0.001),
+        "cig_accordo_quadro": missing(rng, cig_generate(rng, rows), 0.95),
+        "numero_gara": rng.integers(10 ** 6, 10 ** 8, rows).astype(str),
+        "oggetto_gara": text_generate(rng, rows, 8),
+        "importo_complessivo_gara": missing(rng, np.char.mod("%.2f", amount * rng.integers(1, 4, rows)), 0.05),
+        "n_lotti_componenti": missing(rng, rng.choice([1, 1, 1, 2, 3, 10], rows).astype(str), 0.05),
+        "oggetto_lotto": text_generate(rng, rows, 6),
+        "importo_lotto": np.char.mod("%.2f", amount),
+        "oggetto_principale_contratto": np.array(CONTRACT_TYPES, dtype=object)[rng.integers(0, len(CONTRACT_TYPES), rows)],
+        "stato": np.array(STATES, dtype=object)[rng.choice(len(STATES), rows, p=[0.9, 0.08, 0.02])],
+        "settore": np.array(SECTORS, dtype=object)[(rng.random(rows) < 0.1).astype(int)],
+        "luogo_istat": np.char.mod("%06d", rng.integers(1001, 111107, rows)),
+        "provincia": station["provincia"].to_numpy(),
+        "data_pubblicazione": missing(rng, np.array([f"{year:04d}-{month:02d}-{d:02d}" for d in days], dtype=object), 0.005),
+        "data_scadenza_offerta": missing(rng, deadline.dt.strftime("%Y-%m-%d %H:%M:%S").to_numpy(dtype=object), 0.3),
+        "cod_tipo_scelta_contraente": np.array(list(PROCEDURES), dtype=object)[procedure],
+        "tipo_scelta_contraente": np.array(list(PROCEDURES.values()), dtype=object)[procedure],
+        "cod_modalita_realizzazione": np.array(list(MODES), dtype=object)[mode],
+        "modalita_realizzazione": np.array(list(MODES.values()), dtype=object)[mode],
+        "codice_ausa": station["codice_ausa"].to_numpy(),
+        "cf_amministrazione_appaltante": station["cf_amministrazione_appaltante"].to_numpy(),
+        "denominazione_amministrazione_appaltante": station["denominazione_amministrazione_appaltante"].to_numpy(),
+        "sezione_regionale": station["sezione_regionale"].to_numpy(),
+        "id_centro_costo": np.char.add(np.char.mod("%016X", rng.integers(0, 2 ** 62, rows)), np.char.mod("%016X", rng.integers(0, 2 ** 62, rows))),
+        "denominazione_centro_costo": text_generate(rng, rows, 3, 0),
+        "anno_pubblicazione": str(year),
+        "mese_pubblicazione": str(month),
+        "cod_cpv": cpv_rows["cod_cpv"].to_numpy(),
+        "descrizione_cpv": cpv_rows["descrizione_cpv"].to_numpy(),
+        "flag_prevalente": np.where(rng.random(rows) < 0.95, "1", "0"),
+        "cod_esito": np.array(list(OUTCOMES), dtype=object)[outcome],
+        "esito": np.array(list(OUTCOMES.values()), dtype=object)[outcome],
+        "data_comunicazione_esito": "",
+        "cod_strumento_svolgimento": np.array(list(INSTRUMENTS), dtype=object)[instrument],
+        "strumento_svolgimento": np.array(list(INSTRUMENTS.values()), dtype=object)[instrument],
+    })
+    columns = list(anac_cig_schema) + [col for col in EXTRA_COLUMNS if col not in anac_cig_schema]
+    return df[[col for col in columns if col in df.columns]]
+
+def registry_generate(out_dir: Path, rows: int, seed: int = 0) -> np.ndarray:
+    """
+    Generates the BDAP registry (OD_BDAP_FILE) with the columns of OD_BDAP__SCHEMA: the PA type is in the SIOPE or in the MIUR description.
+
+    Parameters:
+        out_dir (Path): the output directory.
+        rows (int): the number of entities.
+        seed (int): the random seed.
+
+    Returns:
+        np.ndarray: the fiscal codes of the registry.
+    """
+
+    rng = np.random.default_rng(seed + 1)
+    cf = np.char.mod("%011d", rng.choice(10 ** 9, rows, replace=False) + 8 * 10 ** 10)
+    school = rng.random(rows) < 0.3
+    df = pd.DataFrame({
+        "CF": cf,
+        "Codice_Tipologia_MIUR": np.where(school, "M" + np.char.mod("%d", rng.integers(1, 4, rows)), ""),
+        "Codice_Tipologia_SIOPE": np.where(school, "", "S" + np.char.mod("%d", rng.integers(1, 8, rows))),
+        "Denominazione": [f"Ente {n}" for n in range(rows)],
+        "Descr_Tipologia_MIUR": np.where(school, np.array(PA_TYPES_MIUR, dtype=object)[rng.integers(0, len(PA_TYPES_MIUR), rows)], ""),
+        "Descr_Tipologia_SIOPE": np.where(school, "", np.array(PA_TYPES_SIOPE, dtype=object)[rng.integers(0, len(PA_TYPES_SIOPE), rows)]),
+    })
+    df[[col for col in pa_reg_columns if col in df.columns]].to_csv(Path(out_dir) / pa_reg_file, sep=pa_reg_sep, index=False)
+    return cf
+
+def month_write(path_zip: Path, seed: int, i: int, rows: int, year: int, month: int, stations: pd.DataFrame, cpv: pd.DataFrame, dup_ratio: float, previous: tuple = None) -> int:
+    """
+    Writes a monthly archive (one CSV member), in chunks of GENERATE_CHUNK_ROWS rows, with duplicated rows: 'dup_ratio' of the rows
+    of each chunk is repeated within the month and the month republishes the first rows of the previous month.
+    The random generators depend only on the seed and the position of the month, so the months can be written in any order.
+
+    Parameters:
+        path_zip (Path): the path of the archive.
+        seed (int): the random seed.
+        i (int): the position of the month.
+        rows (int): the number of generated rows (duplicates excluded).
+        year (int): the year of publication.
+        month (int): the month of publication.
+        stations (pd.DataFrame): the contracting authorities.
+        cpv (pd.DataFrame): the CPV codes and descriptions.
+        dup_ratio (float): the fraction of duplicated rows.
+        previous (tuple, optional): the rows, year and month of the previous month (None for the first month).
+
+    Returns:
+        int: the number of rows written (duplicates included).
+    """
+
+    rng = np.random.default_rng([seed, i])
+    written = 0
+    with zipfile.ZipFile(path_zip, "w", zipfile.ZIP_DEFLATED) as zf:
+        with zf.open(f"{path_zip.stem}.csv", "w", force_zip64=True) as member, io.TextIOWrapper(member, encoding="utf-8", newline="") as fp:
+            # First rows of the month, republished by the next month (generated again there with the same generator)
+            df_head = cig_chunk_generate(np.random.default_rng([seed, i, 0]), int(rows * dup_ratio), year, month, stations, cpv)
+            list_df = [df_head]
+            if previous is not None:
+                prev_rows, prev_year, prev_month = previous
+                list_df.append(cig_chunk_generate(np.random.default_rng([seed, i - 1, 0]), int(prev_rows * dup_ratio), prev_year, prev_month, stations, cpv))
+            df = pd.concat(list_df)
+            df.to_csv(fp, sep=csv_sep, index=False)
+            written += len(df)
+            for start in range(len(df_head), rows, GENERATE_CHUNK_ROWS):
+                df = cig_chunk_generate(rng, min(GENERATE_CHUNK_ROWS, rows - start), year, month, stations, cpv)
+                df = pd.concat([df, df.iloc[rng.integers(0, len(df), int(len(df) * dup_ratio))]])
+                df.to_csv(fp, sep=csv_sep, index=False, header=False)
+                written += len(df)
+    return written
+
+def anac_generate(out_dir: str, months: list, rows: int, registry_rows: int = 20000, seed: int = 0, dup_ratio: float = 0.02, workers: int = 1) -> dict:
+    """
+    Generates the monthly 'bando CIG' archives (on a pool of 'workers' processes) and the BDAP registry.
+
+    Parameters:
+        out_dir (str): the output directory (created if needed).
+        months (list): the (year, month) pairs of the archives.
+        rows (int): the total number of generated rows (duplicates excluded), split evenly over the months.
+        registry_rows (int): the number of entities of the registry.
+        seed (int): the random seed.
+        dup_ratio (float): the fraction of duplicated rows (see month_write).
+        workers (int): the number of processes.
+
+    Returns:
+        dict: the number of archives, rows (duplicates included) and bytes generated.
+    """
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    registry_cf = registry_generate(out_dir, registry_rows, seed)
+    stations = stations_generate(rng, registry_cf, max(100, registry_rows // 2))
+    cpv_codes = [f"{d:02d}{n:06d}-{n % 10}" for d in range(3, 99, 3) for n in range(0, 900000, 90000)]
+    cpv = pd.DataFrame({"cod_cpv": cpv_codes, "descrizione_cpv": [f"DESCRIZIONE CPV {code[:8]}" for code in cpv_codes]})
+
+    list_rows = [rows // len(months) + (1 if i < rows % len(months) else 0) for i in range(len(months))]
+    dic_result = {"archives": 0, "rows": 0, "bytes": (out_dir / pa_reg_file).stat().st_size}
+    with ProcessPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {}
+        for i, (year, month) in enumerate(months):
+            path_zip = out_dir / f"{cig_prefix}{year:04d}_{month:02d}.zip"
+            previous = (list_rows[i - 1], *months[i - 1]) if i > 0 else None
+            futures[executor.submit(month_write, path_zip, seed, i, list_rows[i], year, month, stations, cpv, dup_ratio, previous)] = path_zip
+        for future in as_completed(futures):
+            path_zip = futures[future]
+            written = future.result()
+            dic_result["archives"] += 1
+            dic_result["rows"] += written
+            dic_result["bytes"] += path_zip.stat().st_size
+            print(f"Generated: {path_zip.name} ({written} rows)")
+    return dic_result
+
+def months_generate(year_start: int, year_end: int, date_limit: date = None) -> list:
+    """
+    Returns the months between two years, up to the current month (as the URLs generated by 01_anac_od_download.py).
+
+    Parameters:
+        year_start (int): the starting year (inclusive).
+        year_end (int): the ending year (inclusive).
+        date_limit (date, optional): the last month (default: today).
+
+    Returns:
+        list: the (year, month) pairs.
+    """
+
+    date_limit = date_limit or date.today()
+    return [(year, month) for year in range(year_start, year_end + 1) for month in range(1, 13) if (year, month) <= (date_limit.year, date_limit.month)]
+
+### MAIN ###
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic ANAC 'bando CIG' archives and the BDAP registry.")
+    parser.add_argument("out_dir", help="output directory")
+    parser.add_argument("--rows", type=int, default=1000000, help="total number of rows (duplicates excluded)")
+    parser.add_argument("--years", type=int, nargs=2, default=[year_start, year_end], metavar=("START", "END"), help="years of the archives (default: YEAR_START_DOWNLOAD, YEAR_END_DOWNLOAD)")
+    parser.add_argument("--registry-rows", type=int, default=20000, help="number of entities of the BDAP registry")
+    parser.add_argument("--dup-ratio", type=float, default=0.02, help="fraction of duplicated rows")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of processes (default: number of CPUs)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    dic_result = anac_generate(args.out_dir, months_generate(*args.years), args.rows, args.registry_rows, args.seed, args.dup_ratio, args.workers)
+    print(f"Generated: {dic_result} in {time.perf_counter() - start:.1f} s")
+
+if __name__ == "__main__":
+    main()
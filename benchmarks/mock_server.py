@@ -0,0 +1,225 @@
+# mock_server.py
+
+"""
+Script name: mock_server.py
+Author: R. Nai
+Creation date: 17/10/2026
+Description: local stand-in of the ANAC and Open BDAP download servers for the benchmarks: serves the files of a directory (e.g., generated
+by anac_data_generate.py) at the paths of the real URLs (/opendata/download/dataset/<dataset>/filesystem/<file> and /export/csv/<file>),
+over HTTP or HTTPS (self-signed certificate), with the features used by url_download: HEAD, ETag/Last-Modified with conditional
+requests (304), Range requests (206/416, If-Range) and 404 for the missing files. An optional latency and bandwidth per connection emulate a remote server.
+Usage: python benchmarks/mock_server.py ROOT_DIR [--port 8443] [--https] [--latency-ms 0] [--rate-mbps 0]
+"""
+
+### IMPORT ###
+import argparse
+import email.utils
+import re
+import ssl
+import subprocess
+import time
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+### GLOBALS ###
+MOCK_ROUTES = [
+    re.compile(r"^/opendata/download/dataset/[\w-]+/filesystem/(?P<name>[\w.-]+)$"), # ANAC (dati.anticorruzione.it)
+    re.compile(r"^/export/csv/(?P<name>[\w.-]+)$"), # Open BDAP (bdap-opendata.rgs.mef.gov.it)
+]
+MOCK_CHUNK_SIZE = 256 * 1024 # bytes sent per write
+
+### FUNCTIONS ###
+class MockHandler(BaseHTTPRequestHandler):
+    """
+    Request handler serving the files of 'root' at the paths of MOCK_ROUTES.
+    """
+
+    protocol_version = "HTTP/1.1" # keep-alive, as the real servers
+
+    def __init__(self, *args, root: Path = None, latency: float = 0.0, rate: float = 0.0, **kwargs):
+        self.root = root
+        self.latency = latency
+        self.rate = rate
+        super().__init__(*args, **kwargs)
+
+    def log_message(self, format, *args):
+        pass # no log line per request
+
+    def file_resolve(self) -> Path:
+        """
+        Returns the file of the request path (None if the path does not match a route or the file does not exist).
+        """
+
+        path = self.path.split("?", 1)[0]
+        for route in MOCK_ROUTES:
+            match = route.match(path)
+            if match:
+                path_file = self.root / match.group("name")
+                return path_file if path_file.is_file() else None
+        return None
+
+    def do_HEAD(self):
+        self.respond(body=False)
+
+    def do_GET(self):
+        self.respond(body=True)
+
+    def respond(self, body: bool) -> None:
+        """
+        Answers a request: 404, 304 (If-None-Match / If-Modified-Since), 416, 206 (Range 'bytes=N-' or 'bytes=N-M', If-Range) or 200.
+        """
+
+        if self.latency > 0:
+            time.sleep(self.latency)
+        path_file = self.file_resolve()
+        if path_file is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        stat = path_file.stat()
+        size = stat.st_size
+        etag = f'"{stat.st_mtime_ns:x}-{size:x}"'
+        last_modified = email.utils.formatdate(stat.st_mtime, usegmt=True)
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if self.headers.get("If-None-Match") == etag or (self.headers.get("If-None-Match") is None and if_modified_since == last_modified):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        start, end, status = 0, size - 1, 200
+        match = re.match(r"^bytes=(\d+)-(\d*)$", self.headers.get("Range", ""))
+        if_range = self.headers.get("If-Range")
+        if match and if_range is not None and if_range not in (etag, last_modified):
+            match = None # the file changed since the partial download: the whole file is sent
+        if match:
+            start = int(match.group(1))
+            end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+            if start >= size or start > end:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            status = 206
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/zip" if path_file.suffix == ".zip" else "text/csv")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", last_modified)
+        self.send_header("Accept-Ranges", "bytes")
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.end_headers()
+        if body:
+            self.file_send(path_file, start, end - start + 1)
+
+    def file_send(self, path_file: Path, start: int, length: int) -> None:
+        """
+        Sends a byte range of a file, at most 'rate' bytes per second (0 = no limit).
+        """
+
+        begin = time.perf_counter()
+        sent = 0
+        with open(path_file, "rb") as fp:
+            fp.seek(start)
+            while sent < length:
+                chunk = fp.read(min(MOCK_CHUNK_SIZE, length - sent))
+                if not chunk:
+                    break
+                try:
+                    self.wfile.write(chunk)
+                except (BrokenPipeError, ConnectionResetError):
+                    return
+                sent += len(chunk)
+                if self.rate > 0:
+                    delay = sent / self.rate - (time.perf_counter() - begin)
+                    if delay > 0:
+                        time.sleep(delay)
+
+def cert_create(cert_dir: str) -> tuple:
+    """
+    Creates a self-signed certificate for localhost with the openssl command (url_download does not verify certificates).
+
+    Parameters:
+        cert_dir (str): the directory of the certificate and key.
+
+    Returns:
+        tuple: the paths of the certificate and of the key.
+    """
+
+    path_cert = Path(cert_dir) / "mock_cert.pem"
+    path_key = Path(cert_dir) / "mock_key.pem"
+    if not (path_cert.is_file() and path_key.is_file()):
+        subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "7", "-subj", "/CN=localhost",
+                        "-keyout", str(path_key), "-out", str(path_cert)], check=True, capture_output=True)
+    return path_cert, path_key
+
+def server_create(root: str, host: str = "127.0.0.1", port: int = 0, https: bool = False, latency_ms: float = 0, rate_mbps: float = 0) -> ThreadingHTTPServer:
+    """
+    Creates the mock server (see MockHandler); with 'https', the certificate is created in 'root' (see cert_create).
+
+    Parameters:
+        root (str): the directory of the served files.
+        host (str): the address of the server.
+        port (int): the port (0 = any free port, see server.server_address).
+        https (bool): whether to serve HTTPS.
+        latency_ms (float): the delay before each answer, in milliseconds.
+        rate_mbps (float): the bandwidth of each connection, in MB/s (0 = no limit).
+
+    Returns:
+        ThreadingHTTPServer: the server (to be run with serve_forever).
+    """
+
+    handler = partial(MockHandler, root=Path(root), latency=latency_ms / 1000, rate=rate_mbps * 1024 ** 2)
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    if https:
+        path_cert, path_key = cert_create(root)
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(path_cert, path_key)
+        server.socket = context.wrap_socket(server.socket, server_side=True, do_handshake_on_connect=False) # handshake in the request thread
+    return server
+
+def server_url(server: ThreadingHTTPServer, https: bool = False) -> str:
+    """
+    Returns the base URL of the mock server (e.g., http://127.0.0.1:8443), to replace the scheme and host of the real URLs.
+
+    Parameters:
+        server (ThreadingHTTPServer): the server.
+        https (bool): whether the server serves HTTPS.
+
+    Returns:
+        str: the base URL.
+    """
+
+    host, port = server.server_address[:2]
+    return f"{'https' if https else 'http'}://{host}:{port}"
+
+### MAIN ###
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in of the ANAC and Open BDAP download servers.")
+    parser.add_argument("root", help="directory of the served files")
+    parser.add_argument("--host", default="127.0.0.1", help="address of the server")
+    parser.add_argument("--port", type=int, default=8443, help="port of the server (0 = any free port)")
+    parser.add_argument("--https", action="store_true", help="serve HTTPS with a self-signed certificate")
+    parser.add_argument("--latency-ms", type=float, default=0, help="delay before each answer, in milliseconds")
+    parser.add_argument("--rate-mbps", type=float, default=0, help="bandwidth of each connection, in MB/s (0 = no limit)")
+    args = parser.parse_args()
+
+    server = server_create(args.root, args.host, args.port, args.https, args.latency_ms, args.rate_mbps)
+    print(f"Serving '{args.root}' at {server_url(server, args.https)} (Ctrl+C to stop)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+# pipeline_benchmark.py
+
+"""
+Script name: pipeline_benchmark.py
+Author: R. Nai
+Creation date: 17/10/2026
+Description: offline benchmark of the pipeline stages on synthetic data: the ANAC archives and the BDAP registry are generated
+(anac_data_generate.py) and served by the local mock server (mock_server.py) at the paths of the real URLs; then the stages run in a
+work directory with the parameters of config.yml: download (url_download), verify (verify_downloads), unzip (url_unzip),
+merge (merge_csv_files) and select (02_anac_od_select.py, in its own process, with its run report).
+Time, peak memory (RSS) and counters of every stage are written to a JSON report (see utility_manager/metrics.py); with --baseline,
+the stages slower (or larger in memory) than a previous report beyond the tolerance are listed and the exit code is 1.
+Usage: python benchmarks/pipeline_benchmark.py [--rows 1000000] [--stages download verify unzip merge select] [--https] [--data-dir DIR] [--baseline REPORT]
+"""
+
+### IMPORT ###
+import argparse
+import importlib
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from urllib.parse import urlparse
+
+### LOCAL IMPORT ###
+REPO_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_DIR))
+from config import config_reader
+from utility_manager.utilities import url_download, verify_downloads, url_unzip, read_urls_from_json
+from utility_manager.metrics import metrics_start, metrics_stage, metrics_count, metrics_update, metrics_write
+from anac_data_generate import anac_generate, months_generate
+
+### GLOBALS ###
+yaml_config = config_reader.config_read_yaml("config.yml") # config directory, whatever the working directory
+year_start = int(yaml_config["YEAR_START_DOWNLOAD"])
+year_end = int(yaml_config["YEAR_END_DOWNLOAD"])
+cig_prefix = str(yaml_config["CIG_PREFIX"])
+url_dynamic_file = str(yaml_config["ANAC_DYNAMIC_URLS_JSON"])
+bdap_url_statics_file = str(yaml_config["BDAP_STATIC_URLS_JSON"])
+anac_download_dir = str(yaml_config["ANAC_DOWNLOAD_DIR"])
+data_dir = str(yaml_config["OD_ANAC_DIR"])
+pa_reg_dir = str(yaml_config["OD_BDAP_DIR"])
+pa_reg_file = str(yaml_config["OD_BDAP_FILE"])
+download_workers = int(yaml_config.get("DOWNLOAD_WORKERS", 1))
+download_max_per_host = int(yaml_config.get("DOWNLOAD_MAX_PER_HOST", 4))
+verify_workers = int(yaml_config.get("VERIFY_WORKERS", 0)) or None # None = number of CPUs
+unzip_workers = int(yaml_config.get("UNZIP_WORKERS", 1))
+anac_unzip_member_suffixes = yaml_config.get("ANAC_UNZIP_MEMBER_SUFFIXES") or None
+select_json_files = [str(yaml_config["ANAC_OD_SELECT"]), str(yaml_config["ANAC_OD_REGION"])] # read by 02_anac_od_select.py from the working directory
+
+BENCHMARK_STAGES = ["download", "verify", "unzip", "merge", "select"]
+BENCHMARK_MIN_SECONDS = 0.5 # differences below this time are not regressions (noise)
+BENCHMARK_MIN_MB = 20 # differences below this memory are not regressions (noise)
+DATA_PARAMS_FILE = "generate_params.json" # parameters of the generated data (reused if the same)
+
+### FUNCTIONS ###
+def data_prepare(data_dir_mock: Path, rows: int, registry_rows: int, seed: int, workers: int) -> dict:
+    """
+    Generates the served data (see anac_data_generate.py), unless the directory already holds the data generated with the same parameters.
+
+    Parameters:
+        data_dir_mock (Path): the directory of the served files.
+        rows (int): the number of rows (duplicates excluded).
+        registry_rows (int): the number of entities of the registry.
+        seed (int): the random seed.
+        workers (int): the number of generation processes.
+
+    Returns:
+        dict: the generation parameters and results.
+    """
+
+    months = months_generate(year_start, year_end)
+    params = {"rows": rows, "registry_rows": registry_rows, "seed": seed, "months": [f"{year}_{month:02d}" for year, month in months]}
+    path_params = data_dir_mock / DATA_PARAMS_FILE
+    if path_params.is_file():
+        dic_params = json.loads(path_params.read_text())
+        if {key: dic_params.get(key) for key in params} == params:
+            print(f"Data already generated in '{data_dir_mock}'")
+            return dic_params
+        shutil.rmtree(data_dir_mock)
+    start = time.perf_counter()
+    dic_result = anac_generate(data_dir_mock, months, rows, registry_rows, seed, workers=workers)
+    params.update(dic_result, seconds=round(time.perf_counter() - start, 1))
+    path_params.write_text(json.dumps(params, indent=2))
+    return params
+
+def port_free() -> int:
+    """
+    Returns a free TCP port of localhost.
+
+    Parameters:
+        None
+
+    Returns:
+        int: the port.
+    """
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def server_start(data_dir_mock: Path, https: bool, latency_ms: float, rate_mbps: float) -> tuple:
+    """
+    Starts the mock server in its own process (so that it does not share the interpreter with the measured stages) and waits until it accepts connections.
+
+    Parameters:
+        data_dir_mock (Path): the directory of the served files.
+        https (bool): whether to serve HTTPS.
+        latency_ms (float): the delay before each answer, in milliseconds.
+        rate_mbps (float): the bandwidth of each connection, in MB/s (0 = no limit).
+
+    Returns:
+        tuple: the server process and its base URL.
+    """
+
+    port = port_free()
+    cmd = [sys.executable, str(Path(__file__).with_name("mock_server.py")), str(data_dir_mock), "--port", str(port),
+           "--latency-ms", str(latency_ms), "--rate-mbps", str(rate_mbps)] + (["--https"] if https else [])
+    process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL)
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            break
+        except OSError:
+            if process.poll() is not None:
+                raise RuntimeError("Mock server not started")
+            time.sleep(0.1)
+    return process, f"{'https' if https else 'http'}://127.0.0.1:{port}"
+
+def url_local(url: str, base_url: str) -> str:
+    """
+    Replaces the scheme and host of a URL with the ones of the mock server.
+
+    Parameters:
+        url (str): the real URL.
+        base_url (str): the base URL of the mock server.
+
+    Returns:
+        str: the local URL.
+    """
+
+    parsed = urlparse(url)
+    return base_url + parsed.path + (f"?{parsed.query}" if parsed.query else "")
+
+def select_run(work_dir: Path, memory_budget: int, report: dict) -> None:
+    """
+    Runs 02_anac_od_select.py in the work directory (in its own process) and adds the stages of its run report to the benchmark report (as select.<stage>).
+
+    Parameters:
+        work_dir (Path): the work directory.
+        memory_budget (int): the memory budget of the partitioned mode, in MB (None = ANAC_MEMORY_BUDGET_MB).
+        report (dict): the benchmark report (updated).
+
+    Returns:
+        None
+    """
+
+    for json_file in select_json_files:
+        shutil.copy(REPO_DIR / json_file, work_dir / json_file)
+    script = REPO_DIR / "02_anac_od_select.py"
+    cmd = [sys.executable, str(script)] + (["--memory-budget", str(memory_budget)] if memory_budget is not None else [])
+    with open(work_dir / "select_output.txt", "w") as fp:
+        subprocess.run(cmd, cwd=work_dir, stdout=fp, stderr=subprocess.STDOUT, check=True)
+    dic_select = json.loads((work_dir / f"{script.stem}.report.json").read_text())
+    for name, stage in dic_select["stages"].items():
+        report["stages"][f"select.{name}"] = stage
+    report["peak_rss_mb"] = max(report["peak_rss_mb"] or 0, dic_select["peak_rss_mb"] or 0)
+
+def benchmark_run(args: argparse.Namespace) -> dict:
+    """
+    Runs the benchmark (see the module description).
+
+    Parameters:
+        args (argparse.Namespace): the command line arguments.
+
+    Returns:
+        dict: the benchmark report.
+    """
+
+    work_dir = Path(args.work_dir or tempfile.mkdtemp(prefix="anac_benchmark_")).resolve()
+    work_dir.mkdir(parents=True, exist_ok=True)
+    data_dir_mock = Path(args.data_dir) if args.data_dir else work_dir / "mock"
+    print("Work directory:", work_dir)
+
+    print(">> Generating the data")
+    dic_data = data_prepare(data_dir_mock, args.rows, args.registry_rows, args.seed, args.workers)
+    print()
+
+    # The scripts read config/config.yml and the directories of config.yml relative to the working directory: the work directory gets a copy of the config
+    for dir_name in [anac_download_dir, data_dir, pa_reg_dir]:
+        shutil.rmtree(work_dir / dir_name, ignore_errors=True)
+        (work_dir / dir_name).mkdir(parents=True)
+    (work_dir / "config").mkdir(exist_ok=True)
+    shutil.copy(REPO_DIR / "config" / "config.yml", work_dir / "config" / "config.yml")
+    download_dir = work_dir / anac_download_dir
+    os.chdir(work_dir)
+
+    report = metrics_start(__file__)
+    report["params"] = {
+        "rows": args.rows, "registry_rows": args.registry_rows, "seed": args.seed, "https": args.https, "latency_ms": args.latency_ms,
+        "rate_mbps": args.rate_mbps, "memory_budget": args.memory_budget, "archives": dic_data.get("archives"), "data_bytes": dic_data.get("bytes"),
+    }
+    server, base_url = server_start(data_dir_mock, args.https, args.latency_ms, args.rate_mbps)
+    try:
+        if "download" in args.stages:
+            print(">> Download")
+            m01 = importlib.import_module("01_anac_od_download")
+            list_urls = m01.url_generate(year_start, year_end, m01.list_months, read_urls_from_json(REPO_DIR / url_dynamic_file, "cig"), "cig")
+            list_urls = [url_local(url, base_url) for url in list_urls]
+            list_urls_bdap = [url_local(url, base_url) for url in read_urls_from_json(REPO_DIR / bdap_url_statics_file)]
+            with metrics_stage(report, "download"):
+                metrics_update(report, url_download(list_urls, str(download_dir), download_workers, download_max_per_host))
+                metrics_update(report, url_download(list_urls_bdap, str(work_dir / pa_reg_dir), download_workers, download_max_per_host, refresh=True))
+            print()
+        else:
+            for path_file in data_dir_mock.glob(f"{cig_prefix}*.zip"): # same files as downloaded
+                shutil.copy(path_file, download_dir / path_file.name)
+            shutil.copy(data_dir_mock / pa_reg_file, work_dir / pa_reg_dir / pa_reg_file)
+        if "verify" in args.stages:
+            print(">> Verify")
+            with metrics_stage(report, "verify"):
+                metrics_count(report, "damaged", len(verify_downloads(str(download_dir), verify_workers)))
+            print()
+        if "unzip" in args.stages:
+            print(">> Unzip")
+            with metrics_stage(report, "unzip"):
+                metrics_count(report, "files_unzipped", len(url_unzip(str(download_dir), unzip_workers, anac_unzip_member_suffixes, force=True)))
+            print()
+        if "merge" in args.stages or "select" in args.stages: # the select stage reads the merged file
+            print(">> Merge")
+            m01 = importlib.import_module("01_anac_od_download")
+            with metrics_stage(report, "merge"):
+                lines = m01.merge_csv_files(str(download_dir), str(work_dir / data_dir), cig_prefix, m01.merge_file)
+                metrics_count(report, "lines_written", lines)
+                metrics_count(report, "bytes_written", (work_dir / data_dir / m01.merge_file).stat().st_size)
+            print()
+    finally:
+        server.terminate()
+        server.wait()
+    if "select" in args.stages:
+        print(">> Select (02_anac_od_select.py)")
+        select_run(work_dir, args.memory_budget, report)
+        print()
+    os.chdir(REPO_DIR)
+    if args.work_dir is None and not args.keep:
+        shutil.rmtree(work_dir)
+    return report
+
+def benchmark_compare(report: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Compares the stages of a report with a baseline report: a stage is a regression if its time or peak RSS grew beyond the tolerance
+    (and beyond BENCHMARK_MIN_SECONDS or BENCHMARK_MIN_MB).
+
+    Parameters:
+        report (dict): the benchmark report.
+        baseline (dict): the baseline report.
+        tolerance (float): the relative tolerance (e.g., 0.2 = 20%).
+
+    Returns:
+        list: the regressions (text).
+    """
+
+    list_regressions = []
+    for name, stage in report["stages"].items():
+        stage_base = baseline.get("stages", {}).get(name)
+        if stage_base is None:
+            continue
+        if stage["seconds"] > stage_base["seconds"] * (1 + tolerance) and stage["seconds"] - stage_base["seconds"] > BENCHMARK_MIN_SECONDS:
+            list_regressions.append(f"{name}: time {stage_base['seconds']:.2f} s -> {stage['seconds']:.2f} s")
+        peak, peak_base = stage.get("peak_rss_mb"), stage_base.get("peak_rss_mb")
+        if peak and peak_base and peak > peak_base * (1 + tolerance) and peak - peak_base > BENCHMARK_MIN_MB:
+            list_regressions.append(f"{name}: peak RSS {peak_base:.0f} MB -> {peak:.0f} MB")
+    return list_regressions
+
+def print_report(report: dict, baseline: dict = None) -> None:
+    """
+    Prints the stages of a report (time, peak RSS, counters), with the baseline time when given.
+
+    Parameters:
+        report (dict): the benchmark report.
+        baseline (dict, optional): the baseline report.
+
+    Returns:
+        None
+    """
+
+    print(f"{'stage':<24}{'seconds':>10}{'baseline':>10}{'peak MB':>10}  counters")
+    for name, stage in report["stages"].items():
+        stage_base = (baseline or {}).get("stages", {}).get(name, {})
+        seconds_base = f"{stage_base['seconds']:.2f}" if "seconds" in stage_base else "-"
+        counters = {key: value for key, value in stage.items() if key not in ("seconds", "peak_rss_mb")}
+        print(f"{name:<24}{stage['seconds']:>10.2f}{seconds_base:>10}{stage.get('peak_rss_mb') or 0:>10.0f}  {counters}")
+
+### MAIN ###
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark of the pipeline stages on synthetic ANAC data.")
+    parser.add_argument("--rows", type=int, default=1000000, help="number of ANAC rows (duplicates excluded), split over the months of YEAR_START_DOWNLOAD-YEAR_END_DOWNLOAD")
+    parser.add_argument("--registry-rows", type=int, default=20000, help="number of entities of the BDAP registry")
+    parser.add_argument("--seed", type=int, default=0, help="random seed of the data")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of data generation processes")
+    parser.add_argument("--stages", nargs="+", choices=BENCHMARK_STAGES, default=BENCHMARK_STAGES, help="stages to be run (merge also runs for select)")
+    parser.add_argument("--work-dir", default=None, help="work directory (default: a new temporary directory)")
+    parser.add_argument("--data-dir", default=None, help="directory of the generated data, reused across runs (default: WORK_DIR/mock)")
+    parser.add_argument("--https", action="store_true", help="serve the data over HTTPS (self-signed certificate, requires openssl)")
+    parser.add_argument("--latency-ms", type=float, default=0, help="latency of the mock server, in milliseconds")
+    parser.add_argument("--rate-mbps", type=float, default=0, help="bandwidth per connection of the mock server, in MB/s (0 = no limit)")
+    parser.add_argument("--memory-budget", type=int, default=None, help="memory budget of 02_anac_od_select.py, in MB (default: ANAC_MEMORY_BUDGET_MB)")
+    parser.add_argument("--report-dir", default=".", help="directory of the JSON report (pipeline_benchmark.report.json)")
+    parser.add_argument("--keep", action="store_true", help="keep the temporary work directory")
+    parser.add_argument("--baseline", default=None, help="JSON report of a previous run to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="relative slowdown (or memory growth) reported as a regression")
+    args = parser.parse_args()
+
+    report_dir = Path(args.report_dir).resolve()
+    report_dir.mkdir(parents=True, exist_ok=True)
+    baseline = json.loads(Path(args.baseline).read_text()) if args.baseline else None
+    report = benchmark_run(args)
+    path_report = metrics_write(report, report_dir / f"{Path(__file__).stem}.log")
+    print_report(report, baseline)
+    print("Report:", path_report)
+
+    if baseline is not None:
+        list_regressions = benchmark_compare(report, baseline, args.tolerance)
+        for regression in list_regressions:
+            print("REGRESSION!", regression)
+        if list_regressions:
+            sys.exit(1)
+        print(f"No regressions (tolerance {args.tolerance:.0%})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+# test_select_incremental.py
+
+"""
+Tests of the incremental runs of 02_anac_od_select.py (ANAC_INCREMENTAL_DO in config.yml, see utility_manager/select_state.py):
+the outputs of a full run on N months, updated by an incremental run with month N+1, must be byte-identical to a full run on N+1 months.
+The data is generated by benchmarks/anac_data_generate.py (all the months in the same year, so the rows of the new month are merged
+inside the sorted outputs, not only appended).
+Usage: python -m pytest tests
+"""
+
+### IMPORT ###
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+import yaml
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+### LOCAL IMPORT ###
+from config import config_reader
+from anac_data_generate import anac_generate
+from utility_manager.select_state import csv_patch, text_sort
+from utility_manager.output_writer import csv_write
+
+### GLOBALS ###
+yaml_config = config_reader.config_read_yaml("config.yml", str(ROOT / "config"))
+cig_prefix = str(yaml_config["CIG_PREFIX"])
+MONTHS = [(2023, 1), (2023, 2), (2023, 3)] # the last one is added by the incremental run
+SORT_COLS = ["anno_pubblicazione", "cig"]
+
+### FUNCTIONS ###
+
+def work_create(work_dir: Path, data_dir: Path, months: list) -> Path:
+    """
+    Prepares a work directory for 02_anac_od_select.py: the configuration (incremental runs on the monthly archives), the filter files,
+    the PA registry and the archives of some months.
+
+    Parameters:
+        work_dir (Path): the work directory.
+        data_dir (Path): the directory of the generated data.
+        months (list): the (year, month) pairs of the archives to be copied.
+
+    Returns:
+        Path: the work directory.
+    """
+
+    config = dict(yaml_config)
+    config.update({"ANAC_READ_FROM_ZIP": True, "ANAC_INCREMENTAL_DO": True, "ANAC_DEDUP_KEYS": ["cig", "cod_cpv", "flag_prevalente"],
+                   "ANAC_PARQUET_DO": False, "ANAC_MEMORY_BUDGET_MB": 0, "OUTPUT_FORMAT": "csv"})
+    (work_dir / "config").mkdir(parents=True)
+    (work_dir / "config" / "config.yml").write_text(yaml.safe_dump(config, sort_keys=False))
+    for json_file in (config["ANAC_OD_SELECT"], config["ANAC_OD_REGION"]):
+        shutil.copy(ROOT / json_file, work_dir / json_file)
+    for dir_name in (config["ANAC_DOWNLOAD_DIR"], config["OD_BDAP_DIR"], config["OD_ANAC_DIR"], config["ANAC_STATS_DIR"]):
+        (work_dir / dir_name).mkdir(parents=True, exist_ok=True)
+    shutil.copy(data_dir / config["OD_BDAP_FILE"], work_dir / config["OD_BDAP_DIR"] / config["OD_BDAP_FILE"])
+    months_add(work_dir, data_dir, months)
+    return work_dir
+
+def months_add(work_dir: Path, data_dir: Path, months: list) -> None:
+    """
+    Copies the archives of some months into the download directory of a work directory.
+
+    Parameters:
+        work_dir (Path): the work directory.
+        data_dir (Path): the directory of the generated data.
+        months (list): the (year, month) pairs.
+
+    Returns:
+        None
+    """
+
+    for year, month in months:
+        name = f"{cig_prefix}{year:04d}_{month:02d}.zip"
+        shutil.copy2(data_dir / name, work_dir / yaml_config["ANAC_DOWNLOAD_DIR"] / name)
+
+def select_run(work_dir: Path) -> str:
+    """
+    Runs 02_anac_od_select.py in a work directory.
+
+    Parameters:
+        work_dir (Path): the work directory.
+
+    Returns:
+        str: the output of the script.
+    """
+
+    process = subprocess.run([sys.executable, str(ROOT / "02_anac_od_select.py")], cwd=work_dir, capture_output=True, text=True)
+    assert process.returncode == 0, process.stdout + process.stderr
+    return process.stdout
+
+def output_files(work_dir: Path) -> dict:
+    """
+    Returns the content of the selection outputs and stats of a work directory.
+
+    Parameters:
+        work_dir (Path): the work directory.
+
+    Returns:
+        dict: the bytes of every file, by path relative to the work directory.
+    """
+
+    list_files = sorted((work_dir / yaml_config["OD_ANAC_DIR"]).glob("*.csv")) + sorted((work_dir / yaml_config["ANAC_STATS_DIR"]).glob("*.csv"))
+    return {str(path.relative_to(work_dir)): path.read_bytes() for path in list_files}
+
+@pytest.fixture(scope="module")
+def data_dir(tmp_path_factory):
+    data_dir = tmp_path_factory.mktemp("data")
+    anac_generate(str(data_dir), MONTHS, rows=6000, registry_rows=400, seed=1, workers=1)
+    return data_dir
+
+def test_incremental_same_as_full(tmp_path, data_dir):
+    work_full = work_create(tmp_path / "full", data_dir, MONTHS)
+    select_run(work_full)
+
+    work_inc = work_create(tmp_path / "incremental", data_dir, MONTHS[:-1])
+    assert "Incremental run: False" in select_run(work_inc)
+    months_add(work_inc, data_dir, MONTHS[-1:])
+    output = select_run(work_inc)
+    assert "Incremental run: True (new sources: 1)" in output
+    assert "rewritten from row" in output # new keys sorted before the existing tail: truncate and rewrite
+
+    dic_full, dic_inc = output_files(work_full), output_files(work_inc)
+    assert sorted(dic_full) == sorted(dic_inc)
+    for name, content in dic_full.items():
+        assert dic_inc[name] == content, f"{name} differs from the full run"
+
+@pytest.mark.parametrize("engine", ["pandas", "arrow"])
+def test_csv_patch_missing_keys(tmp_path, engine):
+    if engine == "arrow":
+        pytest.importorskip("pyarrow")
+    rng = np.random.default_rng(0)
+    rows = 2000
+    cig = pd.Series([f"{value:010X}" for value in rng.integers(0, 16 ** 6, rows)], dtype=object)
+    cig[rng.random(rows) < 0.05] = np.nan # empty keys, sorted last
+    df = pd.DataFrame({"anno_pubblicazione": rng.choice(["2022", "2023"], rows), "cig": cig, "value": np.arange(rows).astype(str)})
+    new = rng.random(rows) < 0.2
+    path = tmp_path / "output.csv"
+    csv_write(df[~new].fillna("").pipe(text_sort, SORT_COLS), path, ";", engine)
+    csv_patch(df[new], path, SORT_COLS, ";", engine)
+
+    path_full = tmp_path / "full.csv"
+    csv_write(pd.concat([df[~new].fillna("").pipe(text_sort, SORT_COLS), df[new].fillna("")]).pipe(text_sort, SORT_COLS), path_full, ";", engine)
+    assert path.read_bytes() == path_full.read_bytes()
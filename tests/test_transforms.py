@@ -0,0 +1,57 @@
+# test_transforms.py
+
+"""
+Tests of the transformation rules of 02_anac_od_select.py (ANAC_TRANSFORMS in config.yml, see utility_manager/transforms.py).
+Usage: python -m pytest tests
+"""
+
+### IMPORT ###
+import json
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+### LOCAL IMPORT ###
+from config import config_reader
+from utility_manager.transforms import apply_transforms
+
+### GLOBALS ###
+yaml_config = config_reader.config_read_yaml("config.yml", str(ROOT / "config"))
+anac_transforms = dict(yaml_config.get("ANAC_TRANSFORMS", {}))
+regions = list(json.loads((ROOT / str(yaml_config["ANAC_OD_REGION"])).read_text()).values())
+
+### FUNCTIONS ###
+
+def regional_baseline(values: pd.Series) -> pd.Series:
+    """
+    Values of sezione_regionale in the regional outputs: the "SEZIONE REGIONALE " prefix stripped, then capitalized.
+
+    Parameters:
+        values (pd.Series): the values of the ANAC data.
+
+    Returns:
+        pd.Series: the expected values.
+    """
+
+    return values.str.replace("SEZIONE REGIONALE ", "", regex=False).str.capitalize()
+
+@pytest.mark.parametrize("dtype", ["object", "category"])
+def test_regional_sezione_regionale(dtype):
+    values = pd.Series(regions + [None], dtype=dtype)
+    df = pd.DataFrame({"sezione_regionale": values})
+    df = apply_transforms(df, anac_transforms.get("regional", []))
+    df = apply_transforms(df, anac_transforms.get("clean", []))
+    result = df["sezione_regionale"].astype(object)
+    expected = regional_baseline(pd.Series(regions + [None], dtype=object))
+    pd.testing.assert_series_equal(result.fillna(""), expected.fillna(""), check_names=False)
+    assert "Lombardia" in set(result)
+
+def test_clean_sezione_regionale():
+    df = pd.DataFrame({"sezione_regionale": regions})
+    df = apply_transforms(df, anac_transforms.get("clean", []))
+    assert list(df["sezione_regionale"]) == [value.replace("SEZIONE REGIONALE ", "") for value in regions]
@@ -0,0 +1,79 @@
+"""
+Schema of the ANAC "bando CIG" data (ANAC_CIG_SCHEMA in config.yml): column types used to read the CSV files into a compact DataFrame.
+Besides the pandas dtypes (e.g., "category", "string[pyarrow]", "Int8", "float64"), the type "datetime" parses the column as a date.
+[2026-10-17]: first version.
+"""
+
+import pandas as pd
+
+DATETIME_TYPE = "datetime"
+
+def schema_read_args(schema: dict) -> tuple:
+    """
+    Converts a schema into the arguments of pd.read_csv.
+
+    Parameters:
+        schema (dict): the schema (column: type).
+
+    Returns:
+        tuple: the columns to be read, the dtype mapping (date columns are read as strings) and the date columns.
+    """
+
+    col_list = list(schema)
+    date_cols = [col for col, col_type in schema.items() if col_type == DATETIME_TYPE]
+    col_type = {col: (object if col_type == DATETIME_TYPE else col_type) for col, col_type in schema.items() if col_type}
+    return col_list, col_type, date_cols
+
+def schema_apply(df: pd.DataFrame, schema: dict) -> pd.DataFrame:
+    """
+    Applies the schema to a DataFrame read with the arguments of schema_read_args (or concatenated from chunks):
+    date columns are parsed and categorical columns are restored with sorted categories (concatenating chunks with different categories gives object columns).
+
+    Parameters:
+        df (pd.DataFrame): the DataFrame.
+        schema (dict): the schema (column: type).
+
+    Returns:
+        pd.DataFrame: the DataFrame with the schema types.
+    """
+
+    for col, col_type in schema.items():
+        if col not in df.columns:
+            continue
+        if col_type == DATETIME_TYPE:
+            if not pd.api.types.is_datetime64_any_dtype(df[col]):
+                df[col] = pd.to_datetime(df[col], format="ISO8601", errors="coerce")
+        elif col_type == "category":
+            if not isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = df[col].astype("category")
+            elif not df[col].cat.categories.is_monotonic_increasing:
+                df[col] = df[col].cat.reorder_categories(df[col].cat.categories.sort_values())
+    return df
+
+def memory_report(path_source, schema: dict, csv_sep: str = ";", nrows: int = 200000) -> pd.DataFrame:
+    """
+    Compares the memory used by each column when a sample of a CSV source is read with the default pandas types and with the schema.
+
+    Parameters:
+        path_source (str): the path of the CSV source (.csv or single-CSV .zip).
+        schema (dict): the schema (column: type).
+        csv_sep (str): the delimiter used in the CSV file.
+        nrows (int): the number of rows of the sample.
+
+    Returns:
+        pd.DataFrame: per column, the dtype and bytes before and after and the reduction ratio (last row: total).
+    """
+
+    col_list, col_type, date_cols = schema_read_args(schema)
+    df_before = pd.read_csv(path_source, usecols=col_list, sep=csv_sep, nrows=nrows, low_memory=False)
+    df_after = schema_apply(pd.read_csv(path_source, usecols=col_list, dtype=col_type, sep=csv_sep, nrows=nrows, low_memory=False), schema)
+    df_report = pd.DataFrame({
+        "column": col_list,
+        "dtype_before": [str(df_before[col].dtype) for col in col_list],
+        "bytes_before": [int(df_before[col].memory_usage(index=False, deep=True)) for col in col_list],
+        "dtype_after": [str(df_after[col].dtype) for col in col_list],
+        "bytes_after": [int(df_after[col].memory_usage(index=False, deep=True)) for col in col_list],
+    })
+    df_report.loc[len(df_report)] = ["total", "", df_report["bytes_before"].sum(), "", df_report["bytes_after"].sum()]
+    df_report["ratio"] = (df_report["bytes_before"] / df_report["bytes_after"].clip(lower=1)).round(2)
+    return df_report
@@ -0,0 +1,136 @@
+"""
+Key-based deduplication of the ANAC "bando CIG" rows (ANAC_DEDUP_KEYS in config.yml).
+A row is a duplicate if its key (e.g., cig, cod_cpv, flag_prevalente) was already seen in the same or in an earlier monthly file: the first occurrence is kept.
+Keys are reduced to 64-bit hashes; the hashes of each monthly file can be persisted (one .npy file per source),
+so that a new month is deduplicated against the history without reading the history again.
+Without keys, the whole row is compared (pd.DataFrame.drop_duplicates).
+[2026-10-17]: first version.
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+DEDUP_KEYS_DIR = ".dedup_keys" # directory (inside the deduplicated store) with the key hashes of each source
+DEDUP_KEYS_SUFFIX = ".keys.npy"
+
+def key_hash(df: pd.DataFrame, keys: list) -> np.ndarray:
+    """
+    Hashes the key columns of each row (the hash depends on the values, not on the column types).
+
+    Parameters:
+        df (pd.DataFrame): the DataFrame.
+        keys (list): the key columns.
+
+    Returns:
+        np.ndarray: the uint64 hashes, one per row.
+    """
+
+    return pd.util.hash_pandas_object(df[keys], index=False).to_numpy()
+
+def seen_mask(hashes: np.ndarray, seen: np.ndarray) -> np.ndarray:
+    """
+    Marks the hashes already in a seen-key set.
+
+    Parameters:
+        hashes (np.ndarray): the hashes to be checked.
+        seen (np.ndarray): the seen-key set (sorted unique uint64 hashes).
+
+    Returns:
+        np.ndarray: a boolean mask, True for the hashes in the set.
+    """
+
+    if len(seen) == 0:
+        return np.zeros(len(hashes), dtype=bool)
+    pos = np.searchsorted(seen, hashes).clip(max=len(seen) - 1)
+    return seen[pos] == hashes
+
+def seen_update(seen: np.ndarray, hashes: np.ndarray) -> np.ndarray:
+    """
+    Adds hashes to a seen-key set.
+
+    Parameters:
+        seen (np.ndarray): the seen-key set (sorted unique uint64 hashes).
+        hashes (np.ndarray): the hashes to be added.
+
+    Returns:
+        np.ndarray: the updated seen-key set.
+    """
+
+    # Two sorted runs: the stable sort (timsort) merges them in linear time
+    merged = np.sort(np.concatenate((seen, np.unique(hashes))), kind="stable")
+    if len(merged) == 0:
+        return merged
+    return merged[np.concatenate(([True], merged[1:] != merged[:-1]))]
+
+def dedup_rows(df: pd.DataFrame, keys: list, seen: np.ndarray = None) -> tuple:
+    """
+    Drops the rows whose key is repeated in the DataFrame (the first one is kept) or is already in the seen-key set.
+
+    Parameters:
+        df (pd.DataFrame): the DataFrame.
+        keys (list): the key columns; empty to compare the whole row (the seen-key set is then ignored).
+        seen (np.ndarray, optional): the seen-key set.
+
+    Returns:
+        tuple: a boolean mask of the rows to be kept and the updated seen-key set.
+    """
+
+    seen = np.empty(0, dtype=np.uint64) if seen is None else seen
+    if not keys:
+        return (~df.duplicated()).to_numpy(), seen
+    hashes = key_hash(df, keys)
+    mask = ~(pd.Series(hashes).duplicated().to_numpy() | seen_mask(hashes, seen))
+    return mask, seen_update(seen, hashes)
+
+def seen_keys_path(store_dir: str, source_name: str) -> Path:
+    """
+    Returns the path of the persisted key hashes of a source.
+
+    Parameters:
+        store_dir (str): the directory of the deduplicated store.
+        source_name (str): the source name (e.g., "cig_csv_2023_01").
+
+    Returns:
+        Path: the .npy file path.
+    """
+
+    return Path(store_dir) / DEDUP_KEYS_DIR / f"{source_name}{DEDUP_KEYS_SUFFIX}"
+
+def seen_keys_load(store_dir: str, source_names: list) -> np.ndarray:
+    """
+    Loads the seen-key set of some sources (e.g., the months before the one being added).
+
+    Parameters:
+        store_dir (str): the directory of the deduplicated store.
+        source_names (list): the source names; sources without persisted hashes are skipped.
+
+    Returns:
+        np.ndarray: the seen-key set (sorted unique uint64 hashes).
+    """
+
+    list_hashes = [np.load(path) for path in (seen_keys_path(store_dir, name) for name in source_names) if path.exists()]
+    if not list_hashes:
+        return np.empty(0, dtype=np.uint64)
+    return np.unique(np.concatenate(list_hashes))
+
+def seen_keys_save(store_dir: str, source_name: str, hashes: np.ndarray) -> None:
+    """
+    Persists the key hashes of a source (all its rows, duplicates included).
+
+    Parameters:
+        store_dir (str): the directory of the deduplicated store.
+        source_name (str): the source name.
+        hashes (np.ndarray): the key hashes of the source.
+
+    Returns:
+        None
+    """
+
+    path = seen_keys_path(store_dir, source_name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path_tmp = path.with_name(path.name + ".tmp")
+    with open(path_tmp, 'wb') as fp:
+        np.save(fp, np.unique(hashes))
+    path_tmp.replace(path)
@@ -0,0 +1,416 @@
+"""
+Out-of-core enrichment of the selected tenders with the award and execution datasets (ANAC_ENRICH_DATASETS in config.yml),
+used by 03_anac_od_enrich.py.
+The datasets share the 'cig' key but may have many rows per tender (e.g., one per winner of a tender): each dataset is reduced
+to one row per cig ("first": the values of its first row; "join": the distinct values joined with " | ") plus the number of rows
+('n_<dataset>'), and joined to the tenders (left join, the tender rows keep their order).
+The join is a partitioned (Grace) hash join with a bounded memory budget:
+    1. the tenders and the datasets are streamed in blocks and spilled to disk (Arrow IPC streams), split into partitions by the hash of 'cig';
+    2. each partition (tenders and datasets with the same cig hashes) is joined in memory and spilled again;
+    3. the joined partitions are merged back into the order of the tenders, a window of rows at a time, and written as CSV.
+All the values are read and written as text (Arrow CSV reader and writer), so the tender columns are written as they were read.
+Requires pyarrow.
+[2026-10-17]: first version.
+"""
+
+import math
+import re
+import tempfile
+import zipfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from utility_manager.dedup import key_hash
+from utility_manager.output_writer import arrow_import, arrow_write_options
+from utility_manager.sqlite_store import source_dataset
+from utility_manager.utilities import csv_open, csv_sources
+
+ENRICH_KEY = "cig"
+ROW_COLUMN = "_row" # position of the tender row, to restore the order after the join
+ENRICH_MEMORY_FACTOR = 4 # memory of a partition in pandas (text columns) per byte of CSV text
+ENRICH_MAX_PARTITIONS = 512 # spill files open at the same time
+JOIN_SEP = " | "
+
+def dataset_column(dataset: str, col: str) -> str:
+    """
+    Returns the name of a dataset column in the enriched output (e.g., "fine-contratto", "importo" -> "fine_contratto_importo").
+
+    Parameters:
+        dataset (str): the dataset name.
+        col (str): the column name.
+
+    Returns:
+        str: the output column name.
+    """
+
+    return re.sub(r"\W", "_", dataset).lower() + "_" + col
+
+def count_column(dataset: str) -> str:
+    """
+    Returns the name of the row count of a dataset in the enriched output (e.g., "fine-contratto" -> "n_fine_contratto").
+
+    Parameters:
+        dataset (str): the dataset name.
+
+    Returns:
+        str: the output column name.
+    """
+
+    return "n_" + re.sub(r"\W", "_", dataset).lower()
+
+def dataset_source(source_dir: str, dataset: str):
+    """
+    Finds the source of a dataset in the download directory: the latest dated snapshot (YYYYMMDD-<dataset>_csv), or the undated file.
+
+    Parameters:
+        source_dir (str): the directory containing the downloaded files.
+        dataset (str): the dataset name (e.g., "aggiudicazioni").
+
+    Returns:
+        Path: the .zip or .csv source, None if the dataset was not downloaded.
+    """
+
+    table = source_dataset(f"{dataset}_csv")[0]
+    list_sources = [source for source in csv_sources(source_dir, "") if source_dataset(source.stem)[0] == table]
+    list_sources.sort(key=lambda source: source_dataset(source.stem)[1] or "")
+    return list_sources[-1] if list_sources else None
+
+def source_bytes(path_source: str) -> int:
+    """
+    Estimates the size of the CSV text of a source (uncompressed size of the archive members, of gzip files; file size otherwise).
+
+    Parameters:
+        path_source (str): the source path.
+
+    Returns:
+        int: the size in bytes.
+    """
+
+    path_source = Path(path_source)
+    if path_source.suffix.lower() == ".zip":
+        with zipfile.ZipFile(path_source) as zip_ref:
+            return sum(info.file_size for info in zip_ref.infolist())
+    if path_source.suffix.lower() == ".gz":
+        with open(path_source, 'rb') as fp:
+            fp.seek(-4, 2)
+            return int.from_bytes(fp.read(4), "little") # ISIZE (modulo 2^32)
+    return path_source.stat().st_size
+
+def enrich_partitions(list_sources: list, memory_budget_mb: int) -> int:
+    """
+    Computes the number of partitions, so that a partition of the tenders and of all the datasets fits the memory budget.
+
+    Parameters:
+        list_sources (list): the sources (tenders and datasets).
+        memory_budget_mb (int): the memory budget in MB.
+
+    Returns:
+        int: the number of partitions.
+    """
+
+    total_bytes = sum(source_bytes(source) for source in list_sources)
+    n_partitions = max(1, math.ceil(total_bytes * ENRICH_MEMORY_FACTOR / (memory_budget_mb * 1024 ** 2)))
+    if n_partitions > ENRICH_MAX_PARTITIONS:
+        print(f"WARNING! The memory budget needs {n_partitions} partitions, limited to {ENRICH_MAX_PARTITIONS}.")
+    return min(n_partitions, ENRICH_MAX_PARTITIONS)
+
+def csv_stream(path_source: str):
+    """
+    Opens a CSV source as a binary stream: a .csv file (.gz and .zst files are decompressed) or the CSV member of a .zip archive.
+
+    Parameters:
+        path_source (str): the source path.
+
+    Returns:
+        a context manager of the binary stream.
+    """
+
+    if Path(path_source).suffix.lower() == ".zip":
+        return csv_open(path_source)
+    pa, pc, pcsv = arrow_import()
+    return pa.input_stream(str(path_source), compression="detect")
+
+def read_header(path_source: str, csv_sep: str) -> list:
+    """
+    Reads the column names of a CSV source.
+
+    Parameters:
+        path_source (str): the source path.
+        csv_sep (str): the delimiter used in the CSV file.
+
+    Returns:
+        list: the column names.
+    """
+
+    pa, pc, pcsv = arrow_import()
+    with csv_stream(path_source) as fp:
+        reader = pcsv.open_csv(fp, read_options=pcsv.ReadOptions(block_size=1024 ** 2), parse_options=pcsv.ParseOptions(delimiter=csv_sep, newlines_in_values=True))
+        return reader.schema.names
+
+def read_text_batches(path_source: str, csv_sep: str, columns: list, block_bytes: int):
+    """
+    Reads a CSV source in blocks of text columns.
+
+    Parameters:
+        path_source (str): the source path.
+        csv_sep (str): the delimiter used in the CSV file.
+        columns (list): the columns to be read.
+        block_bytes (int): the bytes of CSV text per block.
+
+    Yields:
+        pyarrow.RecordBatch: the blocks (all the values as strings, missing values as "").
+    """
+
+    pa, pc, pcsv = arrow_import()
+    convert_options = pcsv.ConvertOptions(include_columns=columns, column_types=dict.fromkeys(columns, pa.string()), strings_can_be_null=False, quoted_strings_can_be_null=False)
+    with csv_stream(path_source) as fp:
+        reader = pcsv.open_csv(fp, read_options=pcsv.ReadOptions(block_size=block_bytes), parse_options=pcsv.ParseOptions(delimiter=csv_sep, newlines_in_values=True), convert_options=convert_options)
+        yield from reader
+
+def spill_partitions(batches, spill_dir: Path, name: str, n_partitions: int, number_rows: bool = False) -> int:
+    """
+    Splits the blocks into partitions by the hash of the key and appends them to the spill files '<name>_<partition>.arrows'.
+
+    Parameters:
+        batches (iterable): the blocks (pyarrow.RecordBatch, with the key column).
+        spill_dir (Path): the spill directory.
+        name (str): the name of the spilled table.
+        n_partitions (int): the number of partitions.
+        number_rows (bool): whether the rows are numbered (ROW_COLUMN, first column).
+
+    Returns:
+        int: the number of rows spilled.
+    """
+
+    pa, pc, pcsv = arrow_import()
+    dic_writers = {}
+    rows = 0
+    try:
+        for batch in batches:
+            if number_rows:
+                batch = pa.RecordBatch.from_arrays([pa.array(np.arange(rows, rows + batch.num_rows))] + batch.columns, [ROW_COLUMN] + batch.schema.names)
+            keys = pd.DataFrame({ENRICH_KEY: batch.column(ENRICH_KEY).to_pandas()})
+            partition = key_hash(keys, [ENRICH_KEY]) % np.uint64(n_partitions)
+            # Rows grouped by partition (stable: each partition keeps the order of the rows)
+            order = np.argsort(partition, kind="stable")
+            bounds = np.searchsorted(partition[order], np.arange(n_partitions + 1, dtype=np.uint64))
+            batch_sorted = batch.take(pa.array(order))
+            for p in np.flatnonzero(np.diff(bounds)):
+                if p not in dic_writers:
+                    dic_writers[p] = pa.ipc.new_stream(str(spill_dir / f"{name}_{p}.arrows"), batch.schema)
+                dic_writers[p].write_batch(batch_sorted.slice(bounds[p], bounds[p + 1] - bounds[p]))
+            rows += batch.num_rows
+    finally:
+        for writer in dic_writers.values():
+            writer.close()
+    return rows
+
+def read_spill(spill_dir: Path, name: str, p: int, columns: list) -> pd.DataFrame:
+    """
+    Reads a partition of a spilled table.
+
+    Parameters:
+        spill_dir (Path): the spill directory.
+        name (str): the name of the spilled table.
+        p (int): the partition.
+        columns (list): the columns of the table (for an empty partition).
+
+    Returns:
+        pd.DataFrame: the partition (text columns).
+    """
+
+    pa, pc, pcsv = arrow_import()
+    path_part = spill_dir / f"{name}_{p}.arrows"
+    if not path_part.exists():
+        return pd.DataFrame({col: pd.Series(dtype=object) for col in columns})
+    with pa.ipc.open_stream(str(path_part)) as reader:
+        return reader.read_all().to_pandas()
+
+def join_values(keys: pd.Series, values: pd.Series) -> pd.Series:
+    """
+    Joins the values of each key with JOIN_SEP, in the order of the rows (vectorized: only the keys with more than one value are joined in Python).
+
+    Parameters:
+        keys (pd.Series): the keys.
+        values (pd.Series): the values (strings).
+
+    Returns:
+        pd.Series: the joined values, indexed by key (in order of first appearance).
+    """
+
+    codes, uniques = pd.factorize(keys)
+    order = np.argsort(codes, kind="stable")
+    sorted_values = values.to_numpy(dtype=object)[order]
+    sorted_codes = codes[order]
+    starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]]) if len(codes) else np.empty(0, dtype=np.int64)
+    ends = np.r_[starts[1:], len(codes)]
+    joined = sorted_values[starts]
+    for i in np.flatnonzero(ends - starts > 1):
+        joined[i] = JOIN_SEP.join(sorted_values[starts[i]:ends[i]])
+    return pd.Series(joined, index=pd.Index(uniques, name=keys.name), name=values.name)
+
+def dataset_reduce(df: pd.DataFrame, dataset: str, columns: list, agg: str = "first") -> pd.DataFrame:
+    """
+    Reduces the rows of a dataset to one row per key.
+
+    Parameters:
+        df (pd.DataFrame): the dataset rows (key and columns, in file order).
+        dataset (str): the dataset name.
+        columns (list): the dataset columns.
+        agg (str): "first" (values of the first row of the key) or "join" (distinct non-empty values joined with JOIN_SEP).
+
+    Returns:
+        pd.DataFrame: the reduced rows, indexed by key, with the columns named by dataset_column and the row count 'n_<dataset>'.
+    """
+
+    grouped = df.groupby(ENRICH_KEY, sort=False)
+    if agg == "first":
+        df_reduced = df.drop_duplicates(ENRICH_KEY).set_index(ENRICH_KEY)[columns]
+    elif agg == "join":
+        dic_joined = {}
+        for col in columns:
+            df_col = df.loc[df[col] != "", [ENRICH_KEY, col]].drop_duplicates()
+            dic_joined[col] = join_values(df_col[ENRICH_KEY], df_col[col])
+        df_reduced = pd.DataFrame(dic_joined, index=pd.Index(grouped.size().index, name=ENRICH_KEY))
+    else:
+        raise ValueError(f"Unknown aggregation of dataset '{dataset}': {agg} (aggregations: first, join)")
+    df_reduced = df_reduced.rename(columns={col: dataset_column(dataset, col) for col in columns})
+    df_reduced[count_column(dataset)] = grouped.size().astype(str)
+    return df_reduced
+
+def merge_partitions(spill_dir: Path, n_partitions: int, n_rows: int, columns: list, path_out: str, csv_sep: str, window_rows: int) -> None:
+    """
+    Merges the joined partitions (each in tender order) into the output CSV file (every field quoted), in the order of the tenders,
+    a window of rows at a time.
+
+    Parameters:
+        spill_dir (Path): the spill directory (joined partitions 'joined_<partition>.arrows').
+        n_partitions (int): the number of partitions.
+        n_rows (int): the number of tender rows.
+        columns (list): the output columns.
+        path_out (str): the output CSV file path.
+        csv_sep (str): the delimiter of the output.
+        window_rows (int): the rows written at a time.
+
+    Returns:
+        None
+    """
+
+    pa, pc, pcsv = arrow_import()
+    schema = pa.schema([(col, pa.string()) for col in columns])
+    list_readers = []
+    for p in range(n_partitions):
+        path_part = spill_dir / f"joined_{p}.arrows"
+        list_readers.append(pa.ipc.open_stream(str(path_part)) if path_part.exists() else None)
+    buffers = [None] * n_partitions
+    buffer_rows = [np.empty(0, dtype=np.int64) for _ in range(n_partitions)]
+
+    options = arrow_write_options(csv_sep)
+    with pcsv.CSVWriter(str(path_out), schema, write_options=options) as writer:
+        for start in range(0, n_rows, window_rows):
+            end = start + window_rows
+            list_window = []
+            for p, reader in enumerate(list_readers):
+                if reader is None:
+                    continue
+                # The partitions are sorted by row: read until the buffer passes the end of the window
+                while len(buffer_rows[p]) == 0 or buffer_rows[p][-1] < end:
+                    try:
+                        batch = reader.read_next_batch()
+                    except StopIteration:
+                        break
+                    buffers[p] = pa.Table.from_batches([batch]) if buffers[p] is None else pa.concat_tables([buffers[p], pa.Table.from_batches([batch])])
+                    buffer_rows[p] = buffers[p].column(ROW_COLUMN).to_numpy()
+                n_take = int(np.searchsorted(buffer_rows[p], end))
+                if n_take:
+                    list_window.append(buffers[p].slice(0, n_take))
+                    buffers[p], buffer_rows[p] = buffers[p].slice(n_take), buffer_rows[p][n_take:]
+            table_window = pa.concat_tables(list_window)
+            order = np.argsort(table_window.column(ROW_COLUMN).to_numpy(), kind="stable")
+            writer.write_table(table_window.take(pa.array(order)).select(columns))
+    for reader in list_readers:
+        if reader is not None:
+            reader.close()
+
+def enrich_tenders(path_tenders: str, path_out: str, source_dir: str, dic_datasets: dict, csv_sep: str = ";", memory_budget_mb: int = 1024) -> dict:
+    """
+    Enriches the tenders with the award and execution datasets (see the module description) and writes the enriched output.
+
+    Parameters:
+        path_tenders (str): the tenders CSV file (an output of 02_anac_od_select.py).
+        path_out (str): the enriched output CSV file path.
+        source_dir (str): the directory containing the downloaded datasets.
+        dic_datasets (dict): the datasets, as {dataset: {"columns": [...], "agg": "first" | "join"}}.
+        csv_sep (str): the delimiter used in the CSV files.
+        memory_budget_mb (int): the memory budget of a partition, in MB.
+
+    Returns:
+        dict: the number of tender rows, of partitions and of rows read per dataset.
+    """
+
+    if arrow_import() is None:
+        raise ImportError("The enrichment requires 'pyarrow' (pip install pyarrow).")
+    pa, pc, pcsv = arrow_import()
+
+    dic_sources = {}
+    for dataset, dic_dataset in dic_datasets.items():
+        path_source = dataset_source(source_dir, dataset)
+        if path_source is None:
+            print(f"WARNING! Dataset '{dataset}' not found in '{source_dir}', skipping.")
+            continue
+        header = read_header(path_source, csv_sep)
+        if ENRICH_KEY not in header:
+            print(f"WARNING! Dataset '{dataset}' ({path_source.name}) has no '{ENRICH_KEY}' column, skipping.")
+            continue
+        columns = [col for col in dic_dataset.get("columns", []) if col in header]
+        missing = [col for col in dic_dataset.get("columns", []) if col not in header]
+        if missing:
+            print(f"WARNING! Columns not in dataset '{dataset}' ({path_source.name}): {missing}")
+        dic_sources[dataset] = (path_source, columns, dic_dataset.get("agg", "first"))
+
+    n_partitions = enrich_partitions([path_tenders] + [source[0] for source in dic_sources.values()], memory_budget_mb)
+    budget_bytes = memory_budget_mb * 1024 ** 2
+    block_bytes = int(min(64 * 1024 ** 2, max(1024 ** 2, budget_bytes // (4 * ENRICH_MEMORY_FACTOR))))
+    print(f"Partitions: {n_partitions} (memory budget: {memory_budget_mb} MB)")
+    dic_result = {"partitions": n_partitions, "datasets": {}}
+
+    with tempfile.TemporaryDirectory(prefix=".enrich_", dir=Path(path_out).parent) as spill_name:
+        spill_dir = Path(spill_name)
+
+        # 1. Partitioning
+        print(f"Partitioning: {path_tenders}")
+        tender_columns = read_header(path_tenders, csv_sep)
+        n_rows = spill_partitions(read_text_batches(path_tenders, csv_sep, tender_columns, block_bytes), spill_dir, "tenders", n_partitions, number_rows=True)
+        dic_result["rows"] = n_rows
+        for dataset, (path_source, columns, agg) in dic_sources.items():
+            print(f"Partitioning: {path_source}")
+            batches = read_text_batches(path_source, csv_sep, [ENRICH_KEY] + columns, block_bytes)
+            dic_result["datasets"][dataset] = spill_partitions(batches, spill_dir, dataset, n_partitions)
+
+        # 2. Join of each partition
+        print("Joining the partitions")
+        out_columns = list(tender_columns)
+        for dataset, (path_source, columns, agg) in dic_sources.items():
+            out_columns += [dataset_column(dataset, col) for col in columns] + [count_column(dataset)]
+        count_columns = [count_column(dataset) for dataset in dic_sources]
+        joined_schema = pa.schema([(ROW_COLUMN, pa.int64())] + [(col, pa.string()) for col in out_columns])
+        for p in range(n_partitions):
+            df_part = read_spill(spill_dir, "tenders", p, [ROW_COLUMN] + tender_columns)
+            if len(df_part) == 0:
+                continue
+            for dataset, (path_source, columns, agg) in dic_sources.items():
+                df_dataset = dataset_reduce(read_spill(spill_dir, dataset, p, [ENRICH_KEY] + columns), dataset, columns, agg)
+                df_part = df_part.join(df_dataset, on=ENRICH_KEY) # left join, the order of the tenders is kept
+            df_part[count_columns] = df_part[count_columns].fillna("0") # tenders without rows in a dataset
+            table_part = pa.Table.from_pandas(df_part[[ROW_COLUMN] + out_columns].fillna(""), schema=joined_schema, preserve_index=False)
+            with pa.ipc.new_stream(str(spill_dir / f"joined_{p}.arrows"), joined_schema) as writer:
+                writer.write_table(table_part)
+
+        # 3. Merge into the order of the tenders
+        print(f"Writing: {path_out}")
+        row_bytes = source_bytes(path_tenders) / max(n_rows, 1)
+        window_rows = max(1000, int(budget_bytes // (2 * ENRICH_MEMORY_FACTOR * row_bytes)))
+        merge_partitions(spill_dir, n_partitions, n_rows, out_columns, path_out, csv_sep, window_rows)
+    return dic_result
@@ -0,0 +1,176 @@
+"""
+Run metrics of the scripts: stage timers, counters (e.g., bytes downloaded, rows read and written) and peak memory (RSS) per stage,
+written as a JSON run report next to the log file of the script (e.g., 01_anac_od_download.report.json).
+The peak RSS of a stage is measured from the start of the stage where the kernel allows the reset of the peak (Linux, /proc/self/clear_refs);
+elsewhere it is the peak of the process up to the end of the stage.
+[2026-10-17]: first version.
+"""
+
+import json
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import resource # not available on Windows
+except ImportError:
+    resource = None
+
+METRICS_SUFFIX = ".report.json"
+PROC_STATUS = "/proc/self/status"
+PROC_CLEAR_REFS = "/proc/self/clear_refs"
+
+def rss_peak() -> int:
+    """
+    Returns the peak resident memory (RSS) of the process: since the last reset (see rss_peak_reset) when available.
+
+    Parameters:
+        None
+
+    Returns:
+        int: the peak RSS in bytes (None if not available).
+    """
+
+    try:
+        with open(PROC_STATUS) as file:
+            for line in file:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss if sys.platform == "darwin" else maxrss * 1024 # bytes on macOS, KB on Linux
+
+def rss_peak_reset() -> bool:
+    """
+    Resets the peak resident memory (RSS) of the process to the current RSS (Linux only).
+
+    Parameters:
+        None
+
+    Returns:
+        bool: whether the peak was reset.
+    """
+
+    try:
+        with open(PROC_CLEAR_REFS, "w") as file:
+            file.write("5")
+        return True
+    except OSError:
+        return False
+
+def metrics_start(script: str) -> dict:
+    """
+    Creates the run report of a script.
+
+    Parameters:
+        script (str): the script path (e.g., __file__).
+
+    Returns:
+        dict: the run report (see metrics_stage, metrics_count and metrics_write).
+    """
+
+    return {
+        "script": Path(script).name,
+        "start": datetime.now().isoformat(timespec="seconds"),
+        "end": None,
+        "seconds": None,
+        "peak_rss_mb": None,
+        "peak_rss_per_stage": None,
+        "stages": {},
+        "_stage": None, # the running stage (not written)
+        "_time": time.perf_counter(), # not written
+    }
+
+@contextmanager
+def metrics_stage(report: dict, name: str):
+    """
+    Times a stage of the run and records its peak RSS. The counters updated while the stage runs are recorded in the stage (see metrics_count).
+    A stage run more than once (e.g., in a loop) accumulates its time and counters and keeps the highest peak. Stages are not nested.
+
+    Parameters:
+        report (dict): the run report (updated).
+        name (str): the stage name.
+
+    Yields:
+        dict: the stage metrics.
+    """
+
+    stage = report["stages"].setdefault(name, {"seconds": 0.0, "peak_rss_mb": None})
+    per_stage = rss_peak_reset()
+    report["peak_rss_per_stage"] = per_stage if report["peak_rss_per_stage"] is None else report["peak_rss_per_stage"] and per_stage
+    previous, report["_stage"] = report["_stage"], name
+    start = time.perf_counter()
+    try:
+        yield stage
+    finally:
+        stage["seconds"] = round(stage["seconds"] + time.perf_counter() - start, 3)
+        peak = rss_peak()
+        if peak is not None:
+            stage["peak_rss_mb"] = max(stage["peak_rss_mb"] or 0, round(peak / 1024 ** 2, 1))
+            report["peak_rss_mb"] = max(report["peak_rss_mb"] or 0, stage["peak_rss_mb"])
+        report["_stage"] = previous
+
+def metrics_count(report: dict, key: str, value: int, stage: str = None) -> None:
+    """
+    Adds a value to a counter of a stage (e.g., "rows_read").
+
+    Parameters:
+        report (dict): the run report (updated).
+        key (str): the counter name.
+        value (int): the value to be added.
+        stage (str, optional): the stage name (default: the running stage; the counters outside a stage are recorded in the "run" stage).
+
+    Returns:
+        None
+    """
+
+    stage = stage or report["_stage"] or "run"
+    dic_stage = report["stages"].setdefault(stage, {"seconds": 0.0, "peak_rss_mb": None})
+    dic_stage[key] = dic_stage.get(key, 0) + value
+
+def metrics_update(report: dict, dic_counts: dict, stage: str = None) -> None:
+    """
+    Adds the numeric values of a dictionary of results (e.g., of url_download) to the counters of a stage.
+
+    Parameters:
+        report (dict): the run report (updated).
+        dic_counts (dict): the results, by counter name (the values that are not numbers are ignored).
+        stage (str, optional): the stage name (default: the running stage).
+
+    Returns:
+        None
+    """
+
+    for key, value in dic_counts.items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            metrics_count(report, key, value, stage)
+
+def metrics_write(report: dict, path: str) -> Path:
+    """
+    Completes the run report (end, total time, download speed of the stages with "bytes_downloaded") and writes it as JSON.
+
+    Parameters:
+        report (dict): the run report.
+        path (str): the path of the log file of the script (the report is written next to it, with METRICS_SUFFIX).
+
+    Returns:
+        Path: the path of the report.
+    """
+
+    report["end"] = datetime.now().isoformat(timespec="seconds")
+    report["seconds"] = round(time.perf_counter() - report["_time"], 3)
+    peak = rss_peak()
+    if peak is not None:
+        report["peak_rss_mb"] = max(report["peak_rss_mb"] or 0, round(peak / 1024 ** 2, 1))
+    for stage in report["stages"].values():
+        if stage.get("bytes_downloaded") and stage["seconds"] > 0:
+            stage["download_mb_s"] = round(stage["bytes_downloaded"] / 1024 ** 2 / stage["seconds"], 2)
+    path_report = Path(path).with_suffix(METRICS_SUFFIX)
+    with open(path_report, "w", encoding="utf-8") as file:
+        json.dump({key: value for key, value in report.items() if not key.startswith("_")}, file, indent=2)
+    return path_report
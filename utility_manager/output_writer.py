@@ -0,0 +1,335 @@
+"""
+Writer of the outputs (OUTPUT_FORMAT, OUTPUT_COMPRESSION and OUTPUT_CSV_ENGINE in config.yml).
+Formats: csv (default), csv.gz and csv.zst (compressed CSV), parquet (columnar, compressed) and feather (Arrow IPC, memory-mappable when uncompressed).
+The "arrow" CSV engine converts the DataFrame to text columns formatted as pandas does and writes them with the Arrow CSV writer (multithreaded, in batches),
+keeping the dialect of pandas to_csv with csv.QUOTE_ALL: every field quoted, missing values as "", same number and date formatting.
+Columns that cannot be formatted exactly (e.g., booleans, dates with a time of day below the second) make the writer fall back to pandas.
+[2026-10-17]: first version.
+[2026-10-17]: output formats (compressed CSV, Parquet, Feather).
+[2026-10-17]: CSV outputs can be appended (written in parts, e.g. by the partitioned mode of 02_anac_od_select.py).
+[2026-10-17]: the Arrow CSV options are built by arrow_write_options (the line terminator option is not available in older pyarrow versions).
+"""
+
+import csv
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+WRITE_BATCH_ROWS = 1000000 # rows converted and written at a time (bounds the memory of the text columns)
+OUTPUT_FORMATS = {"csv": ".csv", "csv.gz": ".csv.gz", "csv.zst": ".csv.zst", "parquet": ".parquet", "feather": ".feather"} # format: file suffix
+CSV_COMPRESSIONS = {"csv": None, "csv.gz": "gzip", "csv.zst": "zstd"}
+DEFAULT_COMPRESSIONS = {"parquet": "zstd", "feather": "uncompressed"} # uncompressed Feather files can be memory-mapped
+DATE_TEXT_FORMATS = {"date": "%Y-%m-%d", "datetime": "%Y-%m-%d %H:%M:%S"} # date formats of pandas to_csv
+DATE_FORMAT_RANKS = {"date": 0, "datetime": 1, None: 2} # a part with a time of day (or below the second) decides the format of the whole output
+
+def arrow_import():
+    """
+    Imports pyarrow (optional dependency, needed only by the "arrow" engine).
+
+    Returns:
+        tuple: the pyarrow, pyarrow.compute and pyarrow.csv modules, or None if pyarrow is not installed.
+    """
+
+    try:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.csv as pcsv
+    except ImportError:
+        return None
+    return pa, pc, pcsv
+
+def arrow_write_options(sep: str = ",", include_header: bool = True):
+    """
+    Returns the options of the Arrow CSV writer in the dialect of pandas to_csv with csv.QUOTE_ALL (every valid field quoted).
+    The line terminator is the one of pandas (os.linesep) when the pyarrow version supports it (the 'eol' option), otherwise the Arrow default ("\\n").
+
+    Parameters:
+        sep (str): the delimiter.
+        include_header (bool): whether the header is written.
+
+    Returns:
+        pyarrow.csv.WriteOptions: the options.
+    """
+
+    pa, pc, pcsv = arrow_import()
+    try:
+        return pcsv.WriteOptions(delimiter=sep, quoting_style="all_valid", include_header=include_header, eol=os.linesep)
+    except TypeError: # 'eol' not available
+        return pcsv.WriteOptions(delimiter=sep, quoting_style="all_valid", include_header=include_header)
+
+def float_text(values: np.ndarray):
+    """
+    Formats floats as pandas to_csv does (shortest repr, e.g., "100.0", "1e-05"), using the Arrow cast and fixing the values Arrow formats differently.
+
+    Parameters:
+        values (np.ndarray): the float values.
+
+    Returns:
+        pyarrow.Array: the text values (null for NaN).
+    """
+
+    pa, pc, pcsv = arrow_import()
+    text = pa.array(values, from_pandas=True).cast(pa.string())
+    with np.errstate(invalid="ignore"):
+        finite = np.isfinite(values)
+        # Arrow uses the exponent notation with other thresholds: those values are formatted by numpy (as repr)
+        recompute = np.asarray(pc.fill_null(pc.match_substring(text, "e"), False)) | (finite & (np.abs(values) < 1e-4) & (values != 0))
+        integral = finite & (values == np.floor(values)) & ~recompute
+    if integral.any():
+        text = pc.if_else(pa.array(integral), pc.binary_join_element_wise(text, ".0", ""), text)
+    if recompute.any():
+        idx = np.flatnonzero(recompute)
+        out = np.asarray(text.to_numpy(zero_copy_only=False), dtype=object)
+        out[idx] = values[idx].astype(str)
+        text = pa.array(out, type=pa.string(), from_pandas=True)
+    return text
+
+def column_format(series: pd.Series) -> str:
+    """
+    Decides how a column is formatted by the arrow engine (the same format for all the batches of the column).
+
+    Parameters:
+        series (pd.Series): the column.
+
+    Returns:
+        str: "integer", "float", "date", "datetime", "string" or "category:<format of the categories>"; None if not supported.
+    """
+
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        categories_format = column_format(pd.Series(dtype.categories))
+        return f"category:{categories_format}" if categories_format else None
+    if pd.api.types.is_bool_dtype(dtype):
+        return None # pandas writes True/False
+    if pd.api.types.is_integer_dtype(dtype):
+        return "integer"
+    if pd.api.types.is_float_dtype(dtype):
+        return "float"
+    if pd.api.types.is_datetime64_dtype(dtype):
+        values = series.dropna()
+        if (values == values.dt.normalize()).all():
+            return "date" # pandas writes YYYY-MM-DD when no value has a time of day
+        if (values == values.dt.floor("s")).all():
+            return "datetime"
+        return None
+    if pd.api.types.is_string_dtype(dtype) and pd.api.types.infer_dtype(series, skipna=True) in ("string", "empty"):
+        return "string"
+    return None
+
+def arrow_text(series: pd.Series, text_format: str):
+    """
+    Converts a column into the text written by pandas to_csv.
+
+    Parameters:
+        series (pd.Series): the column.
+        text_format (str): the format of the column (see column_format).
+
+    Returns:
+        pyarrow.Array: the text values (null for missing values).
+    """
+
+    pa, pc, pcsv = arrow_import()
+    if text_format.startswith("category:"):
+        dictionary = arrow_text(pd.Series(series.cat.categories), text_format.split(":", 1)[1])
+        codes = series.cat.codes.to_numpy()
+        return pa.DictionaryArray.from_arrays(pa.array(codes, mask=codes < 0), dictionary).dictionary_decode()
+    if text_format == "float":
+        return float_text(series.to_numpy(dtype=np.float64, na_value=np.nan))
+    array = pa.array(series, from_pandas=True)
+    if isinstance(array, pa.ChunkedArray): # Arrow-backed columns (e.g., string[pyarrow]) concatenated from chunks
+        array = array.combine_chunks()
+    if text_format == "date":
+        return array.cast(pa.date32()).cast(pa.string())
+    if text_format == "datetime":
+        return array.cast(pa.timestamp("s")).cast(pa.string())
+    return array.cast(pa.string()) # integer, string
+
+def column_formats(df: pd.DataFrame, date_formats: dict = None) -> list:
+    """
+    Decides how each column of a DataFrame is formatted by the arrow engine (see column_format).
+
+    Parameters:
+        df (pd.DataFrame): the DataFrame.
+        date_formats (dict, optional): the format of the date columns ("date", "datetime" or None), instead of deciding it from the values
+            of the DataFrame: the parts of an output written separately keep the format of the whole output.
+
+    Returns:
+        list: the formats of the columns (None for the unsupported ones).
+    """
+
+    date_formats = date_formats or {}
+    list_formats = []
+    for i, col in enumerate(df.columns):
+        if col in date_formats and pd.api.types.is_datetime64_dtype(df.iloc[:, i].dtype):
+            list_formats.append(date_formats[col])
+        else:
+            list_formats.append(column_format(df.iloc[:, i]))
+    return list_formats
+
+def date_formats_update(dic_formats: dict, df: pd.DataFrame) -> dict:
+    """
+    Updates the formats of the date columns of an output written in parts with the values of a part (see column_formats).
+
+    Parameters:
+        dic_formats (dict): the formats of the date columns of the parts seen so far (updated).
+        df (pd.DataFrame): the part.
+
+    Returns:
+        dict: the updated formats.
+    """
+
+    for col in df.columns:
+        if pd.api.types.is_datetime64_dtype(df[col].dtype):
+            col_format = column_format(df[col])
+            if col not in dic_formats or DATE_FORMAT_RANKS[col_format] > DATE_FORMAT_RANKS[dic_formats[col]]:
+                dic_formats[col] = col_format
+    return dic_formats
+
+def csv_write_arrow(df: pd.DataFrame, path: str, sep: str = ",", compression: str = None, append: bool = False, date_formats: dict = None) -> bool:
+    """
+    Writes a DataFrame with the Arrow CSV writer, in the dialect of pandas to_csv with csv.QUOTE_ALL.
+
+    Parameters:
+        df (pd.DataFrame): the DataFrame to be saved.
+        path (str): the file path of the CSV file.
+        sep (str): the delimiter.
+        compression (str, optional): the compression of the file ("gzip" or "zstd").
+        append (bool): whether the rows are appended to the file (without header; a compressed part is appended as a new stream).
+        date_formats (dict, optional): the format of date columns (see column_formats).
+
+    Returns:
+        bool: False (nothing written) if a column type is not supported.
+    """
+
+    pa, pc, pcsv = arrow_import()
+    list_formats = column_formats(df, date_formats)
+    if None in list_formats:
+        return False
+    schema = pa.schema([(str(col), pa.string()) for col in df.columns])
+    options = arrow_write_options(sep, include_header=not append)
+    fp = open(path, 'ab' if append else 'wb')
+    sink = pa.CompressedOutputStream(fp, compression) if compression else fp
+    try:
+        with pcsv.CSVWriter(sink, schema, write_options=options) as writer:
+            for start in range(0, len(df), WRITE_BATCH_ROWS):
+                df_batch = df.iloc[start:start + WRITE_BATCH_ROWS]
+                # Missing values as empty strings, so they are quoted ("") as pandas does
+                list_arrays = [pc.fill_null(arrow_text(df_batch.iloc[:, i], text_format), "") for i, text_format in enumerate(list_formats)]
+                writer.write_batch(pa.record_batch(list_arrays, schema=schema))
+    finally:
+        if compression:
+            sink.close()
+        fp.close()
+    return True
+
+def pandas_csv_write(df: pd.DataFrame, path: str, sep: str = ",", compression: str = None, quoting: int = csv.QUOTE_MINIMAL, append: bool = False, date_formats: dict = None) -> None:
+    """
+    Writes a DataFrame to a CSV file with pandas; compressed files are written through the Arrow codecs when pyarrow is installed
+    (pandas needs the 'zstandard' package for zstd).
+
+    Parameters:
+        df (pd.DataFrame): the DataFrame to be saved.
+        path (str): the file path of the CSV file.
+        sep (str): the delimiter.
+        compression (str, optional): the compression of the file ("gzip" or "zstd").
+        quoting (int): the quoting of the fields (csv module constant).
+        append (bool): whether the rows are appended to the file (without header).
+        date_formats (dict, optional): the format of date columns ("date" or "datetime"; see column_formats), instead of the format decided by pandas on the values of the DataFrame.
+
+    Returns:
+        None
+    """
+
+    if date_formats:
+        df = df.assign(**{col: df[col].dt.strftime(DATE_TEXT_FORMATS[col_format]) for col, col_format in date_formats.items()
+                          if col_format in DATE_TEXT_FORMATS and col in df.columns and pd.api.types.is_datetime64_dtype(df[col].dtype)})
+    modules = arrow_import()
+    if compression and modules is not None:
+        with open(path, 'ab' if append else 'wb') as fp, modules[0].CompressedOutputStream(fp, compression) as sink:
+            df.to_csv(sink, sep=sep, index=False, quoting=quoting, mode='wb', header=not append)
+    else:
+        df.to_csv(path, sep=sep, index=False, quoting=quoting, compression=compression, mode='a' if append else 'w', header=not append)
+
+def csv_write(df: pd.DataFrame, path: str, sep: str = ",", engine: str = "auto", compression: str = None, append: bool = False, date_formats: dict = None) -> str:
+    """
+    Writes a DataFrame to a CSV file, every field quoted (csv.QUOTE_ALL).
+
+    Parameters:
+        df (pd.DataFrame): the DataFrame to be saved.
+        path (str): the file path of the CSV file.
+        sep (str): the delimiter.
+        engine (str): "pandas", "arrow" or "auto" (arrow if installed and the column types are supported, pandas otherwise).
+        compression (str, optional): the compression of the file ("gzip" or "zstd").
+        append (bool): whether the rows are appended to the file (without header).
+        date_formats (dict, optional): the format of date columns (see column_formats).
+
+    Returns:
+        str: the engine used.
+    """
+
+    if engine in ("arrow", "auto") and arrow_import() is not None:
+        if csv_write_arrow(df, path, sep, compression, append, date_formats):
+            return "arrow"
+        if engine == "arrow":
+            print(f"Column types not supported by the arrow engine, written with pandas: {path}")
+    elif engine == "arrow":
+        raise ImportError("The arrow CSV engine requires 'pyarrow' (pip install pyarrow).")
+    pandas_csv_write(df, path, sep, compression, csv.QUOTE_ALL, append, date_formats)
+    return "pandas"
+
+def output_path(path, output_format: str = "csv") -> Path:
+    """
+    Returns the path of an output in a format, replacing the .csv suffix of the name (e.g., "x.csv" -> "x.parquet").
+
+    Parameters:
+        path (str): the path of the output as a CSV file.
+        output_format (str): the output format (see OUTPUT_FORMATS).
+
+    Returns:
+        Path: the path of the output.
+    """
+
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format: {output_format} (formats: {list(OUTPUT_FORMATS)})")
+    path = Path(path)
+    stem = path.name[:-len(".csv")] if path.name.endswith(".csv") else path.name
+    return path.with_name(stem + OUTPUT_FORMATS[output_format])
+
+def output_write(df: pd.DataFrame, path: str, output_format: str = "csv", sep: str = ",", engine: str = "auto", compression: str = None, quote_all: bool = True, append: bool = False, date_formats: dict = None) -> str:
+    """
+    Writes a DataFrame in an output format.
+
+    Parameters:
+        df (pd.DataFrame): the DataFrame to be saved.
+        path (str): the file path (with the suffix of the format, see output_path).
+        output_format (str): the output format (see OUTPUT_FORMATS).
+        sep (str): the delimiter of the CSV formats.
+        engine (str): the CSV writer (see csv_write).
+        compression (str, optional): the compression of the Parquet and Feather formats (defaults: zstd for Parquet, uncompressed for Feather).
+        quote_all (bool): whether the CSV formats quote every field (False: pandas default quoting).
+        append (bool): whether the rows are appended to the file (CSV formats only).
+        date_formats (dict, optional): the format of date columns (see column_formats).
+
+    Returns:
+        str: a description of the writer used.
+    """
+
+    if output_format in CSV_COMPRESSIONS:
+        if not quote_all:
+            pandas_csv_write(df, path, sep, CSV_COMPRESSIONS[output_format], append=append)
+            return output_format
+        return f"{output_format}, {csv_write(df, path, sep, engine, CSV_COMPRESSIONS[output_format], append, date_formats)}"
+    if append:
+        raise ValueError(f"The {output_format} output format cannot be appended (formats: {list(CSV_COMPRESSIONS)})")
+    if arrow_import() is None:
+        raise ImportError(f"The {output_format} output format requires 'pyarrow' (pip install pyarrow).")
+    compression = compression or DEFAULT_COMPRESSIONS[output_format]
+    if output_format == "parquet":
+        df.to_parquet(path, index=False, compression=compression)
+    elif output_format == "feather":
+        df.reset_index(drop=True).to_feather(path, compression=compression) # Feather requires the default index
+    else:
+        raise ValueError(f"Unknown output format: {output_format} (formats: {list(OUTPUT_FORMATS)})")
+    return f"{output_format}, {compression}"
@@ -0,0 +1,144 @@
+"""
+Cache of the PA registry (Open BDAP "Anagrafe Enti") used for the join with the ANAC tenders.
+The registry is reduced to the fiscal code ('CF', as index) and the PA type ('pa_type', categorical, from the SIOPE or MIUR type description),
+saved next to the source file and rebuilt only when the source file changes.
+[2026-10-17]: first version.
+[2026-10-17]: the cache is rebuilt when it cannot be read (e.g., truncated) or was written by another pandas version; written through temporary files.
+"""
+
+import hashlib
+import json
+import logging
+import pickle
+from pathlib import Path
+
+import pandas as pd
+
+REGISTRY_CACHE_VERSION = 1 # to be increased when the cache layout changes
+REGISTRY_CACHE_SUFFIX = ".registry.pkl"
+REGISTRY_META_SUFFIX = ".registry.json"
+REGISTRY_CACHE_ERRORS = (OSError, ValueError, EOFError, pickle.UnpicklingError, AttributeError, ImportError) # cache not readable: rebuilt from the CSV
+
+def file_sha256(path: str) -> str:
+    """
+    Computes the sha256 of a file.
+
+    Parameters:
+        path (str): the file path.
+
+    Returns:
+        str: the hexadecimal sha256.
+    """
+
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as fp:
+        for chunk in iter(lambda: fp.read(1024 * 1024), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+def pa_registry_build(path: str, col_list: list, col_type: dict, csv_sep: str = ",") -> pd.DataFrame:
+    """
+    Reads the PA registry CSV file and builds the registry used for the join.
+
+    Parameters:
+        path (str): the file path to the registry CSV file.
+        col_list (list): a list of column names to be read from the CSV file.
+        col_type (dict): a dictionary mapping column names to their respective data types.
+        csv_sep (str): the delimiter string used in the CSV file.
+
+    Returns:
+        pd.DataFrame: the registry indexed by 'CF', with the categorical column 'pa_type'.
+    """
+
+    df = pd.read_csv(path, usecols=col_list, dtype=col_type, sep=csv_sep, low_memory=False)
+    df = df.drop_duplicates()
+    # 'pa_type' based on 'Descr_Tipologia_SIOPE' or 'Descr_Tipologia_MIUR'
+    df['pa_type'] = df['Descr_Tipologia_SIOPE'].fillna(df['Descr_Tipologia_MIUR'])
+    df = df.loc[df['CF'].notna(), ['CF', 'pa_type']].drop_duplicates()
+    df['pa_type'] = df['pa_type'].astype("category")
+    return df.set_index('CF')
+
+def pa_registry_load(path: str, col_list: list, col_type: dict, csv_sep: str = ",") -> tuple:
+    """
+    Loads the PA registry from its cache, rebuilding the cache if the source file changed (different sha256), the cache version or the pandas version
+    is outdated, or the cache cannot be read (e.g., truncated by an interrupted run).
+    The sha256 is computed only when the size or the modification time of the source file changed.
+
+    Parameters:
+        path (str): the file path to the registry CSV file.
+        col_list (list): a list of column names to be read from the CSV file.
+        col_type (dict): a dictionary mapping column names to their respective data types.
+        csv_sep (str): the delimiter string used in the CSV file.
+
+    Returns:
+        tuple: the registry (see pa_registry_build) and its version (the sha256 of the source file).
+    """
+
+    logger = logging.getLogger(__name__)
+    path = Path(path)
+    path_cache = path.with_name(path.name + REGISTRY_CACHE_SUFFIX)
+    path_meta = path.with_name(path.name + REGISTRY_META_SUFFIX)
+
+    stat = path.stat()
+    meta = {}
+    if path_meta.exists() and path_cache.exists():
+        try:
+            with open(path_meta, 'r') as fp:
+                meta = json.load(fp)
+        except (OSError, ValueError) as e:
+            logger.warning(f"PA registry cache metadata not valid, rebuilding the cache: {path_meta} ({e})")
+    if meta.get("version") == REGISTRY_CACHE_VERSION and meta.get("pandas_version") == pd.__version__:
+        if meta.get("size") == stat.st_size and meta.get("mtime_ns") == stat.st_mtime_ns:
+            source_sha256 = meta["source_sha256"]
+        else:
+            source_sha256 = file_sha256(path)
+        if meta.get("source_sha256") == source_sha256:
+            try:
+                with open(path_cache, 'rb') as fp:
+                    registry = pickle.load(fp)
+                print(f"PA registry loaded from cache: {path_cache}")
+                return registry, source_sha256
+            except REGISTRY_CACHE_ERRORS as e:
+                print(f"WARNING! PA registry cache not valid, rebuilding it: {path_cache} ({e})")
+                logger.warning(f"PA registry cache not valid, rebuilding it: {path_cache} ({e})")
+    else:
+        source_sha256 = file_sha256(path)
+
+    print(f"Building PA registry cache from: {path}")
+    logger.info(f"Building PA registry cache from: {path}")
+    registry = pa_registry_build(path, col_list, col_type, csv_sep)
+    # Through temporary files: an interrupted run leaves the previous cache (or none), never a truncated one
+    path_tmp = path_cache.with_name(path_cache.name + ".tmp")
+    with open(path_tmp, 'wb') as fp:
+        pickle.dump(registry, fp, protocol=pickle.HIGHEST_PROTOCOL)
+    path_tmp.replace(path_cache)
+    path_tmp = path_meta.with_name(path_meta.name + ".tmp")
+    with open(path_tmp, 'w') as fp:
+        json.dump({"version": REGISTRY_CACHE_VERSION, "pandas_version": pd.__version__, "source_sha256": source_sha256, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}, fp, indent=2)
+    path_tmp.replace(path_meta)
+    return registry, source_sha256
+
+def pa_registry_join(df: pd.DataFrame, registry: pd.DataFrame, left_on: str) -> pd.DataFrame:
+    """
+    Inner join of a DataFrame with the PA registry on the fiscal code, using the registry index (no full merge).
+    The join field is renamed 'cf_pa' and the column 'pa_type' is added.
+
+    Parameters:
+        df (pd.DataFrame): the DataFrame to be joined.
+        registry (pd.DataFrame): the registry (see pa_registry_build).
+        left_on (str): the fiscal code column of the DataFrame.
+
+    Returns:
+        pd.DataFrame: the joined DataFrame.
+    """
+
+    if registry.index.is_unique:
+        pos = registry.index.get_indexer(df[left_on])
+        mask = pos >= 0
+        df_joined = df[mask].copy()
+        df_joined['pa_type'] = registry['pa_type'].array.take(pos[mask])
+    else:
+        # Fiscal codes with more PA types: one row per type, as a merge would do
+        df_joined = df.join(registry, on=left_on, how='inner')
+    df_joined = df_joined.rename(columns={left_on: 'cf_pa'}).reset_index(drop=True)
+    return df_joined
@@ -0,0 +1,172 @@
+"""
+Partitioned Parquet store for the ANAC "bando CIG" monthly files.
+Each cig_csv_YYYY_MM source is converted once into Parquet files partitioned by publication year, month and regional section (hive layout),
+so that the selection script reads only the columns and partitions it needs.
+[2026-10-17]: first version.
+[2026-10-17]: the column types come from the ANAC schema (see anac_schema).
+[2026-10-17]: optional key-based deduplication of each source against the earlier ones (see dedup).
+[2026-10-17]: rows stored with their source and position, read back in source order; stale files of a converted source removed; running seen-key set.
+"""
+
+import logging
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from utility_manager.anac_schema import DATETIME_TYPE, schema_apply, schema_read_args
+from utility_manager.dedup import dedup_rows, key_hash, seen_keys_load, seen_keys_save, seen_update
+from utility_manager.utilities import csv_sources, manifest_read, manifest_write
+
+PARQUET_MANIFEST = ".parquet_manifest.json" # signature (size, mtime) of the converted sources, stored in the store directory
+PARQUET_COMPRESSION = "zstd"
+PARQUET_STORE_VERSION = 2 # to be increased when the stored columns change (the sources are converted again)
+SOURCE_COL = "_source" # source of every stored row (e.g., "cig_csv_2023_01")
+ROW_COL = "_row" # position of every stored row in its source
+
+def pyarrow_import():
+    """
+    Imports pyarrow (optional dependency, needed only by the Parquet store).
+
+    Returns:
+        tuple: the pyarrow, pyarrow.dataset and pyarrow.parquet modules.
+    """
+
+    try:
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("The Parquet store requires 'pyarrow' (pip install pyarrow).") from e
+    return pa, ds, pq
+
+def store_partitioning(partition_cols: list, schema: dict):
+    """
+    Builds the hive partitioning of the store, typing each partition column according to the schema (integers and floats, strings otherwise).
+
+    Parameters:
+        partition_cols (list): the partition columns.
+        schema (dict): the ANAC schema (column: type).
+
+    Returns:
+        pyarrow.dataset.Partitioning: the partitioning.
+    """
+
+    pa, ds, pq = pyarrow_import()
+    list_fields = []
+    for col in partition_cols:
+        col_type = str(schema.get(col)).lower()
+        if col_type.startswith(("int", "uint")):
+            list_fields.append((col, pa.int64()))
+        elif col_type.startswith("float"):
+            list_fields.append((col, pa.float64()))
+        else:
+            list_fields.append((col, pa.string()))
+    return ds.partitioning(pa.schema(list_fields), flavor="hive")
+
+def cig_to_parquet(source_dir: str, prefix_name: str, store_dir: str, schema: dict, partition_cols: list, csv_sep: str = ";", force: bool = False, dedup_keys: list = None) -> int:
+    """
+    Converts the monthly CSV sources (.csv or .zip) of a directory into the partitioned Parquet store.
+    Sources already converted with the same size and modification time (and deduplication keys) are skipped; a converted source replaces all its Parquet files
+    (also in the partitions it does not write anymore). Every row is stored with its source and position (SOURCE_COL, ROW_COL), so the store is read in source order.
+    With 'dedup_keys', the rows of a source whose key is repeated or already seen in an earlier source (by name) are not stored:
+    the key hashes of each source are persisted in the store, so the history is not read again
+    (a source converted again does not change the rows stored for the later ones).
+
+    Parameters:
+        source_dir (str): the directory containing the monthly sources.
+        prefix_name (str): the prefix of the sources (e.g., "cig_csv_").
+        store_dir (str): the root directory of the Parquet store.
+        schema (dict): the ANAC schema (column: type) applied while reading.
+        partition_cols (list): the partition columns.
+        csv_sep (str): the delimiter used in the CSV files.
+        force (bool): whether to convert also the unchanged sources.
+        dedup_keys (list, optional): the key columns of the deduplication (see utility_manager/dedup.py).
+
+    Returns:
+        int: the number of converted sources.
+    """
+
+    pa, ds, pq = pyarrow_import()
+    logger = logging.getLogger(__name__)
+
+    store_path = Path(store_dir)
+    store_path.mkdir(parents=True, exist_ok=True)
+    manifest = manifest_read(store_dir, PARQUET_MANIFEST)
+    partitioning = store_partitioning(partition_cols, schema)
+    col_list, col_type, date_cols = schema_read_args(schema)
+
+    converted = 0
+    list_sources = csv_sources(source_dir, prefix_name)
+    seen = np.empty(0, dtype=np.uint64) # seen-key set of the sources before 'seen_next'
+    seen_next = 0
+    for i, csv_source in enumerate(list_sources):
+        stat = csv_source.stat()
+        signature = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "version": PARQUET_STORE_VERSION}
+        if dedup_keys:
+            signature["dedup_keys"] = list(dedup_keys)
+        if not force and manifest.get(csv_source.stem) == signature:
+            continue
+        df = schema_apply(pd.read_csv(csv_source, usecols=col_list, dtype=col_type, sep=csv_sep, low_memory=False), schema)
+        df[SOURCE_COL] = pd.Categorical([csv_source.stem] * len(df))
+        df[ROW_COL] = np.arange(len(df), dtype=np.int64)
+        if dedup_keys:
+            # Only the key hashes of the sources not yet in the set are loaded (the unchanged sources skipped above)
+            seen = seen_update(seen, seen_keys_load(store_dir, [source.stem for source in list_sources[seen_next:i]]))
+            mask, seen = dedup_rows(df, dedup_keys, seen)
+            seen_next = i + 1
+            seen_keys_save(store_dir, csv_source.stem, key_hash(df, dedup_keys))
+            print(f"Rows with a duplicated key {dedup_keys}: {int((~mask).sum())}")
+            df = df[mask]
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        # The partition columns are cast to the partitioning types (the path values are read back with the same types)
+        for field in partitioning.schema:
+            col_idx = table.schema.get_field_index(field.name)
+            table = table.set_column(col_idx, field.name, table.column(col_idx).cast(field.type))
+        # Files of the previous conversion of the source, also in the partitions its rows left (e.g., a month republished with other sections)
+        for path_old in store_path.rglob(f"{csv_source.stem}-*.parquet"):
+            path_old.unlink()
+        ds.write_dataset(
+            table,
+            store_path,
+            format="parquet",
+            partitioning=partitioning,
+            basename_template=f"{csv_source.stem}-{{i}}.parquet", # one file per source and partition, overwritten on conversion
+            existing_data_behavior="overwrite_or_ignore",
+            file_options=ds.ParquetFileFormat().make_write_options(compression=PARQUET_COMPRESSION),
+        )
+        manifest[csv_source.stem] = signature
+        manifest_write(store_dir, manifest, PARQUET_MANIFEST)
+        converted += 1
+        print(f"Converted to Parquet: {csv_source} ({len(df)} rows)")
+        logger.info(f"Converted to Parquet: {csv_source} ({len(df)} rows)")
+
+    return converted
+
+def read_parquet_store(store_dir: str, schema: dict, partition_cols: list, filters: list = None) -> pd.DataFrame:
+    """
+    Reads the Parquet store, loading only the schema columns and the partitions (and row groups) matching the filters.
+    The rows are returned in source order (sources by name, rows by position in the source), as read from the CSV sources.
+
+    Parameters:
+        store_dir (str): the root directory of the Parquet store.
+        schema (dict): the ANAC schema (column: type), applied to the partition columns after reading.
+        partition_cols (list): the partition columns.
+        filters (list, optional): the filters in disjunctive normal form (list of lists of (column, "in", values) tuples).
+
+    Returns:
+        pd.DataFrame: the data read from the store.
+    """
+
+    pa, ds, pq = pyarrow_import()
+    col_list = list(schema)
+    table = pq.read_table(store_dir, columns=col_list + [SOURCE_COL, ROW_COL], filters=filters or None, partitioning=store_partitioning(partition_cols, schema),
+                          read_dictionary=[SOURCE_COL])
+    df = table.to_pandas()
+    # Source order: the hive partitions are read in path order (year, month, section)
+    source = df[SOURCE_COL].cat.reorder_categories(sorted(df[SOURCE_COL].cat.categories))
+    df = df.iloc[np.lexsort((df[ROW_COL].to_numpy(), source.cat.codes.to_numpy()))].reset_index(drop=True)
+    # Partition columns are read as categoricals of the partition values: back to the schema types
+    df = df.astype({col: schema[col] for col in partition_cols if col in df.columns and schema.get(col) not in (None, DATETIME_TYPE)})
+    df = schema_apply(df, schema)
+    return df[col_list]
@@ -0,0 +1,282 @@
+"""
+DAG runner of 00_od_pipeline.py: every stage is a command (a script of the repository, run as a subprocess) with its dependencies,
+input files, output files and configuration values. Before running a stage, its fingerprint is computed from the content (sha256) of
+its inputs and from its configuration: a stage whose fingerprint did not change since its last successful run, and whose outputs exist,
+is skipped. The file hashes are cached by size and modification time in the state file (PIPELINE_STATE), and the sha256 recorded by
+the verification of the downloads (download manifest) is reused, so unchanged files are not read again.
+Stages whose dependencies are done run in parallel, on up to 'max_workers' threads (one subprocess each).
+[2026-10-17]: first version.
+"""
+
+import hashlib
+import json
+import logging
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from pathlib import Path
+
+from utility_manager.utilities import manifest_read, manifest_write
+
+PIPELINE_STATE = ".pipeline_state.json" # state file of the stages (fingerprints and file hashes)
+PIPELINE_STATE_VERSION = 1 # to be increased when the fingerprints change
+HASH_BUFFER_SIZE = 16 * 1024 * 1024 # bytes read at a time when hashing a file
+
+def stage_create(name: str, command: list, deps: list = None, inputs=None, outputs=None, config: dict = None, cache: bool = True, enabled: bool = True) -> dict:
+    """
+    Creates a stage of the pipeline.
+
+    Parameters:
+        name (str): the stage name.
+        command (list): the command line (e.g., [sys.executable, "02_anac_od_select.py"]).
+        deps (list, optional): the names of the stages to be completed first.
+        inputs (list or callable, optional): the input files, or a function returning them (called when the dependencies are done).
+        outputs (list or callable, optional): the output files or directories (the stage is run again if one of them is missing).
+        config (dict, optional): the configuration values of the stage (part of the fingerprint).
+        cache (bool): whether the stage can be skipped when its fingerprint did not change (False for the downloads: the remote files are not known in advance).
+        enabled (bool): whether the stage is run (a disabled stage counts as done for the stages depending on it).
+
+    Returns:
+        dict: the stage.
+    """
+
+    return {"name": name, "command": list(command), "deps": list(deps or []), "inputs": inputs, "outputs": outputs, "config": config or {}, "cache": cache, "enabled": enabled}
+
+def pipeline_order(dic_stages: dict) -> list:
+    """
+    Sorts the stages so that every stage follows its dependencies (in definition order otherwise).
+
+    Parameters:
+        dic_stages (dict): the stages by name.
+
+    Returns:
+        list: the stage names.
+
+    Raises:
+        ValueError: if a dependency is not a stage or the dependencies have a cycle.
+    """
+
+    list_order = []
+    dic_state = {} # 1 = being visited, 2 = done
+
+    def visit(name: str, path: tuple) -> None:
+        if name not in dic_stages:
+            raise ValueError(f"Unknown stage '{name}' (required by '{path[-1]}')")
+        if dic_state.get(name) == 2:
+            return
+        if dic_state.get(name) == 1:
+            raise ValueError(f"Cycle of stages: {' -> '.join(path + (name,))}")
+        dic_state[name] = 1
+        for dep in dic_stages[name]["deps"]:
+            visit(dep, path + (name,))
+        dic_state[name] = 2
+        list_order.append(name)
+
+    for name in dic_stages:
+        visit(name, ())
+    return list_order
+
+def pipeline_select(dic_stages: dict, targets: list) -> list:
+    """
+    Returns the stages needed by the targets (the targets and all their dependencies), in execution order.
+
+    Parameters:
+        dic_stages (dict): the stages by name.
+        targets (list): the target stage names (None or empty = all the stages).
+
+    Returns:
+        list: the stage names.
+    """
+
+    list_order = pipeline_order(dic_stages)
+    if not targets:
+        return list_order
+    needed = set()
+    pending = list(targets)
+    while pending:
+        name = pending.pop()
+        if name not in dic_stages:
+            raise ValueError(f"Unknown stage '{name}'")
+        if name not in needed:
+            needed.add(name)
+            pending.extend(dic_stages[name]["deps"])
+    return [name for name in list_order if name in needed]
+
+def file_hash(path: Path, dic_hashes: dict, dic_manifests: dict) -> str:
+    """
+    Returns the sha256 of a file: from the cache or the download manifest of its directory when the size and modification time match,
+    otherwise computed (and cached).
+
+    Parameters:
+        path (Path): the file.
+        dic_hashes (dict): the cached hashes by path (updated).
+        dic_manifests (dict): the download manifests by directory (updated, read once per directory).
+
+    Returns:
+        str: the hexadecimal sha256 (None if the file does not exist).
+    """
+
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    signature = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    entry = dic_hashes.get(str(path))
+    if entry is not None and entry["size"] == signature["size"] and entry["mtime_ns"] == signature["mtime_ns"]:
+        return entry["sha256"]
+    if str(path.parent) not in dic_manifests:
+        dic_manifests[str(path.parent)] = manifest_read(path.parent)
+    entry = dic_manifests[str(path.parent)].get(path.name, {})
+    if entry.get("sha256") and entry.get("size") == signature["size"] and entry.get("mtime_ns") == signature["mtime_ns"]:
+        sha256 = entry["sha256"] # recorded by verify_downloads
+    else:
+        digest = hashlib.sha256()
+        with open(path, "rb") as fp:
+            for chunk in iter(lambda: fp.read(HASH_BUFFER_SIZE), b""):
+                digest.update(chunk)
+        sha256 = digest.hexdigest()
+    dic_hashes[str(path)] = dict(signature, sha256=sha256)
+    return sha256
+
+def stage_files(files) -> list:
+    """
+    Returns the files of a stage (inputs or outputs): the directories are expanded into the files they contain.
+
+    Parameters:
+        files (list or callable): the files, or a function returning them.
+
+    Returns:
+        list: the file paths, sorted.
+    """
+
+    list_files = set()
+    for file in (files() if callable(files) else files) or []:
+        path = Path(file)
+        if path.is_dir():
+            list_files.update(child for child in path.rglob("*") if child.is_file())
+        else:
+            list_files.add(path)
+    return sorted(list_files)
+
+def stage_fingerprint(stage: dict, dic_hashes: dict, dic_manifests: dict) -> str:
+    """
+    Computes the fingerprint of a stage from the content of its inputs (see file_hash) and from its configuration.
+
+    Parameters:
+        stage (dict): the stage.
+        dic_hashes (dict): the cached hashes by path (updated).
+        dic_manifests (dict): the download manifests by directory (updated).
+
+    Returns:
+        str: the hexadecimal sha256 of the stage.
+    """
+
+    dic_inputs = {str(path): file_hash(path, dic_hashes, dic_manifests) for path in stage_files(stage["inputs"])}
+    text = json.dumps({"version": PIPELINE_STATE_VERSION, "command": stage["command"][1:], "config": stage["config"], "inputs": dic_inputs}, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def stage_run(stage: dict) -> int:
+    """
+    Runs the command of a stage, printing its output lines with the stage name as prefix.
+
+    Parameters:
+        stage (dict): the stage.
+
+    Returns:
+        int: the exit code of the command.
+    """
+
+    with subprocess.Popen(stage["command"], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, errors="replace", bufsize=1) as process:
+        for line in process.stdout:
+            print(f"[{stage['name']}] {line}", end="", flush=True)
+    return process.returncode
+
+def pipeline_run(dic_stages: dict, names: list, state_dir: str = ".", max_workers: int = 2, force: bool = False, dry_run: bool = False, report: dict = None) -> dict:
+    """
+    Runs the stages in dependency order, skipping those whose fingerprint and outputs are unchanged (see stage_fingerprint).
+    Independent stages run in parallel. After a failed stage, the stages depending on it are not run; the others go on.
+
+    Parameters:
+        dic_stages (dict): the stages by name.
+        names (list): the stages to be run, in execution order (see pipeline_select).
+        state_dir (str): the directory of the state file (PIPELINE_STATE).
+        max_workers (int): the stages run at the same time.
+        force (bool): whether to run the stages also when unchanged.
+        dry_run (bool): whether to only report the stages that would run (the fingerprints are computed with the current files).
+        report (dict, optional): the run report (the status and time of every stage are recorded in its stages, see utility_manager/metrics.py).
+
+    Returns:
+        dict: the status of every stage: "run", "cached", "disabled", "failed", "blocked" (a dependency failed) or "pending" (dry run).
+    """
+
+    logger = logging.getLogger(__name__)
+    state = manifest_read(state_dir, PIPELINE_STATE)
+    if state.get("version") != PIPELINE_STATE_VERSION:
+        state = {"version": PIPELINE_STATE_VERSION, "stages": {}, "hashes": {}}
+    dic_manifests = {}
+    dic_status = {}
+    dic_fingerprints = {}
+    dic_running = {} # future -> (stage name, start time)
+
+    def stage_record(name: str, status: str, seconds: float = 0.0) -> None:
+        dic_status[name] = status
+        print(f">> Stage '{name}': {status}" + (f" ({seconds:.1f} s)" if seconds else ""))
+        logger.info(f"Stage '{name}': {status}" + (f" ({seconds:.1f} s)" if seconds else ""))
+        if report is not None:
+            report["stages"][name] = {"seconds": round(seconds, 3), "peak_rss_mb": None, "status": status}
+
+    with ThreadPoolExecutor(max_workers=max(1, int(max_workers))) as executor:
+        while len(dic_status) < len(names):
+            for name in names:
+                stage = dic_stages[name]
+                if name in dic_status or any(name == running for running, _ in dic_running.values()):
+                    continue
+                deps = [dep for dep in stage["deps"] if dep in names]
+                if any(dic_status.get(dep) in ("failed", "blocked") for dep in deps):
+                    stage_record(name, "blocked")
+                    continue
+                if not all(dic_status.get(dep) in ("run", "cached", "disabled", "pending") for dep in deps):
+                    continue # waiting for the dependencies
+                if not stage["enabled"]:
+                    stage_record(name, "disabled")
+                    continue
+                fingerprint = stage_fingerprint(stage, state["hashes"], dic_manifests) if stage["cache"] else None
+                missing = [path for path in stage_files(stage["outputs"]) if not path.exists()]
+                if not force and fingerprint is not None and state["stages"].get(name, {}).get("fingerprint") == fingerprint and not missing:
+                    stage_record(name, "cached")
+                    continue
+                if dry_run:
+                    stage_record(name, "pending")
+                    continue
+                print(f">> Stage '{name}': running {' '.join(stage['command'][1:])}")
+                logger.info(f"Stage '{name}': running {stage['command']}")
+                dic_fingerprints[name] = fingerprint
+                dic_running[executor.submit(stage_run, stage)] = (name, time.perf_counter())
+            if not dic_running:
+                continue # the loop above recorded stages without running any: look again
+            done, _ = wait(list(dic_running), return_when=FIRST_COMPLETED)
+            for future in done:
+                name, start = dic_running.pop(future)
+                try:
+                    returncode = future.result()
+                except OSError as e:
+                    print(f"ERROR! Stage '{name}' could not be started: {e}")
+                    logger.error(f"Stage '{name}' could not be started: {e}")
+                    returncode = -1
+                if returncode != 0:
+                    print(f"ERROR! Stage '{name}' failed (exit code {returncode})")
+                    logger.error(f"Stage '{name}' failed (exit code {returncode})")
+                    state["stages"].pop(name, None)
+                    stage_record(name, "failed", time.perf_counter() - start)
+                    continue
+                stage = dic_stages[name]
+                if stage["cache"]:
+                    # the fingerprint of the inputs at the start of the stage: inputs changed meanwhile lead to a new run
+                    state["stages"][name] = {"fingerprint": dic_fingerprints[name], "finished": time.strftime("%Y-%m-%d %H:%M:%S")}
+                    manifest_write(state_dir, state, PIPELINE_STATE)
+                stage_record(name, "run", time.perf_counter() - start)
+
+    if not dry_run:
+        state["hashes"] = {path: entry for path, entry in state["hashes"].items() if Path(path).exists()} # files removed meanwhile
+        manifest_write(state_dir, state, PIPELINE_STATE)
+    return dic_status
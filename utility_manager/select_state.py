@@ -0,0 +1,324 @@
+"""
+State of the selection outputs of 02_anac_od_select.py, for incremental runs (ANAC_INCREMENTAL_DO in config.yml).
+The state file records the monthly sources (size and modification time), the fingerprint of the selection configuration,
+the PA registry version, the outputs and their sizes, and the seen-key set of the deduplication (see dedup).
+A rerun with the same configuration and registry, whose previous sources are unchanged and whose new sources all follow them,
+processes only the new sources and appends (or merges, for the sorted outputs) their rows to the outputs.
+[2026-10-17]: first version.
+[2026-10-17]: the merged outputs are written by output_writer.
+[2026-10-17]: missing values sorted last in the merged outputs, as in a full run; only the rows following the new ones are rewritten; rows appended by output_writer.
+"""
+
+import hashlib
+import json
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from utility_manager.output_writer import csv_write, output_write, date_formats_update
+from utility_manager.utilities import manifest_read, manifest_write
+
+SELECT_STATE = ".select_state.json" # state file, in the output directory
+SELECT_KEYS = ".select_keys.npy" # seen-key set of the processed sources, in the output directory
+SELECT_STATE_VERSION = 1 # to be increased when the outputs or the state layout change
+CSV_READ_ROWS = 500000 # rows read at a time when merging into a sorted output
+CSV_SCAN_BYTES = 16 * 1024 * 1024 # bytes read at a time when looking for a record of a CSV output
+
+def config_fingerprint(config: dict) -> str:
+    """
+    Computes the fingerprint of the configuration that produced the outputs.
+
+    Parameters:
+        config (dict): the configuration values (JSON serializable, or converted to strings).
+
+    Returns:
+        str: the hexadecimal sha256 of the configuration.
+    """
+
+    text = json.dumps({"version": SELECT_STATE_VERSION, "config": config}, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def source_signatures(list_sources: list) -> dict:
+    """
+    Computes the signature (size, modification time) of each source.
+
+    Parameters:
+        list_sources (list): the source paths.
+
+    Returns:
+        dict: the signatures by source name (stem).
+    """
+
+    dic_signatures = {}
+    for source in list_sources:
+        stat = Path(source).stat()
+        dic_signatures[Path(source).stem] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    return dic_signatures
+
+def state_read(state_dir: str) -> dict:
+    """
+    Reads the state of the outputs.
+
+    Parameters:
+        state_dir (str): the output directory.
+
+    Returns:
+        dict: the state (empty if missing).
+    """
+
+    return manifest_read(state_dir, SELECT_STATE)
+
+def state_write(state_dir: str, state: dict, seen: np.ndarray) -> None:
+    """
+    Writes the state of the outputs and the seen-key set.
+
+    Parameters:
+        state_dir (str): the output directory.
+        state (dict): the state.
+        seen (np.ndarray): the seen-key set.
+
+    Returns:
+        None
+    """
+
+    path_keys = Path(state_dir) / SELECT_KEYS
+    path_tmp = path_keys.with_name(path_keys.name + ".tmp")
+    with open(path_tmp, 'wb') as fp:
+        np.save(fp, seen)
+    path_tmp.replace(path_keys)
+    manifest_write(state_dir, state, SELECT_STATE)
+
+def state_clear(state_dir: str) -> None:
+    """
+    Removes the state, before the outputs are rewritten (an interrupted run then leads to a full rebuild).
+
+    Parameters:
+        state_dir (str): the output directory.
+
+    Returns:
+        None
+    """
+
+    for name in (SELECT_STATE, SELECT_KEYS):
+        path = Path(state_dir) / name
+        if path.exists():
+            path.unlink()
+
+def seen_keys_read(state_dir: str) -> np.ndarray:
+    """
+    Reads the seen-key set of the processed sources.
+
+    Parameters:
+        state_dir (str): the output directory.
+
+    Returns:
+        np.ndarray: the seen-key set.
+    """
+
+    return np.load(Path(state_dir) / SELECT_KEYS)
+
+def select_plan(state: dict, state_dir: str, fingerprint: str, registry_version: str, dic_signatures: dict) -> tuple:
+    """
+    Decides whether the outputs can be updated incrementally.
+
+    Parameters:
+        state (dict): the state of the outputs (see state_read).
+        state_dir (str): the output directory.
+        fingerprint (str): the fingerprint of the current configuration.
+        registry_version (str): the current PA registry version.
+        dic_signatures (dict): the signatures of the current sources.
+
+    Returns:
+        tuple: the names of the sources to be processed (None for a full rebuild) and the reason.
+    """
+
+    if not state:
+        return None, "no state of previous outputs"
+    if state.get("fingerprint") != fingerprint:
+        return None, "selection configuration changed"
+    if state.get("registry") != registry_version:
+        return None, "PA registry changed"
+    if not (Path(state_dir) / SELECT_KEYS).exists():
+        return None, "seen-key set missing"
+    missing = [output for output in state.get("outputs", []) if not Path(output).exists()]
+    if missing:
+        return None, f"outputs missing: {missing}"
+    dic_processed = state.get("sources", {})
+    changed = [name for name, signature in dic_processed.items() if dic_signatures.get(name) != signature]
+    if changed:
+        return None, f"sources changed or removed: {changed}"
+    new_sources = sorted(name for name in dic_signatures if name not in dic_processed)
+    if new_sources and dic_processed and new_sources[0] < max(dic_processed):
+        return None, f"new sources before the processed ones: {new_sources[0]}"
+    return new_sources, f"new sources: {len(new_sources)}"
+
+def csv_date_formats(path: str, df: pd.DataFrame, sep: str = ",") -> dict:
+    """
+    Returns the formats of the date columns of a CSV output (see output_writer.column_formats), as written in the file,
+    updated with the rows to be added (a time of day in the new rows decides the format, as in a full run).
+
+    Parameters:
+        path (str): the CSV file path.
+        df (pd.DataFrame): the rows to be added.
+        sep (str): the delimiter used in the CSV file.
+
+    Returns:
+        dict: the formats by column.
+    """
+
+    date_cols = [col for col in df.columns if pd.api.types.is_datetime64_dtype(df[col].dtype)]
+    dic_formats = {}
+    if date_cols:
+        df_head = pd.read_csv(path, sep=sep, usecols=date_cols, dtype=str, keep_default_na=False, nrows=CSV_READ_ROWS)
+        for col in date_cols:
+            values = df_head[col][df_head[col] != ""]
+            if len(values):
+                dic_formats[col] = "datetime" if len(values.iloc[0]) > 10 else "date" # YYYY-MM-DD HH:MM:SS or YYYY-MM-DD
+    return date_formats_update(dic_formats, df)
+
+def csv_append(df: pd.DataFrame, path: str, sep: str = ",", engine: str = "auto") -> None:
+    """
+    Appends rows to a CSV output written by save_data (same writer and date formats, no header).
+
+    Parameters:
+        df (pd.DataFrame): the rows to be appended.
+        path (str): the CSV file path.
+        sep (str): the delimiter used in the CSV file.
+        engine (str): the CSV writer (see output_writer.csv_write).
+
+    Returns:
+        None
+    """
+
+    writer = output_write(df, path, "csv", sep, engine, append=True, date_formats=csv_date_formats(path, df, sep))
+    print(f"Rows appended to: {path} ({len(df)}, {writer})")
+
+def text_sort(df: pd.DataFrame, sort_cols: list) -> pd.DataFrame:
+    """
+    Sorts the text of CSV rows as a full run sorts the data (stable, missing values last): the empty fields are the missing values.
+
+    Parameters:
+        df (pd.DataFrame): the rows, as text (read with dtype=str and keep_default_na=False).
+        sort_cols (list): the sort columns.
+
+    Returns:
+        pd.DataFrame: the sorted rows (new index).
+    """
+
+    df = df.reset_index(drop=True)
+    df_keys = df[sort_cols].replace("", np.nan)
+    return df.loc[df_keys.sort_values(by=sort_cols, kind="stable", na_position="last").index].reset_index(drop=True)
+
+def keys_greater(df_keys: pd.DataFrame, key: tuple) -> tuple:
+    """
+    Compares the sort keys of CSV rows with a key, in the order of text_sort (empty fields last).
+
+    Parameters:
+        df_keys (pd.DataFrame): the sort columns of the rows, as text.
+        key (tuple): the key (text values, in the order of the columns).
+
+    Returns:
+        tuple: the masks of the rows whose key is greater than and equal to the key.
+    """
+
+    greater = np.zeros(len(df_keys), dtype=bool)
+    equal = np.ones(len(df_keys), dtype=bool)
+    for col, value in zip(df_keys.columns, key):
+        values = df_keys[col].to_numpy(dtype=object)
+        missing = values == ""
+        if value == "":
+            col_greater, col_equal = np.zeros(len(values), dtype=bool), missing
+        else:
+            col_greater, col_equal = missing | (values > value), values == value
+        greater |= equal & col_greater
+        equal &= col_equal
+    return greater, equal
+
+def csv_record_offset(path: str, record: int) -> int:
+    """
+    Returns the byte offset of a record of a CSV file written with every field quoted: the line ends outside the quotes end the records.
+
+    Parameters:
+        path (str): the CSV file path.
+        record (int): the record (0 = the header).
+
+    Returns:
+        int: the offset (the file size if the file has fewer records).
+    """
+
+    ends = 0
+    offset = 0
+    quoted = 0
+    with open(path, "rb") as fp:
+        for block in iter(lambda: fp.read(CSV_SCAN_BYTES), b""):
+            chars = np.frombuffer(block, dtype=np.uint8)
+            inside = np.bitwise_xor.accumulate(chars == ord('"')) ^ bool(quoted) # inside the quotes after each byte
+            line_ends = np.flatnonzero((chars == ord("\n")) & ~inside)
+            if record <= ends + len(line_ends):
+                return offset + int(line_ends[record - ends - 1]) + 1 if record else 0
+            ends += len(line_ends)
+            offset += len(block)
+            quoted = inside[-1]
+    return offset
+
+def csv_patch(df: pd.DataFrame, path: str, sort_cols: list, sep: str = ",", engine: str = "auto") -> None:
+    """
+    Merges rows into a sorted CSV output written by save_data, in their sort position (after the existing rows with the same sort key,
+    missing values last, as in a full run). The rows before the first one following the new rows are kept as they are in the file;
+    the rest is read in chunks, merged with the new rows and written again.
+
+    Parameters:
+        df (pd.DataFrame): the rows to be merged.
+        path (str): the CSV file path.
+        sort_cols (list): the sort columns of the output.
+        sep (str): the delimiter used in the CSV file.
+        engine (str): the CSV writer (see output_writer.csv_write).
+
+    Returns:
+        None
+    """
+
+    if len(df) == 0:
+        return
+    # The new rows as the text written to the file, so the existing values are not parsed and rewritten differently
+    path_new = Path(str(path) + ".new")
+    csv_write(df, path_new, sep, engine, date_formats=csv_date_formats(path, df, sep))
+    df_new = text_sort(pd.read_csv(path_new, sep=sep, dtype=str, keep_default_na=False), sort_cols)
+    path_new.unlink()
+    key_first = tuple(df_new[sort_cols].iloc[0])
+    # First existing row following all the new rows with the smallest key
+    rows = 0
+    record = None
+    for df_keys in pd.read_csv(path, sep=sep, usecols=sort_cols, dtype=str, keep_default_na=False, chunksize=CSV_READ_ROWS):
+        greater, _ = keys_greater(df_keys[sort_cols], key_first)
+        if greater.any():
+            record = rows + int(np.argmax(greater)) + 1 # the header is record 0
+            break
+        rows += len(df_keys)
+    if record is None:
+        csv_write(df_new, path, sep, engine, append=True)
+        print(f"Rows appended to: {path} ({len(df)})")
+        return
+    # Rest of the file merged with the new rows
+    offset = csv_record_offset(path, record)
+    columns = list(df_new.columns)
+    path_tail = Path(str(path) + ".tmp")
+    path_tail.unlink(missing_ok=True)
+    with open(path, "rb") as fp:
+        fp.seek(offset)
+        for df_old in pd.read_csv(fp, sep=sep, header=None, names=columns, dtype=str, keep_default_na=False, chunksize=CSV_READ_ROWS):
+            # the new rows before the last existing row of the chunk (after it if equal: more existing rows with that key may follow)
+            greater, equal = keys_greater(df_new[sort_cols], tuple(df_old[sort_cols].iloc[-1]))
+            taken = int((~greater & ~equal).sum())
+            csv_write(text_sort(pd.concat([df_old, df_new.iloc[:taken]], ignore_index=True), sort_cols), path_tail, sep, engine, append=True)
+            df_new = df_new.iloc[taken:]
+    if len(df_new):
+        csv_write(df_new, path_tail, sep, engine, append=True)
+    with open(path, "r+b") as fp, open(path_tail, "rb") as fp_tail:
+        fp.truncate(offset)
+        fp.seek(offset)
+        shutil.copyfileobj(fp_tail, fp, CSV_SCAN_BYTES)
+    path_tail.unlink()
+    print(f"Rows merged into: {path} ({len(df)}, rewritten from row {record})")
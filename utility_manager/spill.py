@@ -0,0 +1,245 @@
+"""
+Spill files of the partitioned (bounded-memory) mode of 02_anac_od_select.py (ANAC_MEMORY_BUDGET_MB, --memory-budget).
+DataFrame parts are appended to Arrow IPC streams, one per partition, and read back with their pandas types, except the categorical columns:
+they are spilled as text (the categories of a part would be written again with each of its partitions) and read back as Arrow strings,
+to be restored by the schema (see anac_schema.schema_apply). Requires pyarrow.
+[2026-10-17]: first version.
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from utility_manager.output_writer import arrow_import
+
+SPILL_SUFFIX = ".arrows"
+SPILL_READ_BYTES = 16 * 1024 ** 2 # the small parts of a stream are read back together, up to this size (Arrow)
+
+def spill_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converts the categorical columns of a DataFrame part to Arrow strings, as they are spilled.
+
+    Parameters:
+        df (pd.DataFrame): the part.
+
+    Returns:
+        pd.DataFrame: the part to be spilled.
+    """
+
+    cat_cols = [col for col in df.columns if isinstance(df[col].dtype, pd.CategoricalDtype)]
+    return df.astype({col: pd.StringDtype("pyarrow") for col in cat_cols}) if cat_cols else df
+
+def spill_table(df: pd.DataFrame, dic_writers: dict):
+    """
+    Converts a DataFrame part (see spill_frame) to an Arrow table, with the schema of the open streams
+    (the same for all the parts: e.g., an object column with only missing values is a string column).
+
+    Parameters:
+        df (pd.DataFrame): the part.
+        dic_writers (dict): the open streams (writer and schema) by name, all with the same schema.
+
+    Returns:
+        pyarrow.Table: the table.
+    """
+
+    pa, pc, pcsv = arrow_import()
+    if dic_writers:
+        schema = next(iter(dic_writers.values()))[1]
+    else:
+        schema = pa.Schema.from_pandas(df, preserve_index=False)
+        for i, field in enumerate(schema):
+            if pa.types.is_null(field.type):
+                schema = schema.set(i, field.with_type(pa.string()))
+    return pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+
+def spill_write_table(dic_writers: dict, spill_dir: Path, name: str, table) -> None:
+    """
+    Appends a table to a spill stream (opened at the first part).
+
+    Parameters:
+        dic_writers (dict): the open streams (writer and schema) by name (updated).
+        spill_dir (Path): the spill directory.
+        name (str): the name of the stream.
+        table (pyarrow.Table): the part (see spill_table).
+
+    Returns:
+        None
+    """
+
+    pa, pc, pcsv = arrow_import()
+    if name not in dic_writers:
+        dic_writers[name] = (pa.ipc.new_stream(str(Path(spill_dir) / f"{name}{SPILL_SUFFIX}"), table.schema), table.schema)
+    dic_writers[name][0].write_table(table)
+
+def spill_write(dic_writers: dict, spill_dir: Path, name: str, df: pd.DataFrame) -> None:
+    """
+    Appends a DataFrame part to a spill stream (opened at the first part).
+
+    Parameters:
+        dic_writers (dict): the open streams (writer and schema) by name (updated), all with the same schema.
+        spill_dir (Path): the spill directory.
+        name (str): the name of the stream.
+        df (pd.DataFrame): the part.
+
+    Returns:
+        None
+    """
+
+    spill_write_table(dic_writers, spill_dir, name, spill_table(spill_frame(df), dic_writers))
+
+def spill_close(dic_writers: dict) -> None:
+    """
+    Closes the spill streams.
+
+    Parameters:
+        dic_writers (dict): the open streams by name.
+
+    Returns:
+        None
+    """
+
+    for writer, _ in dic_writers.values():
+        writer.close()
+    dic_writers.clear()
+
+def arrow_to_pandas(table) -> pd.DataFrame:
+    """
+    Converts a spilled table to pandas, keeping the Arrow strings (string[pyarrow]).
+
+    Parameters:
+        table (pyarrow.Table): the table.
+
+    Returns:
+        pd.DataFrame: the DataFrame.
+    """
+
+    pa, pc, pcsv = arrow_import()
+    return table.to_pandas(types_mapper=lambda arrow_type: pd.StringDtype("pyarrow") if arrow_type == pa.large_string() else None)
+
+def spill_read(spill_dir: Path, names: list) -> pd.DataFrame:
+    """
+    Reads spill streams into one DataFrame (the streams concatenated in order).
+
+    Parameters:
+        spill_dir (Path): the spill directory.
+        names (list): the names of the streams.
+
+    Returns:
+        pd.DataFrame: the DataFrame.
+    """
+
+    pa, pc, pcsv = arrow_import()
+    list_tables = []
+    for name in names:
+        with pa.OSFile(str(Path(spill_dir) / f"{name}{SPILL_SUFFIX}")) as source, pa.ipc.open_stream(source) as reader:
+            list_tables.append(reader.read_all())
+    return arrow_to_pandas(pa.concat_tables(list_tables))
+
+def spill_parts(spill_dir: Path, name: str, max_bytes: int = SPILL_READ_BYTES):
+    """
+    Reads a spill stream part by part (consecutive small parts are read together).
+
+    Parameters:
+        spill_dir (Path): the spill directory.
+        name (str): the name of the stream.
+        max_bytes (int): the size (Arrow) up to which consecutive parts are read together.
+
+    Yields:
+        pd.DataFrame: the parts, in the order they were written.
+    """
+
+    pa, pc, pcsv = arrow_import()
+    path_spill = Path(spill_dir) / f"{name}{SPILL_SUFFIX}"
+    if not path_spill.exists():
+        return
+    with pa.OSFile(str(path_spill)) as source, pa.ipc.open_stream(source) as reader:
+        list_batches, batches_bytes = [], 0
+        for batch in reader:
+            if list_batches and batches_bytes + batch.nbytes > max_bytes:
+                yield arrow_to_pandas(pa.Table.from_batches(list_batches))
+                list_batches, batches_bytes = [], 0
+            list_batches.append(batch)
+            batches_bytes += batch.nbytes
+        if list_batches:
+            yield arrow_to_pandas(pa.Table.from_batches(list_batches))
+
+def spill_partition(dic_writers: dict, spill_dir: Path, prefix: str, df: pd.DataFrame, keys: pd.Series, dic_parts: dict, dic_bytes: dict) -> None:
+    """
+    Appends the rows of a DataFrame part to the spill streams of their partitions (the row order is kept within each partition).
+    The part is converted to Arrow once, sorted by partition and written in slices.
+
+    Parameters:
+        dic_writers (dict): the open streams by name (updated), all with the same schema.
+        spill_dir (Path): the spill directory.
+        prefix (str): the prefix of the stream names (prefix_0, prefix_1, ... in order of appearance of the keys).
+        df (pd.DataFrame): the part.
+        keys (pd.Series): the partition key of each row (text, without missing values).
+        dic_parts (dict): the stream name of each key (updated).
+        dic_bytes (dict): the size of each partition in memory (updated).
+
+    Returns:
+        None
+    """
+
+    if len(df) == 0:
+        return
+    df = spill_frame(df)
+    row_bytes = df.memory_usage(deep=True).sum() / len(df)
+    codes, uniques = pd.factorize(keys)
+    table = spill_table(df, dic_writers).take(np.argsort(codes, kind="stable"))
+    start = 0
+    for key, rows in zip(uniques, np.bincount(codes, minlength=len(uniques))):
+        name = dic_parts.setdefault(key, f"{prefix}_{len(dic_parts)}")
+        spill_write_table(dic_writers, spill_dir, name, table.slice(start, rows))
+        dic_bytes[name] = dic_bytes.get(name, 0) + int(row_bytes * rows)
+        start += rows
+
+def spill_split(spill_dir: Path, name: str, key_function, dic_bytes: dict, max_bytes: int = SPILL_READ_BYTES) -> dict:
+    """
+    Splits a spill stream into smaller partitions, reading it part by part (the stream is then removed).
+
+    Parameters:
+        spill_dir (Path): the spill directory.
+        name (str): the name of the stream.
+        key_function (callable): computes the partition keys of a part (see spill_partition).
+        dic_bytes (dict): the size of each partition in memory (updated).
+        max_bytes (int): the size (Arrow) of the parts read at a time (see spill_parts).
+
+    Returns:
+        dict: the stream name of each key.
+    """
+
+    dic_writers, dic_parts = {}, {}
+    try:
+        for df_part in spill_parts(spill_dir, name, max_bytes):
+            spill_partition(dic_writers, spill_dir, name, df_part, key_function(df_part), dic_parts, dic_bytes)
+    finally:
+        spill_close(dic_writers)
+    (Path(spill_dir) / f"{name}{SPILL_SUFFIX}").unlink()
+    dic_bytes.pop(name, None)
+    return dic_parts
+
+def spill_groups(list_names: list, dic_bytes: dict, max_bytes: int) -> list:
+    """
+    Groups consecutive partitions up to a size (a partition larger than the size is a group by itself).
+
+    Parameters:
+        list_names (list): the partitions, in processing order.
+        dic_bytes (dict): the size of each partition in memory.
+        max_bytes (int): the maximum size of a group.
+
+    Returns:
+        list: the groups (lists of partition names).
+    """
+
+    list_groups = []
+    group_bytes = 0
+    for name in list_names:
+        if list_groups and group_bytes + dic_bytes[name] <= max_bytes:
+            list_groups[-1].append(name)
+            group_bytes += dic_bytes[name]
+        else:
+            list_groups.append([name])
+            group_bytes = dic_bytes[name]
+    return list_groups
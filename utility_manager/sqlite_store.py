@@ -0,0 +1,262 @@
+"""
+Local SQLite store of the downloaded ANAC datasets (03_anac_od_sqlite.py).
+Every CSV source of the download directory (.zip archive or extracted .csv) is loaded into the table of its dataset:
+    cig_csv_YYYY_MM            -> table "cig" (all the months)
+    YYYYMMDD-<dataset>_csv     -> table "<dataset>" (dated snapshots: only the latest one by default)
+    <dataset>_csv              -> table "<dataset>"
+Values are stored as text (empty values as NULL), with the source name in the column '_source'.
+The loaded sources (size, modification time, rows) are recorded in the table '_sources': unchanged sources are not loaded again.
+[2026-10-17]: first version.
+"""
+
+import csv
+import io
+import logging
+import re
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+
+from utility_manager.utilities import csv_open, csv_sources
+
+SOURCES_TABLE = "_sources"
+SOURCE_COLUMN = "_source"
+SQLITE_BATCH_ROWS = 50000 # rows per executemany
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL", # readers are not blocked while loading
+    "synchronous": "NORMAL", # safe with WAL, fsync only at checkpoints
+    "temp_store": "MEMORY",
+    "cache_size": -262144, # KiB (256 MiB)
+}
+
+csv.field_size_limit(2 ** 31 - 1) # long free-text fields (e.g., 'oggetto_gara')
+
+def source_dataset(source_name: str) -> tuple:
+    """
+    Derives the dataset of a source from its name.
+
+    Parameters:
+        source_name (str): the source name, without suffix (e.g., "20240101-aggiudicazioni_csv", "cig_csv_2023_01").
+
+    Returns:
+        tuple: the table name and the snapshot date ("YYYYMMDD", None if the source is not a dated snapshot).
+    """
+
+    match = re.fullmatch(r"(\d{8})-(.+?)(_csv)?", source_name)
+    if match:
+        dataset, snapshot = match.group(2), match.group(1)
+    else:
+        match = re.fullmatch(r"(.+?)_csv(_\d{4}_\d{2})?", source_name)
+        dataset, snapshot = (match.group(1) if match else source_name), None
+    return re.sub(r"\W", "_", dataset).lower(), snapshot
+
+def sqlite_connect(db_path: str) -> sqlite3.Connection:
+    """
+    Opens the SQLite database in WAL mode, with the loading pragmas.
+
+    Parameters:
+        db_path (str): the database file path.
+
+    Returns:
+        sqlite3.Connection: the connection (autocommit: transactions are explicit).
+    """
+
+    Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    for pragma, value in SQLITE_PRAGMAS.items():
+        conn.execute(f"PRAGMA {pragma}={value}")
+    conn.execute(f'CREATE TABLE IF NOT EXISTS {quote_name(SOURCES_TABLE)} (source TEXT PRIMARY KEY, table_name TEXT, snapshot TEXT, size INTEGER, mtime_ns INTEGER, rows INTEGER, loaded TEXT)')
+    return conn
+
+def quote_name(name: str) -> str:
+    """
+    Quotes an SQL identifier (table or column name).
+
+    Parameters:
+        name (str): the identifier.
+
+    Returns:
+        str: the quoted identifier.
+    """
+
+    return '"' + name.replace('"', '""') + '"'
+
+def table_columns(conn: sqlite3.Connection, table: str) -> list:
+    """
+    Lists the columns of a table.
+
+    Parameters:
+        conn (sqlite3.Connection): the connection.
+        table (str): the table name.
+
+    Returns:
+        list: the column names (empty if the table does not exist).
+    """
+
+    return [row[1] for row in conn.execute(f'PRAGMA table_info({quote_name(table)})')]
+
+def header_columns(header: list) -> list:
+    """
+    Normalizes the header of a CSV source into column names (lowercase, unique).
+
+    Parameters:
+        header (list): the header fields.
+
+    Returns:
+        list: the column names.
+    """
+
+    list_columns = []
+    for i, name in enumerate(header):
+        col = name.strip().lstrip("\ufeff").lower() or f"col_{i}"
+        while col in list_columns or col == SOURCE_COLUMN:
+            col = f"{col}_{i}"
+        list_columns.append(col)
+    return list_columns
+
+def sqlite_load_source(conn: sqlite3.Connection, path_source: str, table: str, csv_sep: str = ";", batch_rows: int = SQLITE_BATCH_ROWS) -> int:
+    """
+    Loads a CSV source into a table (created, or extended with the new columns), replacing the rows of a previous load of the same source.
+    The caller is responsible for the transaction.
+
+    Parameters:
+        conn (sqlite3.Connection): the connection.
+        path_source (str): the .csv or single-CSV .zip source.
+        table (str): the table name.
+        csv_sep (str): the delimiter used in the CSV file.
+        batch_rows (int): the rows per executemany.
+
+    Returns:
+        int: the number of rows loaded.
+    """
+
+    source_name = Path(path_source).stem
+    rows = 0
+    with csv_open(path_source) as fp:
+        reader = csv.reader(io.TextIOWrapper(fp, encoding="utf-8", errors="replace", newline=""), delimiter=csv_sep)
+        list_columns = header_columns(next(reader, []))
+        if not list_columns:
+            return 0
+        existing = table_columns(conn, table)
+        if not existing:
+            conn.execute(f'CREATE TABLE {quote_name(table)} ({", ".join(f"{quote_name(col)} TEXT" for col in list_columns + [SOURCE_COLUMN])})')
+        else:
+            for col in list_columns:
+                if col not in existing:
+                    conn.execute(f'ALTER TABLE {quote_name(table)} ADD COLUMN {quote_name(col)} TEXT')
+            conn.execute(f'DELETE FROM {quote_name(table)} WHERE {quote_name(SOURCE_COLUMN)} = ?', (source_name,))
+        n_cols = len(list_columns)
+        sql = f'INSERT INTO {quote_name(table)} ({", ".join(quote_name(col) for col in list_columns + [SOURCE_COLUMN])}) VALUES ({", ".join("?" * (n_cols + 1))})'
+        batch = []
+        for row in reader:
+            if len(row) != n_cols: # malformed rows are padded or truncated
+                row = (row + [""] * n_cols)[:n_cols]
+            batch.append([value if value != "" else None for value in row] + [source_name])
+            if len(batch) >= batch_rows:
+                conn.executemany(sql, batch)
+                rows += len(batch)
+                batch = []
+        if batch:
+            conn.executemany(sql, batch)
+            rows += len(batch)
+    return rows
+
+def sqlite_index(conn: sqlite3.Connection, index_columns: list) -> list:
+    """
+    Creates the missing indexes on the given columns of every dataset table (and on the source column).
+
+    Parameters:
+        conn (sqlite3.Connection): the connection.
+        index_columns (list): the columns to be indexed, where present (e.g., cig, cf_amministrazione_appaltante).
+
+    Returns:
+        list: the names of the indexes created.
+    """
+
+    list_created = []
+    list_tables = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE '\\_%' ESCAPE '\\' AND name NOT LIKE 'sqlite%'")]
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    for table in list_tables:
+        columns = table_columns(conn, table)
+        for col in [SOURCE_COLUMN] + list(index_columns):
+            index_name = f"idx_{table}_{col.strip('_')}"
+            if col in columns and index_name not in existing:
+                conn.execute(f'CREATE INDEX {quote_name(index_name)} ON {quote_name(table)} ({quote_name(col)})')
+                list_created.append(index_name)
+    return list_created
+
+def sqlite_load(db_path: str, source_dir: str, csv_sep: str = ";", index_columns: list = None, latest_snapshot: bool = True, batch_rows: int = SQLITE_BATCH_ROWS) -> dict:
+    """
+    Loads the CSV sources of a download directory into the SQLite store (see the module description) and creates the indexes.
+    Each source is loaded in its own transaction; sources already loaded with the same size and modification time are skipped.
+
+    Parameters:
+        db_path (str): the database file path.
+        source_dir (str): the directory containing the downloaded files.
+        csv_sep (str): the delimiter used in the CSV files.
+        index_columns (list, optional): the columns to be indexed, where present.
+        latest_snapshot (bool): whether to keep only the latest dated snapshot of a dataset (the rows of older snapshots are removed).
+        batch_rows (int): the rows per executemany.
+
+    Returns:
+        dict: the number of sources loaded, skipped, removed and failed, the rows loaded and the indexes created.
+    """
+
+    logger = logging.getLogger(__name__)
+    dic_result = {"loaded": 0, "skipped": 0, "removed": 0, "failed": 0, "rows": 0, "indexes": []}
+
+    list_sources = csv_sources(source_dir, "")
+    dic_dataset = {source.stem: source_dataset(source.stem) for source in list_sources}
+    if latest_snapshot:
+        dic_latest = {}
+        for table, snapshot in dic_dataset.values():
+            if snapshot and snapshot > dic_latest.get(table, ""):
+                dic_latest[table] = snapshot
+        list_sources = [source for source in list_sources if dic_dataset[source.stem][1] in (None, dic_latest.get(dic_dataset[source.stem][0]))]
+
+    conn = sqlite_connect(db_path)
+    try:
+        dic_loaded = {row[0]: row[1:] for row in conn.execute(f'SELECT source, table_name, size, mtime_ns FROM {quote_name(SOURCES_TABLE)}')}
+
+        # Sources no longer selected (older snapshots, deleted files)
+        set_selected = {source.stem for source in list_sources}
+        for source_name, (table, size, mtime_ns) in dic_loaded.items():
+            if source_name not in set_selected:
+                conn.execute("BEGIN")
+                if table_columns(conn, table):
+                    conn.execute(f'DELETE FROM {quote_name(table)} WHERE {quote_name(SOURCE_COLUMN)} = ?', (source_name,))
+                conn.execute(f'DELETE FROM {quote_name(SOURCES_TABLE)} WHERE source = ?', (source_name,))
+                conn.execute("COMMIT")
+                dic_result["removed"] += 1
+                print(f"Removed from the store: {source_name}")
+
+        for i, path_source in enumerate(list_sources, 1):
+            stat = path_source.stat()
+            table, snapshot = dic_dataset[path_source.stem]
+            if dic_loaded.get(path_source.stem) == (table, stat.st_size, stat.st_mtime_ns):
+                dic_result["skipped"] += 1
+                continue
+            print(f"[{i}/{len(list_sources)}] Loading {path_source.name} into '{table}'")
+            try:
+                conn.execute("BEGIN")
+                rows = sqlite_load_source(conn, path_source, table, csv_sep, batch_rows)
+                conn.execute(f'INSERT OR REPLACE INTO {quote_name(SOURCES_TABLE)} VALUES (?, ?, ?, ?, ?, ?, ?)',
+                             (path_source.stem, table, snapshot, stat.st_size, stat.st_mtime_ns, rows, datetime.now().isoformat(timespec="seconds")))
+                conn.execute("COMMIT")
+            except Exception as e:
+                conn.execute("ROLLBACK")
+                dic_result["failed"] += 1
+                print(f"Error loading {path_source}: {e}")
+                logger.error(f"Error loading {path_source}: {e}")
+                continue
+            dic_result["loaded"] += 1
+            dic_result["rows"] += rows
+            logger.info(f"Loaded {path_source.name} into '{table}': {rows} rows")
+
+        print("Creating indexes")
+        dic_result["indexes"] = sqlite_index(conn, index_columns or [])
+        conn.execute("PRAGMA optimize")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    finally:
+        conn.close()
+    return dic_result
@@ -0,0 +1,88 @@
+"""
+Declarative, vectorized transformations of the ANAC data (ANAC_TRANSFORMS in config.yml).
+A rule is a dict with the source 'column', the operation 'op', an optional 'target' column (default: the source column) and the operation arguments:
+    replace (old, new): literal replacement
+    lower, upper, capitalize: case conversion
+    slice (start, stop, fillna): substring, missing values replaced by 'fillna' (if given)
+On categorical columns the operation is applied to the categories only, not to every row.
+[2026-10-17]: first version.
+"""
+
+import numpy as np
+import pandas as pd
+
+def transform_strings(values: pd.Series, rule: dict) -> pd.Series:
+    """
+    Applies the string operation of a rule to a Series of strings.
+
+    Parameters:
+        values (pd.Series): the strings.
+        rule (dict): the transformation rule.
+
+    Returns:
+        pd.Series: the transformed strings.
+    """
+
+    op = rule["op"]
+    if op == "replace":
+        return values.str.replace(rule["old"], rule.get("new", ""), regex=False)
+    if op == "lower":
+        return values.str.lower()
+    if op == "upper":
+        return values.str.upper()
+    if op == "capitalize":
+        return values.str.capitalize()
+    if op == "slice":
+        return values.str.slice(rule.get("start"), rule.get("stop"))
+    raise ValueError(f"Unknown transformation: {op}")
+
+def transform_column(series: pd.Series, rule: dict) -> pd.Series:
+    """
+    Applies a rule to a column; categorical columns are transformed on their categories and the row codes are remapped.
+
+    Parameters:
+        series (pd.Series): the column.
+        rule (dict): the transformation rule.
+
+    Returns:
+        pd.Series: the transformed column (categorical if the source column is categorical).
+    """
+
+    fillna = rule.get("fillna")
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        categories = transform_strings(pd.Series(series.cat.categories, dtype=object), rule)
+        # Different categories can become equal (e.g., lowercase): factorize them and remap the codes
+        new_codes, new_categories = pd.factorize(categories)
+        codes = series.cat.codes.to_numpy()
+        if len(new_codes) > 0:
+            codes = np.where(codes >= 0, new_codes[codes], -1)
+        result = pd.Series(pd.Categorical.from_codes(codes, categories=new_categories), index=series.index, name=series.name)
+        if fillna is not None and result.isna().any():
+            if fillna not in result.cat.categories:
+                result = result.cat.add_categories([fillna])
+            result = result.fillna(fillna)
+        return result
+    result = transform_strings(series, rule)
+    if fillna is not None:
+        result = result.fillna(fillna)
+    return result
+
+def apply_transforms(df: pd.DataFrame, rules: list) -> pd.DataFrame:
+    """
+    Applies a list of transformation rules to a DataFrame, in order.
+
+    Parameters:
+        df (pd.DataFrame): the DataFrame to operate on.
+        rules (list): the transformation rules.
+
+    Returns:
+        pd.DataFrame: the transformed DataFrame.
+    """
+
+    for rule in rules or []:
+        col = rule["column"]
+        if col not in df.columns: # Checks if the column exists in the DataFrame
+            print(f"The column '{col}' does not exist in the DataFrame.")
+            continue
+        df[rule.get("target", col)] = transform_column(df[col], rule)
+    return df
@@ -3,19 +3,48 @@ Utility functions for file handling, downloading, unzipping, and directory manag
 [2024-06-12]: added .gitkeep file to keep empty directories in git in check_and_create_directory.
 [2025-06-12]: updated with logging functionalities.
 [2025-06-20]: updated read_urls_from_json function with 'key' parameter to read specific sections of JSON files.
+[2026-10-17]: url_download runs on a bounded thread pool with a per-host concurrency limit (session_create sizes the SSLAdapter pool).
+[2026-10-17]: url_download streams to a '.part' file renamed on completion; interrupted transfers resume with HTTP Range requests.
+[2026-10-17]: added a per-directory download manifest (ETag, Last-Modified, Content-Length) for conditional re-download of republished files.
+[2026-10-17]: added verify_downloads (zip CRC test, sha256 and size in the manifest, quarantine of damaged files); url_unzip skips corrupt archives.
+[2026-10-17]: added a negative cache of URLs not found on the server (with TTL) to url_download.
+[2026-10-17]: url_unzip extracts only new or changed archives (extract manifest), on a process pool, with an optional member filter.
+[2026-10-17]: added csv_sources and csv_open to read CSV files directly from the downloaded archives (extraction is optional).
+[2026-10-17]: url_download also returns the bytes downloaded (for the run reports, see utility_manager/metrics.py).
+[2026-10-17]: the messages printed for every downloaded, extracted or moved file are shown only at the DEBUG logging level (LOG_LEVEL).
+[2026-10-17]: the URLs of url_download in 'negative_cache_exempt' (e.g., the months about to be published) are never added to the negative cache.
+[2026-10-17]: url_unzip records the size of the extracted members and extracts again the archives whose members are missing or changed.
+[2026-10-17]: resumed transfers send If-Range (ETag or Last-Modified of the partial file) and restart from zero on a full answer; bytes_downloaded counts the bytes transferred.
 """
 
+import hashlib
 import json
 import logging
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
 from pathlib import Path
+from urllib.parse import urlparse
 import requests
 import urllib3
 import zipfile
+import zlib
 from ssl_adapter import SSLAdapter
 
 # Disable SSL warnings for unverified HTTPS requests
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024 # bytes written to disk per streamed chunk
+PART_SUFFIX = ".part" # suffix of incomplete downloads
+PART_META_SUFFIX = ".json" # suffix of the HTTP metadata of an incomplete download (validator of the resumed transfer), next to the partial file
+DOWNLOAD_MANIFEST = ".download_manifest.json" # HTTP metadata of the downloaded files, stored in each download directory
+NEGATIVE_CACHE = ".negative_cache.json" # URLs not found on the server (404) with the time of the last check, stored in each download directory
+EXTRACT_MANIFEST = ".extract_manifest.json" # signature (size, mtime, CRCs) and members (with their sizes) of the extracted archives, stored in each download directory
+QUARANTINE_DIR = "quarantine" # subdirectory of a download directory where damaged files are moved
+
 def json_to_list_dict(json_file: str) -> list:
     """
     Extracts and sorts key-value pairs from a JSON file alphabetically by the keys.
@@ -93,91 +122,578 @@ def check_and_create_directory(dir_name:str, dir_parent:str="") -> None:
             gitkeep_path.touch()
         print(f"The directory '{path_directory}' has been created successfully")
 
-def url_download(list_urls:list, path_download:str) -> dict:
+def session_create(pool_maxsize: int = 10) -> requests.Session:
+    """
+    Creates a 'requests' session with the SSLAdapter mounted for HTTPS and a connection pool sized for concurrent downloads.
+
+    Parameters:
+        pool_maxsize (int): the maximum number of connections kept alive per host (should match the per-host concurrency limit).
+
+    Returns:
+        requests.Session: the configured session.
+    """
+
+    s = requests.Session()
+    s.mount('https://', SSLAdapter(pool_connections=pool_maxsize, pool_maxsize=pool_maxsize))
+    return s
+
+def manifest_read(dir_path: str, manifest_name: str = DOWNLOAD_MANIFEST) -> dict:
+    """
+    Reads a JSON manifest stored in a directory.
+
+    Parameters:
+        dir_path (str): the directory containing the manifest.
+        manifest_name (str): the file name of the manifest.
+
+    Returns:
+        dict: the manifest content (empty if the manifest does not exist or is not valid).
+    """
+
+    path_manifest = Path(dir_path) / manifest_name
+    if not path_manifest.exists():
+        return {}
+    try:
+        with open(path_manifest, 'r') as fp:
+            return json.load(fp)
+    except json.JSONDecodeError:
+        logging.getLogger(__name__).warning(f"Manifest not valid, ignoring it: {path_manifest}")
+        return {}
+
+def manifest_write(dir_path: str, data: dict, manifest_name: str = DOWNLOAD_MANIFEST) -> None:
+    """
+    Writes a JSON manifest in a directory (through a temporary file, so that the manifest is never left half-written).
+
+    Parameters:
+        dir_path (str): the directory where the manifest is stored.
+        data (dict): the manifest content.
+        manifest_name (str): the file name of the manifest.
+
+    Returns:
+        None
+    """
+
+    path_manifest = Path(dir_path) / manifest_name
+    path_tmp = path_manifest.with_name(manifest_name + ".tmp")
+    with open(path_tmp, 'w') as fp:
+        json.dump(data, fp, indent=2, sort_keys=True)
+    os.replace(path_tmp, path_manifest)
+
+def url_download_file(s: requests.Session, url: str, path_download: str, i: int, list_urls_len: int, refresh: bool = False, manifest_entry: dict = None) -> tuple:
+    """
+    Downloads a single file (if it does not already exist in the specified directory) using the given session.
+    With 'refresh', a file recorded in 'manifest_entry' is downloaded again only if the server copy changed since that download.
+
+    Parameters:
+        s (requests.Session): the session used for the request.
+        url (str): the URL of the file to be downloaded.
+        path_download (str): the directory path where the file should be downloaded.
+        i (int): the position of the URL in the download list (for progress messages).
+        list_urls_len (int): the length of the download list (for progress messages).
+        refresh (bool): whether to check if an existing file changed on the server.
+        manifest_entry (dict): the manifest entry of the file (None if the file is not in the manifest).
+
+    Returns:
+        tuple: the key of the download result ("download_ok", "download_not_necessary" or "download_error"), the file name, its new manifest entry (None if unchanged), the HTTP status code of a failed request (None otherwise) and the bytes transferred.
+    """
+
+    logger = logging.getLogger(__name__)
+    details = logger.isEnabledFor(logging.DEBUG) # one message per step of every URL only at the DEBUG level (LOG_LEVEL)
+
+    if details:
+        print(f"[{i} / {list_urls_len}]")
+        print(f"URL to be downloaded: {url}")
+    logger.debug(f"Connecting to URL [{i}/{list_urls_len}]: {url}")
+
+    file_name_zip = Path(url).name
+    if details:
+        print(f"File to be downloaded: {file_name_zip}")
+
+    path_check = Path(path_download) / file_name_zip
+    path_part = path_check.with_name(file_name_zip + PART_SUFFIX)
+    headers = {}
+    try:
+        if path_check.exists():
+            if not refresh:
+                if details:
+                    print(f"WARNING! File '{file_name_zip}' already downloaded, skipping download.")
+                logger.debug(f"File already exists, skipping download: {file_name_zip}")
+                return "download_not_necessary", file_name_zip, None, None, 0
+            if manifest_entry is None:
+                # File downloaded before the manifest existed: adopt it if the server reports the same size
+                meta = url_head_metadata(s, url)
+                if meta["content_length"] == path_check.stat().st_size:
+                    logger.info(f"File already exists with the same size, recording metadata: {file_name_zip}")
+                    return "download_not_necessary", file_name_zip, meta, None, 0
+        if refresh and manifest_entry is not None:
+            # Also applies to files moved elsewhere after the download (e.g., the BDAP CSV moved to OD_BDAP_DIR)
+            if manifest_entry.get("etag"):
+                headers["If-None-Match"] = manifest_entry["etag"]
+            if manifest_entry.get("last_modified"):
+                headers["If-Modified-Since"] = manifest_entry["last_modified"]
+        if details:
+            print("Downloading file...")
+        meta, bytes_transferred = stream_to_part(s, url, path_part, headers)
+        if meta is None:
+            if details:
+                print(f"File '{file_name_zip}' not modified on the server, skipping download.")
+            logger.debug(f"File not modified, skipping download: {file_name_zip}")
+            return "download_not_necessary", file_name_zip, None, None, bytes_transferred
+        os.replace(path_part, path_check) # the final name appears only when the file is complete
+        path_part.with_name(path_part.name + PART_META_SUFFIX).unlink(missing_ok=True)
+        logger.info(f"Download successful from: {url}")
+        if details:
+            print(f"OK! Download successful: {file_name_zip}\n")
+        return "download_ok", file_name_zip, meta, None, bytes_transferred
+    except requests.RequestException as e:
+        print(f"ERROR! Error downloading {url}: {e}\n")
+        logger.error(f"Error downloading from {url}: {e}")
+        status_code = e.response.status_code if e.response is not None else None
+        return "download_error", file_name_zip, None, status_code, 0
+
+def url_head_metadata(s: requests.Session, url: str) -> dict:
+    """
+    Reads the HTTP metadata of a URL with a HEAD request.
+
+    Parameters:
+        s (requests.Session): the session used for the request.
+        url (str): the URL to be checked.
+
+    Returns:
+        dict: the URL, ETag, Last-Modified and Content-Length (None when not provided by the server).
+    """
+
+    response = s.head(url, verify=False, allow_redirects=True)
+    response.raise_for_status()
+    content_length = response.headers.get("Content-Length")
+    return {
+        "url": url,
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "content_length": int(content_length) if content_length is not None else None,
+    }
+
+def stream_to_part(s: requests.Session, url: str, path_part: Path, headers: dict = None) -> tuple:
+    """
+    Streams the content of a URL into a partial file, in chunks of DOWNLOAD_CHUNK_SIZE bytes.
+    If the partial file already exists (interrupted transfer), only the missing bytes are requested with an HTTP Range header, conditional
+    (If-Range) on the ETag or Last-Modified of the transfer that wrote the partial file (stored next to it, PART_META_SUFFIX): when the file
+    changed on the server, or the server does not support ranges, the whole file is sent and the download restarts from zero.
+
+    Parameters:
+        s (requests.Session): the session used for the request.
+        url (str): the URL of the file to be downloaded.
+        path_part (Path): the path of the partial file.
+        headers (dict, optional): additional request headers (e.g., conditional headers).
+
+    Returns:
+        tuple: the URL, ETag, Last-Modified and Content-Length of the downloaded file (None if the server answered 304 Not Modified)
+            and the bytes transferred.
+    """
+
+    logger = logging.getLogger(__name__)
+
+    path_meta = path_part.with_name(path_part.name + PART_META_SUFFIX)
+    request_headers = dict(headers or {})
+    offset = path_part.stat().st_size if path_part.exists() else 0
+    if offset > 0:
+        part_meta = manifest_read(path_part.parent, path_meta.name)
+        etag = part_meta.get("etag")
+        validator = etag if etag and not etag.startswith("W/") else part_meta.get("last_modified") # If-Range requires a strong ETag or a date
+        if validator:
+            request_headers["Range"] = f"bytes={offset}-"
+            request_headers["If-Range"] = validator
+        else:
+            logger.warning(f"Partial file without ETag or Last-Modified, restarting download: {path_part.name}")
+            offset = 0
+
+    with s.get(url, verify=False, stream=True, headers=request_headers) as response:
+        if response.status_code == 304:
+            return None, 0
+        if response.status_code == 416 or (response.status_code == 206 and not response.headers.get("Content-Range", "").startswith(f"bytes {offset}-")):
+            # Range not satisfiable, or not the requested one: the partial file is stale, start again
+            logger.warning(f"Partial file not valid anymore, restarting download: {path_part.name}")
+            path_part.unlink()
+            path_meta.unlink(missing_ok=True)
+            return stream_to_part(s, url, path_part, headers)
+        response.raise_for_status()  # Raises an HTTPError if the response was an error
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if response.status_code == 206:
+            logger.info(f"Resuming download of {path_part.name} from byte {offset}")
+            mode = 'ab'
+        else:
+            if offset > 0:
+                logger.info(f"File changed on the server or range not supported, restarting download: {path_part.name}")
+            mode = 'wb' # the whole file (nothing to resume, or the server ignored the conditional Range header)
+            manifest_write(path_part.parent, {"url": url, "etag": etag, "last_modified": last_modified}, path_meta.name)
+        bytes_transferred = 0
+        with open(path_part, mode) as file:
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                file.write(chunk)
+                bytes_transferred += len(chunk)
+
+    meta = {
+        "url": url,
+        "etag": etag,
+        "last_modified": last_modified,
+        "content_length": path_part.stat().st_size,
+    }
+    return meta, bytes_transferred
+
+def url_download(list_urls:list, path_download:str, max_workers:int = 1, max_per_host:int = 4, refresh:bool = False, negative_cache_ttl_days:int = 0, negative_cache_exempt:list = None) -> dict:
     """
     Downloads files from a list of URLs if they do not already exist in the specified directory. This function uses the 'requests' library for downloading and saving files.
+    Files are streamed to disk and renamed into place only when complete; interrupted transfers are resumed on the next run.
+    Downloads run on a pool of 'max_workers' threads; at most 'max_per_host' requests are open at the same time towards the same host.
+    The ETag, Last-Modified and Content-Length of every download are recorded in the directory manifest (DOWNLOAD_MANIFEST).
+    With 'refresh', files that already exist are checked with a conditional request and downloaded again only if they changed on the server.
+    With 'negative_cache_ttl_days' > 0, URLs answered with 404 are recorded in the directory negative cache (NEGATIVE_CACHE) and not requested again until the TTL expires,
+    except the URLs in 'negative_cache_exempt' (files that may be published any day), which are requested at every run.
     
     Parameters:
         url_list (list): a list of URLs of the files to be downloaded.
         path_download (str): the directory path where the files should be downloaded.
+        max_workers (int): the number of download threads (1 = serial download).
+        max_per_host (int): the maximum number of concurrent requests towards the same host.
+        refresh (bool): whether to re-download existing files that changed on the server (for files republished in place).
+        negative_cache_ttl_days (int): the number of days a URL not found on the server is skipped (0 = negative cache disabled).
+        negative_cache_exempt (list, optional): the URLs never recorded in (nor skipped by) the negative cache.
 
     Returns: 
-        dict: a dictionary with download results
+        dict: a dictionary with download results (number of files by result and bytes transferred, "bytes_downloaded")
     """
 
     logger = logging.getLogger(__name__)
-    dic_result = {"download_ok": 0, "download_not_necessary":0, "download_error":0}
+    dic_result = {"download_ok": 0, "download_not_necessary":0, "download_error":0, "bytes_downloaded": 0}
 
-    s = requests.Session()
-    s.mount('https://', SSLAdapter())
+    max_workers = max(1, int(max_workers))
+    max_per_host = max(1, int(max_per_host))
+
+    manifest = manifest_read(path_download)
+    negative_cache = {}
+    negative_cache_exempt = set(negative_cache_exempt or [])
+    if negative_cache_ttl_days > 0:
+        negative_cache = {url: checked for url, checked in negative_cache_read(path_download, negative_cache_ttl_days).items() if url not in negative_cache_exempt}
+        list_urls_len = len(list_urls)
+        list_urls = [url for url in list_urls if url not in negative_cache]
+        skipped = list_urls_len - len(list_urls)
+        dic_result["download_not_necessary"] += skipped
+        print(f"URLs skipped (not found on the server in the last {negative_cache_ttl_days} days): {skipped}")
+        logger.info(f"URLs skipped by the negative cache: {skipped}")
+
+    s = session_create(max_per_host)
+
+    # One semaphore per host to cap the concurrent requests towards the same server
+    host_locks = {host: threading.BoundedSemaphore(max_per_host) for host in {urlparse(url).netloc for url in list_urls}}
+
+    def download_task(url: str, i: int) -> tuple:
+        with host_locks[urlparse(url).netloc]:
+            return url_download_file(s, url, path_download, i, list_urls_len, refresh, manifest.get(Path(url).name))
 
     list_urls_len = len(list_urls)
-    
-    i = 0
 
-    for url in list_urls:
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(download_task, url, i): url for i, url in enumerate(list_urls, start=1)}
+            for future in as_completed(futures):
+                result_key, file_name, meta, status_code, bytes_transferred = future.result()
+                dic_result[result_key]+=1
+                dic_result["bytes_downloaded"] += bytes_transferred
+                if meta is not None:
+                    manifest[file_name] = meta
+                if status_code == 404 and futures[future] not in negative_cache_exempt:
+                    negative_cache[futures[future]] = datetime.now().isoformat(timespec="seconds")
+    finally:
+        s.close()
+        manifest_write(path_download, manifest)
+        logger.info(f"Download manifest updated: {Path(path_download) / DOWNLOAD_MANIFEST}")
+        if negative_cache_ttl_days > 0:
+            manifest_write(path_download, negative_cache, NEGATIVE_CACHE)
 
-        i+=1
+    return dic_result
 
-        print(f"[{i} / {list_urls_len}]")
+def negative_cache_read(path_download: str, ttl_days: int) -> dict:
+    """
+    Reads the negative cache of a download directory, dropping the entries older than the TTL.
 
-        print(f"URL to be downloaded: {url}")
-        logger.info(f"Connecting to URL [{i}/{list_urls_len}]: {url}")
-        
-        file_name_zip = Path(url).name
-        print(f"File to be downloaded: {file_name_zip}")
-        
-        file_name_csv = file_name_zip.replace('.zip', '.csv')
-        print(f"File to be checked: {file_name_csv}")
-        
-        path_check = Path(path_download) / file_name_zip
-        if path_check.exists():
-            print(f"WARNING! File '{file_name_zip}' already downloaded, skipping download.")
-            logger.info(f"File already exists, skipping download: {file_name_zip}")
-            dic_result["download_not_necessary"]+=1
-            continue
+    Parameters:
+        path_download (str): the download directory.
+        ttl_days (int): the number of days an entry stays valid.
+
+    Returns:
+        dict: the URLs not found on the server mapped to the time of the check (ISO format).
+    """
+
+    limit = datetime.now() - timedelta(days=ttl_days)
+    negative_cache = manifest_read(path_download, NEGATIVE_CACHE)
+    return {url: checked for url, checked in negative_cache.items() if datetime.fromisoformat(checked) >= limit}
+
+def file_verify(path_file: str) -> dict:
+    """
+    Verifies a downloaded file: computes its size and sha256 and, for .zip files, runs the CRC test of every member.
+
+    Parameters:
+        path_file (str): the path of the file to be verified.
+
+    Returns:
+        dict: the file name, size, mtime_ns, sha256, the verification result ("ok") and the error found (None if ok).
+    """
+
+    path_file = Path(path_file)
+    stat = path_file.stat()
+    sha256 = hashlib.sha256()
+    with open(path_file, 'rb') as fp:
+        for chunk in iter(lambda: fp.read(DOWNLOAD_CHUNK_SIZE), b""):
+            sha256.update(chunk)
+    dic_verify = {"file": path_file.name, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": sha256.hexdigest(), "ok": True, "error": None}
+    if path_file.suffix == ".zip":
         try:
-            print("Downloading file...")
-            response = s.get(url, verify=False)
-            response.raise_for_status()  # Raises an HTTPError if the response was an error
-            logger.info(f"Download successful from: {url}")
-            with open(Path(path_download) / file_name_zip, 'wb') as file:
-                file.write(response.content)
-            # command = "wget -P " + "./" + path_download + " " + url
-            # os.system(command)
-            print("OK! Download successful\n")
-            dic_result["download_ok"]+=1
-        except requests.RequestException as e:
-            print(f"ERROR! Error downloading {url}: {e}\n")
-            logger.error(f"Error downloading from {url}: {e}")
-            dic_result["download_error"]+=1
+            with zipfile.ZipFile(path_file, 'r') as zip_ref:
+                bad_member = zip_ref.testzip() # reads every member and checks its CRC
+            if bad_member is not None:
+                dic_verify.update(ok=False, error=f"CRC error in member '{bad_member}'")
+        except (zipfile.BadZipFile, zlib.error, OSError, EOFError) as e:
+            dic_verify.update(ok=False, error=str(e))
+    return dic_verify
+
+def verify_downloads(download_dir: str, max_workers: int = None, quarantine: bool = True) -> dict:
+    """
+    Verifies the files of a download directory in parallel and records size and sha256 in the directory manifest.
+    Files already verified with the same size and modification time are not read again, so a repeated check only costs a 'stat' per file.
+    Damaged files are moved to the QUARANTINE_DIR subdirectory and removed from the manifest, so that the next download fetches them again.
+
+    Parameters:
+        download_dir (str): the path to the directory containing the downloaded files.
+        max_workers (int, optional): the number of verification processes (default: number of CPUs).
+        quarantine (bool): whether to move damaged files to the quarantine subdirectory.
+
+    Returns:
+        dict: damaged file names mapped to their URL (None if the URL is not in the manifest).
+    """
+
+    logger = logging.getLogger(__name__)
+    download_path = Path(download_dir)
+    manifest = manifest_read(download_dir)
+
+    list_check = []
+    for file_path in sorted(download_path.glob("*.zip")) + [download_path / name for name in sorted(manifest) if not name.endswith(".zip")]:
+        if not file_path.is_file():
+            continue
+        stat = file_path.stat()
+        entry = manifest.get(file_path.name, {})
+        if entry.get("sha256") and entry.get("size") == stat.st_size and entry.get("mtime_ns") == stat.st_mtime_ns:
+            continue # unchanged since the last verification
+        list_check.append(str(file_path))
+
+    print(f"Files to be verified in '{download_dir}': {len(list_check)}")
+    logger.info(f"Verifying {len(list_check)} files in {download_dir}")
+
+    dic_damaged = {}
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for dic_verify in executor.map(file_verify, list_check, chunksize=8):
+            file_name = dic_verify["file"]
+            entry = manifest.get(file_name, {})
+            if dic_verify["ok"]:
+                entry.update(size=dic_verify["size"], mtime_ns=dic_verify["mtime_ns"], sha256=dic_verify["sha256"])
+                manifest[file_name] = entry
+                continue
+            print(f"ERROR! Damaged file '{file_name}': {dic_verify['error']}")
+            logger.error(f"Damaged file {file_name}: {dic_verify['error']}")
+            dic_damaged[file_name] = entry.get("url")
+            manifest.pop(file_name, None)
+            if quarantine:
+                path_quarantine = download_path / QUARANTINE_DIR
+                path_quarantine.mkdir(exist_ok=True)
+                shutil.move(str(download_path / file_name), str(path_quarantine / file_name))
+                logger.info(f"File moved to quarantine: {path_quarantine / file_name}")
+
+    manifest_write(download_dir, manifest)
+
+    return dic_damaged
+
+def download_repair(download_dir: str, max_workers: int = 1, max_per_host: int = 4, verify_workers: int = None) -> dict:
+    """
+    Verifies a download directory (see verify_downloads) and downloads again the damaged files whose URL is known.
+
+    Parameters:
+        download_dir (str): the path to the download directory.
+        max_workers (int): the number of download threads.
+        max_per_host (int): the maximum number of concurrent requests towards the same host.
+        verify_workers (int, optional): the number of verification processes (default: number of CPUs).
+
+    Returns:
+        dict: a dictionary with the number of damaged files and the results of the new downloads.
+    """
+
+    dic_damaged = verify_downloads(download_dir, verify_workers)
+    list_urls = [url for url in dic_damaged.values() if url is not None]
+    dic_result = {"damaged": len(dic_damaged), "refetch": {}}
+    if list_urls:
+        print(f"Downloading again {len(list_urls)} damaged files")
+        dic_result["refetch"] = url_download(list_urls, download_dir, max_workers, max_per_host)
+        verify_downloads(download_dir, verify_workers)
     return dic_result
 
-def url_unzip(download_dir: str) -> int:
+def zip_signature(path_zip: str) -> dict:
+    """
+    Computes the signature of a .zip file from its size, modification time and the CRCs of its members (read from the central directory, without decompressing).
+
+    Parameters:
+        path_zip (str): the path of the .zip file.
+
+    Returns:
+        dict: the size, mtime_ns and crc of the archive.
+    """
+
+    stat = Path(path_zip).stat()
+    with zipfile.ZipFile(path_zip, 'r') as zip_ref:
+        crc = zlib.crc32("".join(f"{info.filename}:{info.CRC};" for info in zip_ref.infolist()).encode())
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "crc": crc}
+
+def zip_extract(path_zip: str, member_suffixes: list = None) -> dict:
+    """
+    Extracts a .zip file in its directory, optionally only the members with the given suffixes.
+
+    Parameters:
+        path_zip (str): the path of the .zip file.
+        member_suffixes (list, optional): the suffixes of the members to be extracted (e.g., [".csv"]); None extracts every member.
+
+    Returns:
+        dict: the archive name, its signature, the extracted members, their sizes and the error found (None if ok).
+    """
+
+    path_zip = Path(path_zip)
+    dic_extract = {"file": path_zip.name, "signature": None, "members": [], "member_sizes": {}, "error": None}
+    try:
+        dic_extract["signature"] = zip_signature(path_zip)
+        with zipfile.ZipFile(path_zip, 'r') as zip_ref:
+            for info in zip_ref.infolist():
+                member = info.filename
+                if member_suffixes and not member.lower().endswith(tuple(member_suffixes)):
+                    continue
+                zip_ref.extract(info, path_zip.parent)
+                dic_extract["members"].append(member)
+                if not info.is_dir():
+                    dic_extract["member_sizes"][member] = info.file_size
+    except (zipfile.BadZipFile, zlib.error, OSError, EOFError) as e:
+        dic_extract["error"] = str(e)
+    return dic_extract
+
+def members_extracted(download_path: Path, entry: dict) -> bool:
+    """
+    Checks that the members recorded in an extract manifest entry are still in the directory, with their recorded sizes.
+
+    Parameters:
+        download_path (Path): the directory of the archive.
+        entry (dict): the extract manifest entry of the archive.
+
+    Returns:
+        bool: False if a member is missing or has another size (or the entry has no member sizes).
+    """
+
+    member_sizes = entry.get("member_sizes")
+    if member_sizes is None:
+        return False # entry written before the member sizes were recorded
+    for member, size in member_sizes.items():
+        path_member = download_path / member
+        if not path_member.is_file() or path_member.stat().st_size != size:
+            return False
+    return True
+
+def url_unzip(download_dir: str, max_workers: int = 1, member_suffixes: list = None, force: bool = False) -> list:
     """
     Unzips all the .zip files located in the specified download path.
     This function searches for all .zip files within the given directory, extracts their contents to the same directory, and uses Python's built-in zipfile module for the extraction process, providing a more secure and cross-platform approach compared to calling external unzip commands.    
+    The signature and the member sizes of every extracted archive are recorded in the directory extract manifest (EXTRACT_MANIFEST): archives whose signature did not change are not extracted again, unless a member was removed or modified meanwhile.
+    Archives are extracted on a pool of 'max_workers' processes; corrupt archives are logged and skipped (run verify_downloads to quarantine and download them again).
 
     Parameters:
         download_dir (str): the path to the directory containing the .zip files.
+        max_workers (int): the number of extraction processes (1 = serial extraction).
+        member_suffixes (list, optional): the suffixes of the members to be extracted (e.g., [".csv"]); None extracts every member.
+        force (bool): whether to extract every archive, also the unchanged ones.
 
     Returns:
-        int: number of unzippped files.
+        list: the unzipped files.
     """
 
+    logger = logging.getLogger(__name__)
     download_path = Path(download_dir)
-    unzipped_files = 0
     list_file = [] # List of unzipped files
-
-    for file_path in download_path.glob("*.zip"):
-        with zipfile.ZipFile(file_path, 'r') as zip_ref:
-            zip_ref.extractall(download_path)
-        list_file.append(file_path)
-        print(f"Unzipped: {file_path}")
-        unzipped_files+=1
+    manifest = manifest_read(download_dir, EXTRACT_MANIFEST)
+    member_suffixes = [suffix.lower() for suffix in member_suffixes] if member_suffixes else None
+
+    list_extract = []
+    for file_path in sorted(download_path.glob("*.zip")):
+        entry = manifest.get(file_path.name)
+        if not force and entry is not None and entry.get("member_suffixes") == member_suffixes:
+            try:
+                if entry.get("signature") == zip_signature(file_path) and members_extracted(download_path, entry):
+                    continue # already extracted
+            except (zipfile.BadZipFile, OSError):
+                pass # corrupt archive, reported by the extraction below
+        list_extract.append(str(file_path))
+
+    print(f"Archives to be unzipped in '{download_dir}': {len(list_extract)} (unchanged: {len(list(download_path.glob('*.zip'))) - len(list_extract)})")
+
+    with ProcessPoolExecutor(max_workers=max(1, int(max_workers))) as executor:
+        for dic_extract in executor.map(zip_extract, list_extract, [member_suffixes] * len(list_extract)):
+            file_path = download_path / dic_extract["file"]
+            if dic_extract["error"] is not None:
+                print(f"ERROR! Corrupt archive, skipping: {file_path} ({dic_extract['error']})")
+                logger.error(f"Corrupt archive, skipping: {file_path} ({dic_extract['error']})")
+                manifest.pop(dic_extract["file"], None)
+                continue
+            manifest[dic_extract["file"]] = {"signature": dic_extract["signature"], "members": dic_extract["members"], "member_sizes": dic_extract["member_sizes"], "member_suffixes": member_suffixes}
+            list_file.append(file_path)
+            logger.debug(f"Unzipped: {file_path}")
+
+    manifest_write(download_dir, manifest, EXTRACT_MANIFEST)
 
     return list_file
 
+def csv_sources(source_dir: str, prefix_name: str) -> list:
+    """
+    Lists the CSV sources of a download directory whose name starts with a prefix.
+    For every dataset file the .zip archive is preferred; the extracted .csv is used only when the archive is not available.
+
+    Parameters:
+        source_dir (str): the directory containing the downloaded files.
+        prefix_name (str): the prefix of the file names (e.g., "cig_csv_").
+
+    Returns:
+        list: the paths of the sources (.zip or .csv), sorted by name.
+    """
+
+    source_path = Path(source_dir)
+    dic_sources = {file_path.stem: file_path for file_path in source_path.glob(f"{prefix_name}*.csv")}
+    dic_sources.update({file_path.stem: file_path for file_path in source_path.glob(f"{prefix_name}*.zip")})
+    return [dic_sources[stem] for stem in sorted(dic_sources)]
+
+@contextmanager
+def csv_open(path_source: str):
+    """
+    Opens a CSV source in binary mode: a .csv file or the (first) .csv member of a .zip archive, streamed without extracting it.
+
+    Parameters:
+        path_source (str): the path of the .csv or .zip file.
+
+    Yields:
+        a binary file object with the CSV content.
+    """
+
+    path_source = Path(path_source)
+    if path_source.suffix.lower() != ".zip":
+        with open(path_source, 'rb') as fp:
+            yield fp
+        return
+    with zipfile.ZipFile(path_source, 'r') as zip_ref:
+        members = [name for name in zip_ref.namelist() if name.lower().endswith(".csv")]
+        if not members:
+            raise zipfile.BadZipFile(f"No CSV member in {path_source}")
+        with zip_ref.open(members[0], 'r') as fp:
+            yield fp
+
 def move_files(source_folder: str, file_extension: str, destination_folder: str) -> int:
     """
     Moves all files with a specified extension from a source folder and its subfolders to a destination folder.
@@ -203,7 +719,7 @@ def move_files(source_folder: str, file_extension: str, destination_folder: str)
         destination_file_path = destination_path / file_path.name
         # Move the file
         file_path.rename(destination_file_path)
-        print(f"Moved {file_path.name} from {file_path.parent} to {destination_folder}")
+        logging.getLogger(__name__).debug(f"Moved {file_path.name} from {file_path.parent} to {destination_folder}")
         files_moved += 1
 
     return files_moved
\ No newline at end of file